@@ -3,7 +3,7 @@
 
 """NTCIR-15 QA Lab PoliInfo2 Dialog SummarizationタスクのROUGE自動評価スクリプト．
 動作要件として，以下のモジュールが必要です．
-・mecab-python3
+・mecab-python3（--no-mecabを指定する場合は不要です）
 
 【入力】評価対象データはファイル入力で以下のJSON書式を想定しています．
 [
@@ -15,7 +15,7 @@
 【出力】評価結果は標準出力で以下のJSON書式です．
 {
     "success": true,    // スコア計算が成功したかどうか
-    "rep_score": float, // 代表スコア（ROUGE-1-R 内容語のマクロ平均）
+    "rep_score": float, // 代表スコア（ROUGE-1-R 内容語（--no-mecabでは文字）のマクロ平均）
     "macro_ave": {
         "available_rate": {                   // 有効回答率
             "QA": float
@@ -41,25 +41,85 @@
             "A": {"available: bool, "R1": ..., "R2": ..., }   // Aのみ
         },
         ...
+    ],
+    "errors": [         // 評価に失敗したインスタンス（失敗がある場合のみ．successはfalseになります）
+        {"ID": ..., "error": string},
+        ...
     ]
 }
+評価に失敗したインスタンスは記録して評価を続け，スコアは評価できたインスタンスのみで計算します．
+スコアは語のとり方（内容語，短単位（原形），短単位（表層形），文字）ごとに出力します．
+文字はMeCabを用いず，要約をNFKC正規化して空白類を除いた文字を1語とします．文字の語IDは文字コードから配列演算で求めます．
+文字のROUGEは-eによらずnativeで計算し，-e perlでもROUGE-1.5.5.plの呼び出しを増やしません（値は同じです）．
+--no-mecabを指定すると，MeCab（-d）を用いずに文字のスコアのみを計算します．提出時の確認等に用います．
+--no-mecabではROUGEをnativeで計算し（-eの省略時），ROUGE-1.5.5.pl（Perl）も用いません．-e perlとは同時に指定できません．
+
+【チェックポイント】-cを指定すると，評価済みのインスタンスを1件1行のJSON Lines形式でファイルに追記します．
+1行目は{"header": {"version": ..., "rouge_engine": ..., ("no_mecab": true)}}，以降は"ins"の要素か{"ID": ..., "error": string}です．
+--resumeを指定すると，記録済みで評価に成功したインスタンスを評価せずに再開します．
+
+【インスタンスごとの出力】-oを指定すると，"ins"の要素を標準出力に含めず，評価を終えたものから順にファイルに出力します．
+--ins-formatで書式を指定します．
+・ndjson：1件1行のJSON（"ins"の要素と同じ書式）を評価を終えるごとに書き出します．
+・columnar：列ごとの配列をnumpyの.npz形式で書き出します．列名は"ID"，"Q/available"，"Q/ROUGE-1-R/内容語"等です．
+  Aのスコアは答弁ごとの値を連結した配列で，"A/n"（インスタンスごとの答弁数）で区切ります．
+評価結果（"ins"以外）は標準出力に出力し，インスタンスごとの評価結果はメモリに保持しません．
+
+【区切りの対応付け】--segmentsを指定すると，Training-Unsegmentedのように〔1〕〔2〕…の印で複数の論点をまとめた要約を
+印で区切り，評価対象の区切りを正解の区切りに1対1で対応付けてから評価します．
+対応付けは，区切りの組ごとの内容語の1-gram・2-gramの一致数によるDice係数の行列から，和が最大となる割り当てを
+ハンガリアン法で求めます．正解の区切りごとに対応付けた評価対象の区切り（対応するものがない場合は空文字列）との
+ROUGEスコアを計算し，その平均を質問・答弁ごとのスコアとします．対応付けられなかった評価対象の区切りは数えません．
+印のない要約は全体を1つの区切りとするため，印のないデータでは--segmentsを指定しない場合と同じ結果になります．
+有効回答のチェックは印を含む要約全体の文字数で行います．
+
+【複数の正解】--referencesに別に作成した正解の要約のGSデータ（同じ書式・ID）を指定すると，GSデータの要約とあわせて
+複数の正解として評価します．--referencesのデータにIDがないインスタンスはGSデータの正解のみで評価します．
+--scoring-formulaで，正解ごとの一致数の和から計算するか（average：ROUGE-1.5.5.plの-f A），
+スコア種別ごとに正解単位のスコアが最大の正解のみで計算するか（best：-f B）を指定します．
+-e nativeでは，正解の要約ごとのn-gram・skip-bigramの出現数やLCSの分母等を語のとり方ごとに1回だけ求めて保持し，
+評価対象をまたいで使い回します．--segmentsとは同時に指定できません．
+
+【分割評価】--shard i/Nを指定すると，評価対象データをN等分したi番目（0始まり）の範囲のみを評価し，
+以下のJSON書式で集計途中の値を出力します．N個の出力をpoliinfo2_eval.py mergeで統合すると，
+1台で評価した場合と同じ"macro_ave"が得られます（"ins"は出力しません）．
+{
+    "success": true,
+    "task": "summarization",
+    "version": string,
+    "rouge_engine": string,
+    "segments": true,   // --segmentsを指定した場合のみ
+    "no_mecab": true,   // --no-mecabを指定した場合のみ
+    "shard": [i, N],
+    "stats": {...},     // インスタンス数とスコアの和（和は"仮数p指数"：仮数（16進）×2**指数の正確な値）
+    "errors": [...]
+}
 
-更新：2020.07.06
+更新：2026.10.19
 作成者：乙武 北斗
 """
 
+import os
 import sys
 import argparse
 import json
-import MeCab
 import re
 import math
 import fileinput
+import unicodedata
 import numpy as np
+from array import array
 from collections import defaultdict
 from rouge.pythonrouge import Pythonrouge
+from rouge.nativerouge import NativeRouge, scoring_formulas
 from typing import Dict, Tuple, Optional, TypeVar, List, Union
-from tqdm import tqdm
+
+# 分割の指定（--shard i/N）の解釈はEntity Linkingの評価スクリプト（標準ライブラリのみを用います）と共通です
+ENTITY_EVAL_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                '..', '..', 'EntityLinking', 'EvalScript'))
+if ENTITY_EVAL_DIR not in sys.path:
+    sys.path.append(ENTITY_EVAL_DIR)
+from poliinfo2_eval_entity import parse_shard
 
 # データバージョン
 DATA_VERSION = 'v20200708'
@@ -71,6 +131,22 @@ old_id_prefix = [
 
 T = TypeVar('T')
 
+# 語のとり方
+extract_types = ['内容語', '短単位（原形）', '短単位（表層形）', '文字']
+
+# MeCabを用いない語のとり方（--no-mecab）．ROUGEは-eによらずnativeで計算します
+char_extract_types = ['文字']
+
+# 文字の語ID（文字コード）に加える値．Tokenizerの語IDと重ならないようにします
+CHAR_ID_BASE = 1 << 30
+
+# ROUGEスコア種別
+rouge_types = ['ROUGE-1', 'ROUGE-2', 'ROUGE-3',
+               'ROUGE-4', 'ROUGE-L', 'ROUGE-SU4', 'ROUGE-W-1.2']
+
+# ROUGEの計算方法（perl：ROUGE-1.5.5.pl，native：同じ値をPythonで計算）
+rouge_engines = {'perl': Pythonrouge, 'native': NativeRouge}
+
 functional_verbs = {"為る", "居る", "成る", "有る"}
 content_words = ["助詞", "助動詞", "感動詞", "空白", "補助記号", "記号-一般"]
 adverbial_nouns = {"所", "為", "くらい"}
@@ -81,6 +157,10 @@ numeral_notation2_regex = re.compile(
     r'([^千百十]*千)?([^千百十]*百)?([^千百十]*十)?([^千百十]*)')
 
 
+# 論点の区切りの印（〔1〕〔2〕…）
+segment_regex = re.compile(r'〔[0-9０-９]+〕')
+
+
 class DSInstance(object):
     def __init__(self, json_obj: dict):
         self.id: str = json_obj['ID']
@@ -99,6 +179,10 @@ class DSInstance(object):
         self.answer_length: List[int] = json_obj['AnswerLength']
         self.answer_starting_line: List[int] = json_obj['AnswerStartingLine']
         self.answer_ending_line: List[int] = json_obj['AnswerEndingLine']
+        # 解析済みの正解の要約の語IDの列（質問, 答弁のリスト）．共有メモリに配置したGSデータ等で設定します
+        self.words: Optional[Tuple[tuple, List[tuple]]] = None
+        # 別の正解（--references）．要約のみを用います
+        self.alternatives: List['DSInstance'] = []
 
 
 class EvalInstance(object):
@@ -123,9 +207,189 @@ class EvalInstance(object):
             'A': self.a
         }
 
+    @staticmethod
+    def fromDict(obj: dict) -> 'EvalInstance':
+        ev = EvalInstance(obj['ID'])
+        ev.qa = obj['QA']
+        ev.q = obj['Q']
+        ev.a = obj['A']
+        return ev
+
+
+class Checkpoint(object):
+    """評価済みのインスタンスを追記型のJSON Linesファイルに記録します．"""
+
+    def __init__(self, path: str, rouge_engine: str, resume: bool = False, interval: int = 10,
+                 segments: bool = False, references: Optional[dict] = None, no_mecab: bool = False):
+        self.path: str = path
+        self.interval: int = interval
+        self.header: dict = {'version': DATA_VERSION, 'rouge_engine': rouge_engine}
+        if segments:
+            self.header['segments'] = True
+        if references:
+            self.header['references'] = references
+        if no_mecab:
+            self.header['no_mecab'] = True
+        # 記録済みで評価に成功したインスタンス
+        self.done: Dict[str, EvalInstance] = {}
+        self.pending: int = 0
+        if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.load()
+            self.f = open(path, 'a')
+        else:
+            self.f = open(path, 'w')
+            self.write({'header': self.header})
+            self.flush()
+
+    def load(self):
+        # 書き込み途中で中断した末尾の行は捨てます
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        lines = data[:end].decode('utf-8').splitlines()
+        if len(lines) == 0 or json.loads(lines[0]).get('header') != self.header:
+            raise Exception(f'チェックポイントの評価条件が一致しません．(path={self.path})')
+        for line in lines[1:]:
+            obj = json.loads(line)
+            if 'error' in obj:
+                # 失敗したインスタンスは再開時に評価し直します
+                self.done.pop(obj['ID'], None)
+            else:
+                self.done[obj['ID']] = EvalInstance.fromDict(obj)
+
+    def write(self, obj: dict):
+        self.f.write(json.dumps(obj, ensure_ascii=False) + '\n')
+        self.pending += 1
+        if self.pending >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self.f.flush()
+        self.pending = 0
+
+    def add(self, ev: EvalInstance):
+        self.write(ev.toDict())
+
+    def add_error(self, ins_id: str, error: str):
+        self.write({'ID': ins_id, 'error': error})
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+class NDJSONWriter(object):
+    """インスタンスごとの評価結果を1件1行のJSONとして逐次書き出します．"""
+
+    def __init__(self, path: str):
+        self.f = open(path, 'w')
+
+    def write(self, ev: EvalInstance):
+        self.f.write(json.dumps(ev.toDict(), ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.f.close()
+
+
+class ColumnarWriter(object):
+    """インスタンスごとの評価結果を列ごとの配列にまとめ，numpyの.npz形式で書き出します．"""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.ids: List[str] = []
+        self.columns: Dict[str, array] = {}
+
+    def column(self, name: str, typecode: str) -> array:
+        col = self.columns.get(name)
+        if col is None:
+            col = self.columns[name] = array(typecode)
+        return col
+
+    def write(self, ev: EvalInstance):
+        self.ids.append(ev.id)
+        types = list(ev.q[f'{rouge_types[0]}-R'].keys())
+        self.column('A/n', 'l').append(len(ev.a[f'{rouge_types[0]}-R'][types[0]]))
+        for t in ['QA', 'Q', 'A']:
+            self.column(f'{t}/available', 'b').append(ev[t]['available'])
+            for st in ['R', 'F']:
+                for rt in rouge_types:
+                    for et in types:
+                        col = self.column(f'{t}/{rt}-{st}/{et}', 'd')
+                        if t != 'A':
+                            col.append(ev[t][f'{rt}-{st}'][et])
+                        else:
+                            col.extend(ev[t][f'{rt}-{st}'][et])
+
+    def close(self):
+        columns = {'ID': np.array(self.ids)}
+        for name, col in self.columns.items():
+            columns[name] = np.frombuffer(col, dtype=col.typecode)
+            if name.endswith('/available'):
+                columns[name] = columns[name].astype(bool)
+        # np.savezは拡張子.npzを補うため，ファイルオブジェクトに書き出します
+        with open(self.path, 'wb') as f:
+            np.savez(f, **columns)
+
+
+# インスタンスごとの出力の書式
+ins_writers = {'ndjson': NDJSONWriter, 'columnar': ColumnarWriter}
+
+
+class ExactSum(object):
+    """浮動小数点数の和を丸め誤差なしで保持します．
+
+    和は2**-1074（倍精度の最小の単位）を単位とする整数で保持するため，加える順序や分割評価の統合に
+    よらず同じ値になります．nan / infは別に加算します．
+    分割評価の出力には，和を奇数の仮数と2の指数に分けた16進の文字列（"仮数p指数"．float.hexと同じく指数は10進）で書き，
+    末尾の0を省きます．
+    """
+    SCALE = 1074
+
+    def __init__(self, value: int = 0, special: float = 0.0):
+        self.value: int = value
+        self.special: float = special
+
+    def __iadd__(self, x) -> 'ExactSum':
+        if isinstance(x, ExactSum):
+            self.value += x.value
+            self.special += x.special
+        elif math.isfinite(x):
+            # 分母は2の冪です
+            n, d = float(x).as_integer_ratio()
+            self.value += n << (ExactSum.SCALE - d.bit_length() + 1)
+        else:
+            self.special += x
+        return self
+
+    def __float__(self) -> float:
+        return self.value / (1 << ExactSum.SCALE) + self.special
+
+    def __truediv__(self, n: int) -> float:
+        return float(self) / n
+
+    def toStr(self) -> str:
+        if self.special != 0:
+            return repr(self.special)
+        if self.value == 0:
+            return '0'
+        e = (self.value & -self.value).bit_length() - 1
+        return '{0:x}p{1}'.format(self.value >> e, e - ExactSum.SCALE)
+
+    @staticmethod
+    def fromStr(s: str) -> 'ExactSum':
+        if s in ('nan', 'inf', '-inf'):
+            return ExactSum(0, float(s))
+        if 'p' not in s:
+            return ExactSum(int(s, 16))
+        m, e = s.split('p')
+        return ExactSum(int(m, 16) << (int(e) + ExactSum.SCALE))
+
 
 class Stats(object):
     def __init__(self, rouge_types: List[str], extract_types: List[str]):
+        self.extract_types: List[str] = extract_types
         self.n_t: int = 0
         self.n_a: Dict[str, int] = {
             'QA': 0,
@@ -144,13 +408,67 @@ class Stats(object):
         }
 
     @staticmethod
-    def init_dic(rouge_types: List[str], extract_types: List[str]) -> Dict[str, Dict[str, float]]:
+    def init_dic(rouge_types: List[str], extract_types: List[str]) -> Dict[str, Dict[str, ExactSum]]:
         ret = {}
         for st in ['R', 'F']:
             for rt in rouge_types:
-                ret[f'{rt}-{st}'] = {et: 0.0 for et in extract_types}
+                ret[f'{rt}-{st}'] = {et: ExactSum() for et in extract_types}
         return ret
 
+    def add(self, ev: EvalInstance):
+        self.n_t += 1
+        for t in ['QA', 'Q', 'A']:
+            self.n_a[t] += ev[t]['available']
+            for st in ['R', 'F']:
+                for rt in rouge_types:
+                    for et in self.extract_types:
+                        if t != 'A':
+                            self.score_sum_t[t][f'{rt}-{st}'][et] += ev[t][f'{rt}-{st}'][et]
+                        else:
+                            self.score_sum_t[t][f'{rt}-{st}'][et] += np.average(ev[t][f'{rt}-{st}'][et])
+            if ev[t]['available']:
+                for st in ['R', 'F']:
+                    for rt in rouge_types:
+                        for et in self.extract_types:
+                            if t != 'A':
+                                self.score_sum_a[t][f'{rt}-{st}'][et] += ev[t][f'{rt}-{st}'][et]
+                            else:
+                                self.score_sum_a[t][f'{rt}-{st}'][et] += np.average(ev[t][f'{rt}-{st}'][et])
+
+    def merge(self, other: 'Stats'):
+        self.n_t += other.n_t
+        for t in ['QA', 'Q', 'A']:
+            self.n_a[t] += other.n_a[t]
+            for k, v in other.score_sum_a[t].items():
+                for et, x in v.items():
+                    self.score_sum_a[t][k][et] += x
+            for k, v in other.score_sum_t[t].items():
+                for et, x in v.items():
+                    self.score_sum_t[t][k][et] += x
+
+    def toDict(self) -> dict:
+        def sums(dic):
+            return {t: {k: {et: x.toStr() for et, x in v.items()} for k, v in d.items()}
+                    for t, d in dic.items()}
+        return {
+            'n_t': self.n_t,
+            'n_a': self.n_a,
+            'score_sum_a': sums(self.score_sum_a),
+            'score_sum_t': sums(self.score_sum_t)
+        }
+
+    @staticmethod
+    def fromDict(obj: dict) -> 'Stats':
+        def sums(dic):
+            return {t: {k: {et: ExactSum.fromStr(x) for et, x in v.items()} for k, v in d.items()}
+                    for t, d in dic.items()}
+        stats = Stats(rouge_types, list(obj['score_sum_a']['QA'][f'{rouge_types[0]}-R'].keys()))
+        stats.n_t = obj['n_t']
+        stats.n_a = dict(obj['n_a'])
+        stats.score_sum_a = sums(obj['score_sum_a'])
+        stats.score_sum_t = sums(obj['score_sum_t'])
+        return stats
+
 
 def nonEmpty(s: str) -> bool:
     return s is not None and s != ''
@@ -195,7 +513,7 @@ def get_args():
 【出力】評価結果は標準出力で以下のJSON書式です．
 {
     "success": true,    // スコア計算が成功したかどうか
-    "rep_score": float, // 代表スコア（ROUGE-1-R 内容語のマクロ平均）
+    "rep_score": float, // 代表スコア（ROUGE-1-R 内容語（--no-mecabでは文字）のマクロ平均）
     "macro_ave": {
         "available_rate": {                   // 有効回答率
             "QA": float
@@ -221,6 +539,10 @@ def get_args():
             "A": {"available: bool, "R1": ..., "R2": ..., }   // Aのみ
         },
         ...
+    ],
+    "errors": [         // 評価に失敗したインスタンス（失敗がある場合のみ）
+        {"ID": ..., "error": string},
+        ...
     ]
 }""")
 
@@ -235,12 +557,74 @@ def get_args():
                         )
 
     parser.add_argument('-d', '--unidic-path',
-                        required=True,
-                        help='MeCabで用いるUnidicのパスを指定します'
+                        default=None,
+                        help='MeCabで用いるUnidicのパスを指定します（--no-mecabを指定しない場合は必須です）'
+                        )
+
+    parser.add_argument('--no-mecab',
+                        action='store_true',
+                        help='MeCabを用いずに，語のとり方が文字のスコアのみを計算します'
+                        )
+
+    parser.add_argument('-e', '--rouge-engine',
+                        choices=list(rouge_engines.keys()), default=None,
+                        help='ROUGEの計算方法を指定します（native：ROUGE-1.5.5.plを呼び出さずに同じ値を計算します．'
+                             '省略時はperl，--no-mecabではnativeです）'
+                        )
+
+    parser.add_argument('-c', '--checkpoint',
+                        default=None,
+                        help='評価済みのインスタンスを追記するチェックポイントファイルを指定します'
+                        )
+
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='チェックポイントファイルに記録済みのインスタンスを評価せずに再開します'
+                        )
+
+    parser.add_argument('--checkpoint-interval',
+                        type=int, default=10,
+                        help='チェックポイントファイルに書き出すインスタンス数の間隔を指定します'
+                        )
+
+    parser.add_argument('-o', '--ins-output',
+                        default=None,
+                        help='インスタンスごとの評価結果（"ins"）を標準出力に含めず，評価を終えたものから順に出力するファイルを指定します'
+                        )
+
+    parser.add_argument('--ins-format',
+                        choices=list(ins_writers.keys()), default='ndjson',
+                        help='インスタンスごとの評価結果の書式を指定します（ndjson：1件1行のJSON，columnar：列ごとの配列（.npz））'
+                        )
+
+    parser.add_argument('--segments',
+                        action='store_true',
+                        help='〔1〕〔2〕…の印で区切った要約（Unsegmented）を，区切りごとに正解と対応付けて評価します'
+                        )
+
+    parser.add_argument('--references',
+                        nargs='+', default=None,
+                        help='正解の要約を別に作成したGSデータ（同じ書式・ID）を指定し，複数の正解で評価します'
+                        )
+
+    parser.add_argument('--scoring-formula',
+                        choices=scoring_formulas, default='average',
+                        help='正解が複数の場合の計算方法を指定します（average：一致数の和，best：最も一致する正解）'
+                        )
+
+    parser.add_argument('--shard',
+                        type=parse_shard, default=None,
+                        help='評価対象データをN等分したi番目（0始まり）のみを評価し，集計途中の値を出力します（i/N）'
                         )
 
     return parser.parse_args()
 
+def shard_slice(items: List[T], shard: Tuple[int, int]) -> List[T]:
+    """itemsをN等分したi番目の連続する範囲を返します．"""
+    i, n = shard
+    return items[len(items) * i // n:len(items) * (i + 1) // n]
+
+
 def load_json_todic(json_str: str) -> Dict[str, DSInstance]:
     return {x['ID']: DSInstance(x) for x in json.loads(json_str)}
 
@@ -248,10 +632,24 @@ def load_json(json_str: str) -> List[DSInstance]:
     return [DSInstance(x) for x in json.loads(json_str)]
 
 
-def word2ids(summary: List[str], reference: List[str]) -> Tuple[List[List[str]], List[List[List[str]]]]:
+def load_references(gss: Dict[str, DSInstance], paths: List[str]):
+    """別の正解のGSデータを読み込み，GSデータの同じIDのインスタンスの別の正解に加えます．"""
+    for path in paths:
+        with open(path) as f:
+            refs = load_json_todic(f.read())
+        for ins_id, ref in refs.items():
+            gs = gss.get(ins_id)
+            if gs is None:
+                raise Exception(f'別の正解のIDがGSデータ上で見つかりません．(id={ins_id}, path={path})')
+            if len(ref.answer_summary) != len(gs.answer_summary):
+                raise Exception(f'別の正解の答弁数がGSデータと異なります．(id={ins_id}, path={path})')
+            gs.alternatives.append(ref)
+
+
+def word2ids(summary: List[str], references: List[List[str]]) -> Tuple[List[List[str]], List[List[List[str]]]]:
     id_dict = defaultdict(lambda: len(id_dict))
     rsummary = [[' '.join([str(id_dict[w]) for w in summary])]]
-    rreference = [[[' '.join([str(id_dict[w]) for w in reference])]]]
+    rreference = [[[' '.join([str(id_dict[w]) for w in reference])] for reference in references]]
     # summary = [[' '.join([str(id_dict[w]) for w in sent.split()])
     #             for sent in doc] for doc in summary]
     # reference = [[[' '.join([str(id_dict[w]) for w in sent.split()])
@@ -400,128 +798,393 @@ def extract_all_words(mecab, s: str, is_original: bool) -> List[str]:
     return ret
 
 
-def main():
-    args = get_args()
-    mecab = MeCab.Tagger('-d {0}'.format(args.unidic_path))
+class Tokenizer(object):
+    """MeCabの解析結果を語ID（表層形・原形・品詞）の配列として保持し，語のとり方3種類の語を1回の解析から求めます．
+
+    文字列は語IDに置き換えて保持し，品詞の判定は品詞ごとに1回だけ行います．
+    求めた語は文字列ごとにキャッシュするため，GSデータの要約等は繰り返し解析しません．
+    ROUGEの正解側の統計（-e native）も語IDの列ごとに保持します．語IDはTokenizerごとに異なるため，Tokenizerをまたいで共有しません．
+    MeCabの出力に表層形・原形・品詞の列がない行を含む文字列は，extract_words / extract_all_wordsで求めます．
+    文字の語IDはchar_idsで求めます．
+    常駐して繰り返し評価する場合は，GSデータの要約を解析した後にsnapshotで状態を記録し，評価ごとにrestoreで戻すと，
+    GSデータの解析結果を残したまま評価対象の語の分だけ表が増え続けることを防げます．
+    """
+    extract_types: List[str] = extract_types
+
+    def __init__(self, mecab, cache_size: int = 100000):
+        self.mecab = mecab
+        self.cache_size: int = cache_size
+        self.cache: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        # 品詞の語ID→(名詞的か, 数詞か, 内容語か)
+        self.pos_flags: Dict[int, Tuple[bool, bool, bool]] = {}
+        # 正解の語IDの列→ReferenceStats（GSデータの要約の数に比例するため，消去しません）
+        self.references: Dict[Tuple[int, ...], object] = {}
+
+    def snapshot(self) -> Tuple[int, dict]:
+        """restoreで戻す状態（語IDの数と，文字列ごとのキャッシュの写し）を返します．"""
+        return len(self.strings), dict(self.cache)
+
+    def restore(self, snapshot: Tuple[int, dict]):
+        """snapshotの時点より後に作成した語IDと，それを含むキャッシュ・正解の統計を捨てます．"""
+        num_strings, cache = snapshot
+        for s in self.strings[num_strings:]:
+            del self.ids[s]
+        del self.strings[num_strings:]
+        self.cache = dict(cache)
+        self.pos_flags = {k: v for k, v in self.pos_flags.items() if k < num_strings}
+        # 語IDの列は語IDのみか文字の語IDのみからなります
+        self.references = {k: v for k, v in self.references.items()
+                           if len(k) == 0 or max(k) < num_strings or min(k) >= CHAR_ID_BASE}
+
+    def intern(self, s: str) -> int:
+        ret = self.ids.get(s)
+        if ret is None:
+            ret = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return ret
 
-    # 語のとり方
-    extract_types = ['内容語', '短単位（原形）', '短単位（表層形）']
+    def tokens(self, s: str) -> Optional[Tuple[array, array, array]]:
+        """(表層形, 原形, 品詞)の語IDの配列を返します．列が足りない行を含む場合はNoneを返します．"""
+        intern = self.intern
+        surfaces = array('l')
+        lemmas = array('l')
+        poses = array('l')
+        for line in self.mecab.parse(s).splitlines():
+            if line == 'EOS':
+                continue
+            tmp = line.split('\t')
+            if len(tmp) < 5:
+                return None
+            surfaces.append(intern(tmp[0]))
+            lemmas.append(intern(tmp[3]))
+            poses.append(intern(tmp[4]))
+        return surfaces, lemmas, poses
+
+    def flags(self, pos_id: int) -> Tuple[bool, bool, bool]:
+        ret = self.pos_flags.get(pos_id)
+        if ret is None:
+            pos = self.strings[pos_id]
+            ret = self.pos_flags[pos_id] = (is_noun(pos, ''), is_numeral(pos), is_content_word(pos))
+        return ret
 
-    # ROUGEスコア種別
-    rouge_types = ['ROUGE-1', 'ROUGE-2', 'ROUGE-3',
-                   'ROUGE-4', 'ROUGE-L', 'ROUGE-SU4', 'ROUGE-W-1.2']
+    def content_words(self, surfaces: array, lemmas: array, poses: array) -> List[int]:
+        """extract_wordsと同じ語を語IDで返します．"""
+        strings = self.strings
+        ret = []
+        compound_nouns = []
+        numerals = []
+
+        def append(term: str):
+            if term not in functional_verbs:
+                ret.append(self.intern(term))
+
+        def extract_compound_noun():
+            if len(compound_nouns) > 0:
+                append(''.join(compound_nouns))
+                compound_nouns.clear()
+
+        def extractNumeral():
+            if len(numerals) > 0:
+                x = parse_kanji_numerals(''.join(numerals))
+                if x is not None:
+                    compound_nouns.append(str(x))
+                numerals.clear()
+
+        for sf, lm, pos in zip(surfaces, lemmas, poses):
+            noun, numeral, content = self.flags(pos)
+            surface = strings[sf]
+            if noun and surface not in adverbial_nouns and surface not in formal_nouns:
+                if numeral:
+                    numerals.append(strings[lm].strip())
+                else:
+                    extractNumeral()
+                    compound_nouns.append(strings[lm].strip())
+            else:
+                extractNumeral()
+                extract_compound_noun()
+                if content:
+                    append(strings[lm].strip())
 
-    # GS読み込み
-    with open(args.gs_data) as f:
-        gss = load_json_todic(f.read())
+        extractNumeral()
+        extract_compound_noun()
+        return ret
 
-    # 評価対象読み込み
-    with open(args.input_file) as f:
-        targets = load_json(f.read())
-    
+    def words(self, s: str) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """extract_types（内容語 / 短単位（原形） / 短単位（表層形） / 文字）の順に語IDの列を返します．"""
+        ret = self.cache.get(s)
+        if ret is not None:
+            return ret
+        tokens = self.tokens(s)
+        if tokens is not None:
+            ret = (self.content_words(*tokens), list(tokens[1]), list(tokens[0]), char_ids(s))
+        else:
+            ret = tuple([self.intern(w) for w in words] for words in [
+                extract_words(self.mecab, s),
+                extract_all_words(self.mecab, s, False),
+                extract_all_words(self.mecab, s, True)
+            ]) + (char_ids(s),)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[s] = ret
+        return ret
+
+
+def char_ids(s: str) -> List[int]:
+    """NFKC正規化して空白類を除いた文字の語ID（文字コード + CHAR_ID_BASE）の列を返します．"""
+    s = ''.join(unicodedata.normalize('NFKC', s).split())
+    return (np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32).astype(np.int64) + CHAR_ID_BASE).tolist()
+
+
+class CharTokenizer(object):
+    """MeCabを用いずに，語のとり方が文字の語IDの列のみを求めます（--no-mecab）．Tokenizerの代わりに用います．"""
+    extract_types: List[str] = char_extract_types
+
+    def __init__(self):
+        # 正解の語IDの列→ReferenceStats
+        self.references: Dict[Tuple[int, ...], object] = {}
+
+    def words(self, s: str) -> Tuple[List[int]]:
+        return (char_ids(s),)
+
+
+def as_tokenizer(mecab) -> Union[Tokenizer, CharTokenizer]:
+    """MeCabのTaggerをTokenizerにします．TokenizerとCharTokenizerはそのまま返します．"""
+    return mecab if isinstance(mecab, (Tokenizer, CharTokenizer)) else Tokenizer(mecab)
+
+
+def check_targets(targets: List[DSInstance]):
     # 古いIDチェック
     if len(targets) > 0:
         if any([targets[0].id.startswith(prefix) for prefix in old_id_prefix]):
             raise Exception('入力データのIDが古いバージョンになっています．')
 
-    # 評価結果リスト
-    evals: List[EvalInstance] = []
 
-    # 評価データ各々に対して
-    for target in tqdm(targets, total=len(targets)):
-    #for target, gs in [(x, y) for x, y in zip(targets, gss)][:1]:
-        target: DSInstance
-        gs: DSInstance = gss.get(target.id)
-
-        # IDチェック
-        if gs is None:
-            raise Exception(f'入力データのIDがGSデータ上で見つかりません．(id={target.id})')
-
-        ev = EvalInstance(gs.id)
-
-        extracted_Qsummaries: List[List[str]] = [
-            extract_words(mecab, target.question_summary),
-            extract_all_words(mecab, target.question_summary, False),
-            extract_all_words(mecab, target.question_summary, True)
-        ]
-        extracted_Qreferences: List[List[str]] = [
-            extract_words(mecab, gs.question_summary),
-            extract_all_words(mecab, gs.question_summary, False),
-            extract_all_words(mecab, gs.question_summary, True)
-        ]
-        w2isQ = [word2ids(x, y) for x, y in zip(
-            extracted_Qsummaries, extracted_Qreferences)]
-        rougesQ = []
-
-        extracted_Asummaries: List[List[List[str]]] = [[
-            extract_words(mecab, x),
-            extract_all_words(mecab, x, False),
-            extract_all_words(mecab, x, True)
-        ] for x in target.answer_summary]
-        extracted_Areferences: List[List[List[str]]] = [[
-            extract_words(mecab, x),
-            extract_all_words(mecab, x, False),
-            extract_all_words(mecab, x, True)
-        ] for x in gs.answer_summary]
-        w2isA = [[word2ids(x, y) for x, y in zip(s, r)] for s, r in zip(
-            extracted_Asummaries, extracted_Areferences)]
-        rougesA = [[] for i in range(len(w2isA))]
-
-        # Question ROUGE計算
-        for i in range(len(w2isQ)):
-            rougesQ.append(Pythonrouge(summary_file_exist=False,
-                                       summary=w2isQ[i][0], reference=w2isQ[i][1],
-                                       n_gram=4, ROUGE_SU4=True, ROUGE_L=True, ROUGE_W=True))
-        scoresQ = [rouge.calc_score() for rouge in rougesQ]
-
-        # Answer ROUGE計算
-        scoresA = []
-        for i in range(len(w2isA)):
-            for j in range(len(w2isA[i])):
-                rougesA[i].append(Pythonrouge(summary_file_exist=False,
-                                              summary=w2isA[i][j][0], reference=w2isA[i][j][1],
-                                              n_gram=4, ROUGE_SU4=True, ROUGE_L=True, ROUGE_W=True))
-            scoresA.append([rouge.calc_score() for rouge in rougesA[i]])
-
-        # 有効回答（文字長）のチェック
-        if len(target.question_summary) <= target.question_length:
-            ev.q['available'] = True
-        if all([len(sm) <= l for sm, l in zip(target.answer_summary, target.answer_length)]):
-            ev.a['available'] = True
-        ev.qa['available'] = ev.q['available'] and ev.a['available']
-
-        # スコアの記録
-        for st in ['R', 'F']:
-            for rt in rouge_types:
-                ev.q[f'{rt}-{st}'] = {extract_types[i]: scoresQ[i][f'{rt}-{st}']
-                                      for i in range(len(extract_types))}
-                ev.a[f'{rt}-{st}'] = {extract_types[i]: [sc[i][f'{rt}-{st}'] for sc in scoresA]
-                                      for i in range(len(extract_types))}
-                ev.qa[f'{rt}-{st}'] = {extract_types[i]: np.average([v for v in ev.a[f'{rt}-{st}'][extract_types[i]]] + [ev.q[f'{rt}-{st}'][extract_types[i]]])
-                                       for i in range(len(extract_types))}
-        evals.append(ev)
+def tokenize_instance(tokenizer, target: DSInstance, gs: DSInstance) -> Tuple[list, list]:
+    """語のとり方ごとに，評価対象と正解（別の正解を含む）の要約を語IDの列に変換し，
+    (評価対象の語IDの列, [正解の語IDの列, ...])の組を返します．tokenizerにはMeCabのTagger，CharTokenizerも指定できます．
+    正解の要約の語IDの列（gs.words）が設定されている場合は解析し直しません．
+    """
+    tokenizer = as_tokenizer(tokenizer)
+    extracted_Qsummaries = tokenizer.words(target.question_summary)
+    if gs.words is not None:
+        extracted_Qreferences, extracted_Areferences = gs.words
+    else:
+        extracted_Qreferences = tokenizer.words(gs.question_summary)
+        extracted_Areferences = [tokenizer.words(x) for x in gs.answer_summary]
+    alternativesQ = [tokenizer.words(alt.question_summary) for alt in gs.alternatives]
+    w2isQ = [(x, [y] + [alt[i] for alt in alternativesQ]) for i, (x, y) in enumerate(zip(
+        extracted_Qsummaries, extracted_Qreferences))]
+
+    extracted_Asummaries = [tokenizer.words(x) for x in target.answer_summary]
+    w2isA = []
+    for j, (s, r) in enumerate(zip(extracted_Asummaries, extracted_Areferences)):
+        alternativesA = [tokenizer.words(alt.answer_summary[j]) for alt in gs.alternatives]
+        w2isA.append([(x, [y] + [alt[i] for alt in alternativesA]) for i, (x, y) in enumerate(zip(s, r))])
+    return w2isQ, w2isA
+
+
+def rouge_score(summary: List[int], references: List[List[int]], rouge_engine: str = 'perl',
+                scoring_formula: str = 'average', cache: Optional[dict] = None) -> dict:
+    """評価対象と正解（1件以上）の語IDの列からROUGEスコアを計算します．
+    nativeでは正解の統計（ReferenceStats）を求め，cacheを指定すると同じ語IDの列の統計は使い回します．
+    """
+    if rouge_engine == 'native':
+        rouge = NativeRouge(n_gram=4, ROUGE_SU4=True, ROUGE_L=True, ROUGE_W=True, scoring_formula=scoring_formula)
+        stats = []
+        for reference in references:
+            if cache is None:
+                stats.append(rouge.reference_stats([reference]))
+                continue
+            key = tuple(reference)
+            ref = cache.get(key)
+            if ref is None:
+                ref = cache[key] = rouge.reference_stats([reference])
+            stats.append(ref)
+        return rouge.score(rouge.prepare([summary]), stats)
+
+    rsummary, rreference = word2ids(summary, references)
+    return rouge_engines[rouge_engine](summary_file_exist=False, summary=rsummary, reference=rreference,
+                                       n_gram=4, ROUGE_SU4=True, ROUGE_L=True, ROUGE_W=True,
+                                       scoring_formula=scoring_formula).calc_score()
+
+
+def score_instance(w2isQ: list, w2isA: list, rouge_engine: str = 'perl', scoring_formula: str = 'average',
+                   cache: Optional[dict] = None,
+                   types: List[str] = extract_types) -> Tuple[List[dict], List[List[dict]]]:
+    """語のとり方ごとのROUGEスコアを計算します．cacheにはTokenizer.referencesを，typesには語のとり方
+    （Tokenizer.extract_types）を指定します．char_extract_typesの語のとり方は-eによらずnativeで計算します．
+    """
+    engines = ['native' if t in char_extract_types else rouge_engine for t in types]
+
+    # Question ROUGE計算
+    scoresQ = [rouge_score(x, y, engine, scoring_formula, cache) for engine, (x, y) in zip(engines, w2isQ)]
+
+    # Answer ROUGE計算
+    scoresA = [[rouge_score(x, y, engine, scoring_formula, cache) for engine, (x, y) in zip(engines, pairs)]
+               for pairs in w2isA]
+    return scoresQ, scoresA
+
+
+def split_segments(s: str) -> List[str]:
+    """〔1〕〔2〕…の印で要約を区切ります．印がない場合は全体を1つの区切りとします．"""
+    parts = segment_regex.split(s)
+    if len(parts) == 1:
+        return [s]
+    # 最初の印より前の文字列は，空白のみでなければ1つの区切りとします
+    return ([parts[0]] if parts[0].strip() != '' else []) + parts[1:]
+
+
+def ngram_codes(ids: List[int], width: int) -> np.ndarray:
+    """語IDの列の1-gram（x）と2-gram（(x + 1) * width + y）を整数の配列で返します．"""
+    a = np.array(ids, dtype=np.int64)
+    return np.concatenate([a, (a[:-1] + 1) * width + a[1:]])
+
+
+def overlap_matrix(summaries: List[List[int]], references: List[List[int]]) -> np.ndarray:
+    """評価対象と正解の区切りの組ごとに，1-gram・2-gramのクリップした一致数によるDice係数を返します．"""
+    width = max([max(x) for x in summaries + references if len(x) > 0], default=0) + 1
+    grams = [ngram_codes(x, width) for x in summaries + references]
+    _, inverse = np.unique(np.concatenate(grams), return_inverse=True)
+
+    # 区切り×n-gramの出現数の表をまとめて作ります
+    counts = np.zeros((len(grams), int(inverse.max(initial=-1)) + 1), dtype=np.int64)
+    rows = np.repeat(np.arange(len(grams)), [len(g) for g in grams])
+    np.add.at(counts, (rows, inverse), 1)
+    s = counts[:len(summaries)]
+    r = counts[len(summaries):]
+    overlap = np.minimum(s[:, None, :], r[None, :, :]).sum(axis=2)
+    size = s.sum(axis=1)[:, None] + r.sum(axis=1)[None, :]
+    return np.divide(2 * overlap, size, out=np.zeros(overlap.shape), where=size > 0)
+
+
+def linear_assignment(score: np.ndarray) -> List[Tuple[int, int]]:
+    """scoreの和が最大となる行と列の1対1の割り当て（小さい方の次元の数の組）をハンガリアン法で求めます．"""
+    transposed = score.shape[0] > score.shape[1]
+    cost = (-score.T if transposed else -score).tolist()
+    n = len(cost)
+    m = len(cost[0]) if n > 0 else 0
+    inf = float('inf')
+    # 行・列のポテンシャルと，列に割り当てた行（1始まり，0は未割り当て）
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # 増加路に沿って割り当てを入れ替えます
+        while j0 != 0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    pairs = [(match[j] - 1, j - 1) for j in range(1, m + 1) if match[j] != 0]
+    return sorted((j, i) if transposed else (i, j) for i, j in pairs)
+
+
+def align_segments(tokenizer: Tokenizer, summary: str, reference: str) -> List[Tuple[tuple, tuple]]:
+    """正解の区切りごとに，対応付けた評価対象の区切りとの語の組（語のとり方ごと）を返します．
+    対応付けは先頭の語のとり方（内容語．CharTokenizerでは文字）で行います．"""
+    summaries = [tokenizer.words(x) for x in split_segments(summary)]
+    references = [tokenizer.words(x) for x in split_segments(reference)]
+    if len(summaries) == 1 and len(references) == 1:
+        return [(summaries[0], references[0])]
+    aligned = [tuple([] for _ in x) for x in references]
+    if len(summaries) > 0 and len(references) > 0:
+        score = overlap_matrix([x[0] for x in summaries], [x[0] for x in references])
+        for i, j in linear_assignment(score):
+            aligned[j] = summaries[i]
+    return list(zip(aligned, references))
+
+
+def tokenize_instance_segments(tokenizer, target: DSInstance, gs: DSInstance) -> Tuple[list, list]:
+    """tokenize_instanceの区切りを対応付ける版です．質問と答弁ごとに，区切りの組ごとの語IDの列のリストを返します．"""
+    tokenizer = as_tokenizer(tokenizer)
+
+    def pairs(summary: str, reference: str) -> list:
+        return [[(x, [y]) for x, y in zip(s, r)] for s, r in align_segments(tokenizer, summary, reference)]
+
+    w2isQ = pairs(target.question_summary, gs.question_summary)
+    w2isA = [pairs(x, y) for x, y in zip(target.answer_summary, gs.answer_summary)]
+    return w2isQ, w2isA
+
+
+def score_instance_segments(w2isQ: list, w2isA: list, rouge_engine: str = 'perl',
+                            cache: Optional[dict] = None,
+                            types: List[str] = extract_types) -> Tuple[List[dict], List[List[dict]]]:
+    """区切りの組ごとにROUGEスコアを計算し，語のとり方ごとに平均します．"""
+    def score_pairs(pairs: list) -> List[dict]:
+        _, scores = score_instance([], pairs, rouge_engine, cache=cache, types=types)
+        return [{k: sum(sc[i][k] for sc in scores) / len(scores) for k in scores[0][i]}
+                for i in range(len(scores[0]))]
+
+    return score_pairs(w2isQ), [score_pairs(x) for x in w2isA]
+
+
+def eval_instance(target: DSInstance, gs: DSInstance, scoresQ: List[dict], scoresA: List[List[dict]],
+                  types: List[str] = extract_types) -> EvalInstance:
+    """スコアと有効回答のチェック結果を記録します．typesはスコアの並びに対応する語のとり方です．"""
+    ev = EvalInstance(gs.id)
+
+    # 有効回答（文字長）のチェック
+    if len(target.question_summary) <= target.question_length:
+        ev.q['available'] = True
+    if all([len(sm) <= l for sm, l in zip(target.answer_summary, target.answer_length)]):
+        ev.a['available'] = True
+    ev.qa['available'] = ev.q['available'] and ev.a['available']
+
+    # スコアの記録
+    for st in ['R', 'F']:
+        for rt in rouge_types:
+            ev.q[f'{rt}-{st}'] = {types[i]: scoresQ[i][f'{rt}-{st}']
+                                  for i in range(len(types))}
+            ev.a[f'{rt}-{st}'] = {types[i]: [sc[i][f'{rt}-{st}'] for sc in scoresA]
+                                  for i in range(len(types))}
+            ev.qa[f'{rt}-{st}'] = {types[i]: np.average([v for v in ev.a[f'{rt}-{st}'][types[i]]] + [ev.q[f'{rt}-{st}'][types[i]]])
+                                   for i in range(len(types))}
+    return ev
+
+
+def accumulate(evals: List[EvalInstance], types: List[str] = extract_types) -> Stats:
+    """インスタンスごとの評価結果から，インスタンス数とスコアの和を求めます．"""
+    stats = Stats(rouge_types, types)
+    for ev in evals:
+        stats.add(ev)
+    return stats
+
+
+def summarize(stats: Stats, evals: Optional[List[EvalInstance]] = None, errors: Optional[List[dict]] = None) -> dict:
+    """インスタンス数とスコアの和から，出力のJSONに相当する辞書を返します．evalsを省略すると"ins"を出力しません．"""
+    if errors and stats.n_t == 0:
+        return {'success': False, 'version': DATA_VERSION, 'errors': errors}
 
     # 全体スコアの計算
-    stats = Stats(rouge_types, extract_types)
-    for ev in evals:
-        stats.n_t += 1
-        for t in ['QA', 'Q', 'A']:
-            stats.n_a[t] += ev[t]['available']
-            for st in ['R', 'F']:
-                for rt in rouge_types:
-                    for et in extract_types:
-                        if t != 'A':
-                            stats.score_sum_t[t][f'{rt}-{st}'][et] += ev[t][f'{rt}-{st}'][et]
-                        else:
-                            stats.score_sum_t[t][f'{rt}-{st}'][et] += np.average(ev[t][f'{rt}-{st}'][et])
-            if ev[t]['available']:
-                for st in ['R', 'F']:
-                    for rt in rouge_types:
-                        for et in extract_types:
-                            if t != 'A':
-                                stats.score_sum_a[t][f'{rt}-{st}'][et] += ev[t][f'{rt}-{st}'][et]
-                            else:
-                                stats.score_sum_a[t][f'{rt}-{st}'][et] += np.average(ev[t][f'{rt}-{st}'][et])
     score_ave_a = {}
     score_ave_t = {}
     for t in ['QA', 'Q', 'A']:
@@ -529,21 +1192,223 @@ def main():
         score_ave_t[t] = {}
         for st in ['R', 'F']:
             for rt in rouge_types:
-                score_ave_a[t][f'{rt}-{st}'] = {et: stats.score_sum_a[t][f'{rt}-{st}'][et] / stats.n_a[t] for et in extract_types}
-                score_ave_t[t][f'{rt}-{st}'] = {et: stats.score_sum_a[t][f'{rt}-{st}'][et] / stats.n_t for et in extract_types}
+                score_ave_a[t][f'{rt}-{st}'] = {et: stats.score_sum_a[t][f'{rt}-{st}'][et] / stats.n_a[t] for et in stats.extract_types}
+                score_ave_t[t][f'{rt}-{st}'] = {et: stats.score_sum_a[t][f'{rt}-{st}'][et] / stats.n_t for et in stats.extract_types}
     
-    # 出力
-    return json.dumps({
+    ret = {
         'success': True,
-        'rep_score': score_ave_a['QA']['ROUGE-1-R']['内容語'],
+        'rep_score': score_ave_a['QA']['ROUGE-1-R'][stats.extract_types[0]],
         'version': DATA_VERSION,
         'macro_ave': {
             'available_rate': {t: stats.n_a[t] / stats.n_t for t in ['QA', 'Q', 'A']},
             'available': score_ave_a,
             'total':score_ave_t
-        },
-        'ins': [ev.toDict() for ev in evals]
-    }, ensure_ascii=False)
+        }
+    }
+    if evals is not None:
+        ret['ins'] = [ev.toDict() for ev in evals]
+    if errors:
+        ret['success'] = False
+        ret['errors'] = errors
+    return ret
+
+
+def aggregate(evals: List[EvalInstance], errors: Optional[List[dict]] = None,
+              types: List[str] = extract_types) -> dict:
+    """インスタンスごとの評価結果から，出力のJSONに相当する辞書を返します．"""
+    return summarize(accumulate(evals, types), evals, errors)
+
+
+def partial_result(stats: Stats, errors: List[dict], rouge_engine: str, shard: Tuple[int, int],
+                   segments: bool = False, references: Optional[dict] = None, no_mecab: bool = False) -> dict:
+    """分割評価の集計途中の値を返します．"""
+    ret = {
+        'success': True,
+        'task': 'summarization',
+        'version': DATA_VERSION,
+        'rouge_engine': rouge_engine
+    }
+    if segments:
+        ret['segments'] = True
+    if references:
+        ret['references'] = references
+    if no_mecab:
+        ret['no_mecab'] = True
+    ret.update({
+        'shard': list(shard),
+        'stats': stats.toDict(),
+        'errors': errors
+    })
+    return ret
+
+
+def merge_partials(partials: List[dict]) -> dict:
+    """分割評価の集計途中の値を統合し，出力のJSONに相当する辞書を返します．"""
+    if len(set(p['rouge_engine'] for p in partials)) > 1:
+        raise Exception('ROUGEの計算方法が異なる分割評価の結果は統合できません．')
+    if len(set(p.get('segments', False) for p in partials)) > 1:
+        raise Exception('区切りの対応付けの有無が異なる分割評価の結果は統合できません．')
+    if len(set(json.dumps(p.get('references')) for p in partials)) > 1:
+        raise Exception('正解の指定が異なる分割評価の結果は統合できません．')
+    if len(set(p.get('no_mecab', False) for p in partials)) > 1:
+        raise Exception('--no-mecabの有無が異なる分割評価の結果は統合できません．')
+    stats = Stats(rouge_types, char_extract_types if partials[0].get('no_mecab') else extract_types)
+    errors = []
+    for p in partials:
+        stats.merge(Stats.fromDict(p['stats']))
+        errors.extend(p['errors'])
+    return summarize(stats, None, errors)
+
+
+def evaluate_instances(mecab, gss: Dict[str, DSInstance], targets: List[DSInstance], progress: bool = True,
+                       rouge_engine: str = 'perl', checkpoint: Optional[Checkpoint] = None,
+                       writer=None, segments: bool = False,
+                       scoring_formula: str = 'average') -> Tuple[Stats, List[EvalInstance], List[dict]]:
+    """評価対象データの各インスタンスを評価し，インスタンス数とスコアの和，評価結果，評価に失敗したインスタンスのリストを返します．
+    インスタンスの評価に失敗した場合は記録して評価を続けます．
+    checkpointを指定すると，評価済みのインスタンスを記録し，記録済みのインスタンスは評価しません．
+    writerを指定すると，評価結果を順に書き出し，返すリストには含めません．
+    segmentsを指定すると，〔1〕〔2〕…の印で区切った要約を区切りごとに対応付けて評価します．
+    scoring_formulaは別の正解（DSInstance.alternatives）がある場合の計算方法です．
+    mecabにはMeCabのTaggerかTokenizerを指定します．CharTokenizerを指定すると，語のとり方が文字のスコアのみを計算します．
+    """
+    tokenizer = as_tokenizer(mecab)
+
+    # 評価結果リスト
+    stats = Stats(rouge_types, tokenizer.extract_types)
+    evals: List[EvalInstance] = []
+    errors: List[dict] = []
+
+    def add(ev: EvalInstance):
+        stats.add(ev)
+        if writer is not None:
+            writer.write(ev)
+        else:
+            evals.append(ev)
+
+    # 評価データ各々に対して（tqdmは進捗を表示する場合のみ読み込みます）
+    if progress:
+        from tqdm import tqdm
+        targets = tqdm(targets, total=len(targets))
+    for target in targets:
+    #for target, gs in [(x, y) for x, y in zip(targets, gss)][:1]:
+        target: DSInstance
+        if checkpoint is not None and target.id in checkpoint.done:
+            add(checkpoint.done[target.id])
+            continue
+
+        try:
+            gs: DSInstance = gss.get(target.id)
+
+            # IDチェック
+            if gs is None:
+                raise Exception(f'入力データのIDがGSデータ上で見つかりません．(id={target.id})')
+
+            if segments:
+                w2isQ, w2isA = tokenize_instance_segments(tokenizer, target, gs)
+                scoresQ, scoresA = score_instance_segments(w2isQ, w2isA, rouge_engine, tokenizer.references,
+                                                           tokenizer.extract_types)
+            else:
+                w2isQ, w2isA = tokenize_instance(tokenizer, target, gs)
+                scoresQ, scoresA = score_instance(w2isQ, w2isA, rouge_engine, scoring_formula,
+                                                  tokenizer.references, tokenizer.extract_types)
+            ev = eval_instance(target, gs, scoresQ, scoresA, tokenizer.extract_types)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            errors.append({'ID': target.id, 'error': str(e)})
+            if checkpoint is not None:
+                checkpoint.add_error(target.id, str(e))
+            continue
+
+        add(ev)
+        if checkpoint is not None:
+            checkpoint.add(ev)
+
+    return stats, evals, errors
+
+
+def evaluate(mecab, gss: Dict[str, DSInstance], targets: List[DSInstance], progress: bool = True,
+             rouge_engine: str = 'perl', checkpoint: Optional[Checkpoint] = None, writer=None,
+             segments: bool = False, scoring_formula: str = 'average') -> dict:
+    """読み込み済みのGSデータと評価対象データを評価し，出力のJSONに相当する辞書を返します．
+    writerを指定すると，インスタンスごとの評価結果は書き出し，"ins"を含めません．
+    """
+    check_targets(targets)
+    stats, evals, errors = evaluate_instances(mecab, gss, targets, progress, rouge_engine, checkpoint, writer, segments,
+                                              scoring_formula)
+    return summarize(stats, evals if writer is None else None, errors)
+
+
+def select_rouge_engine(rouge_engine: Optional[str], no_mecab: bool = False) -> str:
+    """-eの指定からROUGEの計算方法を返します．省略時は--no-mecabではnative，それ以外ではperlとします．"""
+    if no_mecab:
+        if rouge_engine == 'perl':
+            raise Exception('--no-mecabと-e perlは同時に指定できません．')
+        return 'native'
+    return rouge_engine or 'perl'
+
+
+def main():
+    args = get_args()
+    args.rouge_engine = select_rouge_engine(args.rouge_engine, args.no_mecab)
+    if args.no_mecab:
+        mecab = CharTokenizer()
+    elif args.unidic_path is None:
+        raise Exception('MeCabで用いるUnidicのパス（-d）を指定してください．')
+    else:
+        import MeCab
+        mecab = MeCab.Tagger('-d {0}'.format(args.unidic_path))
+
+    # GS読み込み
+    with open(args.gs_data) as f:
+        gss = load_json_todic(f.read())
+
+    # 別の正解の読み込み
+    references = None
+    if args.references:
+        if args.segments:
+            raise Exception('--referencesと--segmentsは同時に指定できません．')
+        load_references(gss, args.references)
+        references = {'files': args.references, 'scoring_formula': args.scoring_formula}
+
+    # 評価対象読み込み
+    with open(args.input_file) as f:
+        targets = load_json(f.read())
+
+    # チェックポイント
+    checkpoint = None
+    if args.checkpoint is not None:
+        checkpoint = Checkpoint(args.checkpoint, args.rouge_engine, args.resume, args.checkpoint_interval,
+                                args.segments, references, args.no_mecab)
+    elif args.resume:
+        raise Exception('--resumeには-cでチェックポイントファイルを指定してください．')
+
+    # インスタンスごとの出力
+    writer = None
+    if args.ins_output is not None:
+        writer = ins_writers[args.ins_format](args.ins_output)
+
+    try:
+        if args.shard is not None:
+            # 分割評価
+            check_targets(targets)
+            stats, _, errors = evaluate_instances(mecab, gss, shard_slice(targets, args.shard),
+                                                  rouge_engine=args.rouge_engine, checkpoint=checkpoint,
+                                                  writer=writer, segments=args.segments,
+                                                  scoring_formula=args.scoring_formula)
+            result = partial_result(stats, errors, args.rouge_engine, args.shard, args.segments, references,
+                                    args.no_mecab)
+        else:
+            result = evaluate(mecab, gss, targets, rouge_engine=args.rouge_engine, checkpoint=checkpoint,
+                              writer=writer, segments=args.segments, scoring_formula=args.scoring_formula)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if writer is not None:
+            writer.close()
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
 
 
 if __name__ == '__main__':
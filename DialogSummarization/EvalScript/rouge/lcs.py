@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""ROUGE-L / ROUGE-W用のLCS計算モジュール．
+
+整数の語IDの列を対象に，ROUGE-1.5.5.plと同じ結果を返すLCSの計算を提供します．
+・lcs_length：ビット並列（Allison-Dix / Hyyrö）によるLCS長．
+  一方の列の語IDごとの出現位置を多倍長整数のビットマスクとし，もう一方の列の1語ごとに
+  加減算とビット演算を数回行うだけで計算します．表を持たないため長い列でも軽量です．
+・LCSMarker：ROUGE-1.5.5.plのlcs_inner / wlcs_innerと同じ動的計画法と逆順の追跡（markLCS）で，
+  model側の列の一致位置（hitMask）に印を付けます．同値の場合の進み方（上を優先）まで同じため，
+  ROUGE-Wの連続一致の区切りも一致します．
+  DPの行と追跡の表はインスタンスで保持して再利用し，より大きな表が必要な場合のみ拡張します．
+"""
+
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+# 追跡の表の値（ROUGE-1.5.5.plの"\\"，"^"，"<"に対応）
+DIAGONAL = 1
+UP = 2
+LEFT = 3
+
+
+def match_masks(a: Sequence[int]) -> Dict[int, int]:
+    """語IDごとの出現位置のビットマスクを返します．"""
+    masks: Dict[int, int] = {}
+    for i, x in enumerate(a):
+        masks[x] = masks.get(x, 0) | (1 << i)
+    return masks
+
+
+def lcs_length(a: Sequence[int], b: Sequence[int], masks: Optional[Dict[int, int]] = None) -> int:
+    """aとbのLCS長を返します．masksにmatch_masks(a)を渡すと再計算を省きます．"""
+    m = len(a)
+    if m == 0 or len(b) == 0:
+        return 0
+    if masks is None:
+        masks = match_masks(a)
+    full = (1 << m) - 1
+    v = full
+    for y in b:
+        u = v & masks.get(y, 0)
+        if u:
+            # V' = (V + (V & M)) | (V & ~M)
+            v = ((v + u) | (v - u)) & full
+    # 0のビットの数がLCS長です
+    return m - bin(v).count('1')
+
+
+class LCSMarker(object):
+    """model側の列のLCSの一致位置に印を付けます．"""
+
+    def __init__(self, weight: float = 1.2):
+        self.weight: float = weight
+        # k**weight の表
+        self.weights = array('d', [0.0])
+        self.moves = bytearray()
+        self.rows_c: List[List[float]] = [[], []]
+        self.rows_l: List[List[int]] = [[], []]
+
+    def weight_of(self, k: int) -> float:
+        self.reserve_weights(k)
+        return self.weights[k]
+
+    def reserve_weights(self, k: int):
+        w = self.weights
+        while len(w) <= k:
+            w.append(float(len(w)) ** self.weight)
+
+    def reserve(self, m: int, n: int):
+        size = (m + 1) * (n + 1)
+        if len(self.moves) < size:
+            self.moves.extend(bytes(size - len(self.moves)))
+        for row in self.rows_c:
+            if len(row) <= n:
+                row.extend([0.0] * (n + 1 - len(row)))
+        for row in self.rows_l:
+            if len(row) <= n:
+                row.extend([0] * (n + 1 - len(row)))
+
+    def trace(self, hit_mask: List[int], m: int, n: int):
+        """markLCSと同じく(m, n)から逆順に辿り，斜めに進んだmodel側の位置に印を付けます．"""
+        moves = self.moves
+        width = n + 1
+        i = m
+        j = n
+        while i != 0 and j != 0:
+            mv = moves[i * width + j]
+            if mv == DIAGONAL:
+                i -= 1
+                j -= 1
+                hit_mask[i] = 1
+            elif mv == UP:
+                i -= 1
+            else:
+                j -= 1
+
+    def mark_lcs(self, model: Sequence[int], peer: Sequence[int], hit_mask: List[int]):
+        """lcs_innerに相当します．"""
+        m = len(model)
+        n = len(peer)
+        if m == 0:
+            return
+        self.reserve(m, n)
+        moves = self.moves
+        width = n + 1
+        prev = self.rows_l[0]
+        cur = self.rows_l[1]
+        for j in range(width):
+            prev[j] = 0
+        cur[0] = 0
+        for i in range(1, m + 1):
+            x = model[i - 1]
+            base = i * width
+            left = 0
+            for j in range(1, width):
+                if x == peer[j - 1]:
+                    left = prev[j - 1] + 1
+                    moves[base + j] = DIAGONAL
+                else:
+                    up = prev[j]
+                    if up >= left:
+                        left = up
+                        moves[base + j] = UP
+                    else:
+                        moves[base + j] = LEFT
+                cur[j] = left
+            prev, cur = cur, prev
+        self.trace(hit_mask, m, n)
+
+    def mark_wlcs(self, model: Sequence[int], peer: Sequence[int], hit_mask: List[int]):
+        """wlcs_innerに相当します．連続一致の長さkの一致を k+1 の重みの差分で加算します．"""
+        m = len(model)
+        n = len(peer)
+        if m == 0:
+            return
+        self.reserve(m, n)
+        self.reserve_weights(min(m, n) + 1)
+        w = self.weights
+        moves = self.moves
+        width = n + 1
+        prev_c = self.rows_c[0]
+        cur_c = self.rows_c[1]
+        prev_l = self.rows_l[0]
+        cur_l = self.rows_l[1]
+        for j in range(width):
+            prev_c[j] = 0.0
+            prev_l[j] = 0
+        cur_c[0] = 0.0
+        cur_l[0] = 0
+        for i in range(1, m + 1):
+            x = model[i - 1]
+            base = i * width
+            left = 0.0
+            for j in range(1, width):
+                if x == peer[j - 1]:
+                    k = prev_l[j - 1]
+                    # ROUGE-1.5.5.plと同じ演算順で計算します（c + w(k+1) - w(k)）
+                    left = prev_c[j - 1] + w[k + 1] - w[k]
+                    cur_l[j] = k + 1
+                    moves[base + j] = DIAGONAL
+                else:
+                    up = prev_c[j]
+                    if up >= left:
+                        left = up
+                        moves[base + j] = UP
+                    else:
+                        moves[base + j] = LEFT
+                    cur_l[j] = 0
+                cur_c[j] = left
+            prev_c, cur_c = cur_c, prev_c
+            prev_l, cur_l = cur_l, prev_l
+        self.trace(hit_mask, m, n)
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+"""ROUGE-1.5.5.plを呼び出さずにROUGEスコアを計算するモジュール．
+
+Pythonrougeの代わりに用いるNativeRougeクラスを提供します．
+Pythonrougeが実行するROUGE-1.5.5.pl（-a -n N -2 4 -u -w W -l L -m -f A -r 1000 -p P）と同じ値を返します．
+・-l Lの語数制限は，要約（peer）と正解（model）の両方の先頭L語に適用します．
+・R / Pを小数点以下5桁に丸めてから，丸めた値でFを計算して丸めます．
+・ROUGE-SU4の1-gramは末尾の語を数えません．
+・ROUGE-Wの正解側の分母は重みを2回適用します（(Σ len**W)**W）．
+・評価インスタンスは1件のため，ブートストラップ法による平均は元の値と同じです．
+・scoring_formula="best"（-f B）では，スコア種別ごとに正解（model）単位のスコアが最大の正解のみで計算します．
+正解の要約に依存する統計（n-gram・skip-bigramの出現数，LCSの分母等）はReferenceStatsにまとめ，
+scoreに渡すと複数の評価対象の間で使い回せます．
+ROUGE-SU4の1-gram・skip-bigramは語IDの組を1つの整数に符号化し，numpyの配列として窓ごとにまとめて数えます．
+語はcalc_scoreでは語ID（数字列）を，scoreでは0以上WIDTH未満の整数を想定しています．
+数字列にはステミング（-m）とハイフンの除去が作用しないため，これらは行いません．
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .lcs import LCSMarker, lcs_length, match_masks
+
+Tokens = List[int]
+
+# skip-bigramの符号に用いる語IDの上限（符号がint64に収まる範囲）
+WIDTH = 1 << 31
+
+# 正解が複数の場合の計算方法（average：-f A，best：-f B）
+scoring_formulas = ['average', 'best']
+
+
+def round5(x: float) -> float:
+    """sprintf("%7.5f")と同じ丸めを行います．"""
+    return float('%7.5f' % x)
+
+
+def truncate(sentences: List[Tokens], limit: int) -> List[Tokens]:
+    """readText_LCSと同じく，文の並びの先頭limit語までを返します．"""
+    if limit <= 0:
+        return sentences
+    ret = []
+    length = 0
+    for s in sentences:
+        if length + len(s) < limit:
+            ret.append(s)
+            length += len(s)
+        else:
+            ret.append(s[:limit - length])
+            break
+    return ret
+
+
+def flatten(sentences: List[Tokens]) -> Tokens:
+    return [x for s in sentences for x in s]
+
+
+def ngram_counts(tokens: Tokens, n: int) -> Counter:
+    """createNGramに相当します．"""
+    if n == 1:
+        return Counter(tokens)
+    return Counter(zip(*[tokens[k:] for k in range(n)]))
+
+
+def skip_bigram_table(tokens: np.ndarray, width: int, skip: int = 4,
+                      unigram: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """createSkipBigramに相当し，(符号の昇順の配列, 出現数の配列)を返します．末尾の語は1-gramとしても始点としても数えません．
+
+    語IDは0以上width未満とし，1-gram xは x，skip-bigram (x, y)は (x + 1) * width + y に符号化します．
+    間隔dの組はtokens[:-d]とtokens[d:]の配列演算でまとめて作ります．
+    """
+    n = len(tokens)
+    last = n - 1
+    if last <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    top = last if skip < 0 else min(last, skip + 1)
+    heads = (tokens + 1) * width
+    parts = [tokens[:last]] if unigram else []
+    for d in range(1, top + 1):
+        parts.append(heads[:n - d] + tokens[d:])
+    return np.unique(np.concatenate(parts), return_counts=True)
+
+
+def clipped_hit_table(model: Tuple[np.ndarray, np.ndarray], peer: Tuple[np.ndarray, np.ndarray]) -> int:
+    """skip_bigram_tableの結果どうしでclipped_hitと同じ一致数を返します．"""
+    _, i, j = np.intersect1d(model[0], peer[0], assume_unique=True, return_indices=True)
+    return int(np.minimum(model[1][i], peer[1][j]).sum())
+
+
+def clipped_hit(model: Counter, peer: Counter) -> int:
+    """ngramScore / skipBigramScoreに相当します．"""
+    hit = 0
+    for gram, c in model.items():
+        p = peer.get(gram)
+        if p is not None:
+            hit += p if p <= c else c
+    return hit
+
+
+def lcs_hit(marker: LCSMarker, model: List[Tokens], peer: List[Tokens],
+            model_1grams: Counter, peer_1grams: Counter, weighted: bool) -> float:
+    """lcs / wlcsに相当し，一致数を返します．
+
+    一致位置のうち1-gramの出現数が残っているもののみを数え，数えた語は両方の出現数から差し引きます．
+    weightedの場合は連続一致の長さkごとに k**W を加えます．
+    """
+    hit = 0.0 if weighted else 0
+    for sentence in model:
+        m = len(sentence)
+        hit_mask = [0] * m
+        if weighted:
+            for p in peer:
+                marker.mark_wlcs(sentence, p, hit_mask)
+        else:
+            for p in peer:
+                marker.mark_lcs(sentence, p, hit_mask)
+        hit_len = 0
+        for j in range(m):
+            if hit_mask[j] == 1:
+                x = sentence[j]
+                if model_1grams[x] > 0 and peer_1grams[x] > 0:
+                    if weighted:
+                        hit_len += 1
+                        if j + 1 < m and hit_mask[j + 1] == 0:
+                            hit += marker.weight_of(hit_len)
+                            hit_len = 0
+                        elif j + 1 == m:
+                            hit += marker.weight_of(hit_len)
+                            hit_len = 0
+                    else:
+                        hit += 1
+                    model_1grams[x] -= 1
+                    peer_1grams[x] -= 1
+    return hit
+
+
+def select(parts: List[Tuple[float, float, float, Optional[float]]], best: bool) -> Tuple[float, float, float]:
+    """正解ごとの(一致数, 正解の数, 要約の数, スコア)から，計算に用いる(一致数, 正解の数, 要約の数)を返します．
+
+    bestでない場合（-f A）は正解すべての和とし，bestの場合（-f B）はスコアが最大の最初の正解の値とします．
+    スコアがNoneの正解は，computeWLCSScoreと同じく直前の正解のスコア（最初は0）を引き継ぎます．
+    """
+    if not best:
+        return sum(x[0] for x in parts), sum(x[1] for x in parts), sum(x[2] for x in parts)
+    ret = (0, 0, 0)
+    best_score = -1
+    score = 0
+    for hit, count, count_p, s in parts:
+        if s is not None:
+            score = s
+        if score > best_score:
+            best_score = score
+            ret = (hit, count, count_p)
+    return ret
+
+
+class ReferenceStats(object):
+    """正解（model）1件の，評価対象に依存しない統計です．sentencesには語数制限を適用した文の並びを指定します．"""
+
+    def __init__(self, sentences: List[Tokens], n_gram: int, marker: LCSMarker):
+        self.sentences: List[Tokens] = sentences
+        self.flat: Tokens = flatten(sentences)
+        n = len(self.flat)
+        # ROUGE-N：n = 1..n_gramの出現数と総数
+        self.ngrams: List[Counter] = [ngram_counts(self.flat, k) for k in range(1, n_gram + 1)]
+        self.ngram_totals: List[int] = [max(0, n - k + 1) for k in range(1, n_gram + 1)]
+        self.unigrams: Counter = Counter(self.flat)
+        # ROUGE-SU4
+        self.skip_bigrams: Tuple[np.ndarray, np.ndarray] = skip_bigram_table(np.array(self.flat, dtype=np.int64), WIDTH)
+        self.skip_bigram_total: int = int(self.skip_bigrams[1].sum())
+        # ROUGE-L / ROUGE-W：1文の場合のLCS長の計算用の表と，分母（語数 / 文ごとの len**W の和）
+        self.masks: Optional[Dict[int, int]] = match_masks(sentences[0]) if len(sentences) == 1 else None
+        self.lcs_base: int = n
+        self.wlcs_base: float = 0.0
+        for s in sentences:
+            self.wlcs_base += marker.weight_of(len(s))
+
+
+class NativeRouge:
+    def __init__(self, summary_file_exist=False, summary=None, reference=None,
+                 n_gram=2, ROUGE_SU4=True, ROUGE_L=False, ROUGE_W=False,
+                 ROUGE_W_Weight=1.2, length_limit=True, length=100, p=0.5,
+                 scoring_formula='average'):
+        """
+        Pythonrougeと同じ引数の一部を受け付けます（summary_file_exist=Falseのみ）．
+        summary: [[summaryA_sent1, summaryA_sent2]]
+        reference: [[[summaryA_ref1_sent1, summaryA_ref1_sent2],
+                     [summaryA_ref2_sent1, summaryA_ref2_sent2]]]
+        ROUGE-1.5.5.plは複数の評価インスタンスの平均をブートストラップ法の乱数に依存して計算するため，
+        評価インスタンス（summaryの要素）は1件のみ受け付けます．
+        語ID（整数）の列をreference_stats / scoreで評価する場合は，summaryとreferenceを省略できます．
+        """
+        if summary_file_exist:
+            raise Exception('NativeRougeはsummary_file_exist=Falseのみに対応しています．')
+        if summary is not None and (len(summary) != 1 or len(reference) != 1):
+            raise Exception('NativeRougeは評価インスタンス1件のみに対応しています．')
+        if scoring_formula not in scoring_formulas:
+            raise Exception(f'正解が複数の場合の計算方法が不正です．({scoring_formula})')
+        self.summary = summary
+        self.reference = reference
+        self.n_gram = n_gram
+        self.ROUGE_SU4 = ROUGE_SU4
+        self.ROUGE_L = ROUGE_L
+        self.ROUGE_W = ROUGE_W
+        self.W_Weight = ROUGE_W_Weight
+        self.length = length if length_limit else 0
+        self.alpha = p
+        self.scoring_formula = scoring_formula
+        self.marker = LCSMarker(ROUGE_W_Weight)
+
+    def scores(self, hit: float, count: float, count_p: float, weight: float = None) -> Tuple[float, float, float]:
+        """(R, P, F)を返します．Fは丸めたR / Pから計算します．"""
+        def ratio(h, c):
+            if c == 0:
+                return 0.0
+            if weight is None:
+                return round5(h / c)
+            return round5((h / c) ** (1 / weight))
+
+        r = ratio(hit, count)
+        p = ratio(hit, count_p)
+        denom = (1 - self.alpha) * p + self.alpha * r
+        f = round5((p * r) / denom) if denom > 0 else 0.0
+        return r, p, f
+
+    def prepare(self, doc: List[Tokens]) -> List[Tokens]:
+        """空の文を除き，語数制限を適用します．"""
+        return truncate([x for x in doc if len(x) > 0], self.length)
+
+    def reference_stats(self, doc: List[Tokens]) -> ReferenceStats:
+        """正解1件（文ごとの語IDの列）の統計を求めます．"""
+        return ReferenceStats(self.prepare(doc), self.n_gram, self.marker)
+
+    def tokenize(self) -> Tuple[List[Tokens], List[List[Tokens]]]:
+        """空行を除いた各文を語IDの列にし，語数制限を適用します．"""
+        ids: Dict[str, int] = {}
+
+        def to_ids(doc: List[str]) -> List[Tokens]:
+            sentences = [[ids.setdefault(w, len(ids)) for w in s.split()] for s in doc if len(s) > 0]
+            return truncate(sentences, self.length)
+
+        peer = to_ids(self.summary[0])
+        models = [to_ids(doc) for doc in self.reference[0]]
+        return peer, models
+
+    def calc_score(self) -> Dict[str, float]:
+        peer, models = self.tokenize()
+        return self.score(peer, [ReferenceStats(m, self.n_gram, self.marker) for m in models])
+
+    def score(self, peer: List[Tokens], references: List[ReferenceStats]) -> Dict[str, float]:
+        """語数制限を適用した評価対象（prepareの結果）と正解の統計からスコアを計算します．"""
+        peer_flat = flatten(peer)
+        best = self.scoring_formula == 'best'
+        result = {}
+
+        def record(name, parts, weight=None):
+            r, p, f = self.scores(*select(parts, best), weight)
+            result[f'{name}-R'] = r
+            result[f'{name}-F'] = f
+
+        def recall(hit, count):
+            # ngramScore / skipBigramScoreの正解ごとのスコア
+            return round5(hit / count) if count != 0 else 0
+
+        # ROUGE-N
+        for n in range(1, self.n_gram + 1):
+            peer_grams = ngram_counts(peer_flat, n)
+            peer_cnt = max(0, len(peer_flat) - n + 1)
+            parts = []
+            for ref in references:
+                hit = clipped_hit(ref.ngrams[n - 1], peer_grams)
+                count = ref.ngram_totals[n - 1]
+                parts.append((hit, count, peer_cnt, recall(hit, count)))
+            record(f'ROUGE-{n}', parts)
+
+        peer_1grams = Counter(peer_flat)
+        marker = self.marker
+
+        # ROUGE-L
+        if self.ROUGE_L:
+            parts = []
+            for ref in references:
+                if ref.masks is not None and len(peer) == 1:
+                    # 1文どうしでは一致位置がすべて数えられるため，LCS長が一致数です
+                    hit = lcs_length(ref.sentences[0], peer[0], ref.masks)
+                else:
+                    hit = lcs_hit(marker, ref.sentences, peer, Counter(ref.unigrams), Counter(peer_1grams), False)
+                count = ref.lcs_base
+                parts.append((hit, count, len(peer_flat), hit / count if count > 0 else 0))
+            record('ROUGE-L', parts)
+
+        # ROUGE-SU4
+        if self.ROUGE_SU4:
+            peer_grams = skip_bigram_table(np.array(peer_flat, dtype=np.int64), WIDTH)
+            peer_cnt = int(peer_grams[1].sum())
+            parts = []
+            for ref in references:
+                hit = clipped_hit_table(ref.skip_bigrams, peer_grams)
+                count = ref.skip_bigram_total
+                parts.append((hit, count, peer_cnt, recall(hit, count)))
+            record('ROUGE-SU4', parts)
+
+        # ROUGE-W
+        if self.ROUGE_W:
+            w = self.W_Weight
+            parts = []
+            for ref in references:
+                hit = lcs_hit(marker, ref.sentences, peer, Counter(ref.unigrams), Counter(peer_1grams), True)
+                base = ref.wlcs_base
+                # 分母が0の正解のスコアは直前の正解のものを引き継ぎます
+                parts.append((hit, base ** w, len(peer_flat) ** w, (hit / base) ** (1 / w) if base != 0 else None))
+            record(f'ROUGE-W-{w}', parts, w)
+
+        return result
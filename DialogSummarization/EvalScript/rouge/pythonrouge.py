@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 import os
 from os.path import basename
-from re import findall
+from re import findall, split
 from glob import glob
 from tempfile import mkdtemp
 import subprocess
@@ -180,7 +180,10 @@ class Pythonrouge:
             xml.write('<P ID="{}">{}</P>\n'.format('A', basename(peer)))
             xml.write('</PEERS>\n')
             xml.write('<MODELS>\n')
-            model_paths = glob('{}/{}.*'.format(self.model_path, file_name))
+            # keep the order of the references (-f B takes the first of tied models)
+            model_paths = sorted(glob('{}/{}.*'.format(self.model_path, file_name)),
+                                 key=lambda x: [int(t) if t.isdigit() else t
+                                                for t in split(r'(\d+)', basename(x))])
             for path, ids in zip(model_paths,
                                  [i for i in range(len(model_paths))]):
                 xml.write('<M ID="{}">{}</M>\n'.format(ids, basename(path)))
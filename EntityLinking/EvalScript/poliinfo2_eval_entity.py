@@ -33,11 +33,37 @@
         'target_correct_title': int,// 入力のうちBIタグの範囲とWikipediaタイトルの両者が正解だった個数
         'gs_correct_title': int,    // 正解データのうち，BIタグの範囲とWikipediaタイトルの両者が正解だった個数
         'target_correct_range': int,// 入力のうちBIタグの範囲が正解だった個数
-        'gs_correct_range': int     // 正解データのうち，BIタグの範囲が正解だった個数
+        'gs_correct_range': int,    // 正解データのうち，BIタグの範囲が正解だった個数
+        'precision_overlap_title': float,   // 入力のうち，範囲が重なりWikipediaタイトルも一致する正解があった割合
+        'recall_overlap_title': float,      // 正解データのうち，範囲が重なりWikipediaタイトルも一致する入力があった割合
+        'f1_overlap_title': float,          // 'precision_overlap_title'と'recall_overlap_title'のF値
+        'precision_overlap_range': float,   // 入力のうち，範囲が重なる正解があった割合
+        'recall_overlap_range': float,      // 正解データのうち，範囲が重なる入力があった割合
+        'f1_overlap_range': float,          // 'precision_overlap_range'と'recall_overlap_range'のF値
+        'target_overlap_title': int,// 入力のうち，範囲が重なりWikipediaタイトルも一致する正解があった個数
+        'gs_overlap_title': int,    // 正解データのうち，範囲が重なりWikipediaタイトルも一致する入力があった個数
+        'target_overlap_range': int,// 入力のうち，範囲が重なる正解があった個数
+        'gs_overlap_range': int     // 正解データのうち，範囲が重なる入力があった個数
     }
 }
 
-更新：2020.05.12
+*_overlap_*は範囲の一部が重なるメンションを正解とみなす緩和した評価です．
+メンションはそれぞれ開始位置の順に並び互いに重ならないため，GSデータと入力のメンションを1回ずつ走査して数えます．
+
+【分割評価】--shard i/Nを指定すると，語の並びをN等分したi番目（0始まり）の範囲のみを読み込んで評価し，
+以下のJSON書式で正解数等の数を出力します．メンションは開始位置を含む範囲で数え，
+範囲の境界をまたいで重なる他方のメンションも読み込みます（IOB2として正しいデータの場合，1台で評価した場合と一致します）．
+N個の出力をpoliinfo2_eval.py mergeで統合すると，1台で評価した場合と同じ結果が得られます．
+{
+    'success': true,
+    'task': 'entity',
+    'version': string,
+    'shard': [i, N],
+    'mention': {'tp': int, 'tn': int, 'fp': int, 'fn': int},
+    'disambiguation': {'tg_cnt': int, 'gs_cnt': int, ...}
+}
+
+更新：2026.10.19
 作成者：乙武 北斗
 """
 
@@ -46,7 +72,8 @@ import sys
 import argparse
 import json
 import fileinput
-from typing import List
+import itertools
+from typing import Iterable, List, Optional, Tuple
 from collections import Counter
 
 # データバージョン
@@ -126,7 +153,9 @@ class SDEval(object):
     def __init__(self):
         self.cnt = Counter()
     
-    def eval(self, m_gs: List[MentionInstance], m_tg: List[MentionInstance]):
+    def eval(self, m_gs: List[MentionInstance], m_tg: List[MentionInstance],
+             gs_partners: Optional[List[MentionInstance]] = None, tg_partners: Optional[List[MentionInstance]] = None):
+        """m_gsとm_tgを数えます．範囲の重なりは，gs_partnersとtg_partners（省略時はm_gsとm_tg）との間で調べます．"""
         gs_map = {m.start_idx:m for m in m_gs}
         tg_map = {m.start_idx:m for m in m_tg}
 
@@ -146,6 +175,13 @@ class SDEval(object):
                 self.cnt['gs_crr_range'] += 1
                 if gs.wikipedia_title == tg.wikipedia_title:
                     self.cnt['gs_crr_title'] += 1
+
+        # 範囲の重なり
+        for prefix, mentions, partners in [('tg', m_tg, m_gs if gs_partners is None else gs_partners),
+                                           ('gs', m_gs, m_tg if tg_partners is None else tg_partners)]:
+            n_range, n_title = count_overlaps(mentions, partners)
+            self.cnt[f'{prefix}_ovl_range'] += n_range
+            self.cnt[f'{prefix}_ovl_title'] += n_title
     
     def precision_range(self):
         # return self.cnt['tg_crr_range'] / self.cnt['tg_cnt'] if self.cnt['tg_cnt'] > 0 else math.nan
@@ -177,6 +213,54 @@ class SDEval(object):
             return None
         return (2 * p * r) / (p + r)
 
+    def precision_overlap_range(self):
+        return self.cnt['tg_ovl_range'] / self.cnt['tg_cnt'] if self.cnt['tg_cnt'] > 0 else None
+
+    def precision_overlap_title(self):
+        return self.cnt['tg_ovl_title'] / self.cnt['tg_cnt'] if self.cnt['tg_cnt'] > 0 else None
+
+    def recall_overlap_range(self):
+        return self.cnt['gs_ovl_range'] / self.cnt['gs_cnt'] if self.cnt['gs_cnt'] > 0 else None
+
+    def recall_overlap_title(self):
+        return self.cnt['gs_ovl_title'] / self.cnt['gs_cnt'] if self.cnt['gs_cnt'] > 0 else None
+
+    def f1_overlap_title(self) -> float:
+        p = self.precision_overlap_title()
+        r = self.recall_overlap_title()
+        if p is None or r is None:
+            return None
+        return (2 * p * r) / (p + r)
+
+    def f1_overlap_range(self) -> float:
+        p = self.precision_overlap_range()
+        r = self.recall_overlap_range()
+        if p is None or r is None:
+            return None
+        return (2 * p * r) / (p + r)
+
+
+def count_overlaps(mentions: List[MentionInstance], others: List[MentionInstance]) -> Tuple[int, int]:
+    """mentionsのうち，範囲が重なるothersがあるものの数と，そのうちWikipediaタイトルも一致するものがあるものの数を返します．
+    どちらも開始位置の順に並び，互いに重ならない（extract_mentionsの結果）ものとして，1回ずつ走査します．"""
+    n_range = 0
+    n_title = 0
+    j = 0
+    for x in mentions:
+        # xより前で終わるものは，以降のmentionsとも重なりません
+        while j < len(others) and others[j].end_idx < x.start_idx:
+            j += 1
+        hit = False
+        title = False
+        k = j
+        while k < len(others) and others[k].start_idx <= x.end_idx:
+            hit = True
+            title = title or others[k].wikipedia_title == x.wikipedia_title
+            k += 1
+        n_range += hit
+        n_title += title
+    return n_range, n_title
+
 
 def get_args():
     parser = argparse.ArgumentParser(
@@ -212,7 +296,17 @@ def get_args():
         'target_correct_title': int,// 入力のうちBIタグの範囲とWikipediaタイトルの両者が正解だった個数
         'gs_correct_title': int,    // 正解データのうち，BIタグの範囲とWikipediaタイトルの両者が正解だった個数
         'target_correct_range': int,// 入力のうちBIタグの範囲が正解だった個数
-        'gs_correct_range': int     // 正解データのうち，BIタグの範囲が正解だった個数
+        'gs_correct_range': int,    // 正解データのうち，BIタグの範囲が正解だった個数
+        'precision_overlap_title': float,   // 入力のうち，範囲が重なりWikipediaタイトルも一致する正解があった割合
+        'recall_overlap_title': float,      // 正解データのうち，範囲が重なりWikipediaタイトルも一致する入力があった割合
+        'f1_overlap_title': float,          // 'precision_overlap_title'と'recall_overlap_title'のF値
+        'precision_overlap_range': float,   // 入力のうち，範囲が重なる正解があった割合
+        'recall_overlap_range': float,      // 正解データのうち，範囲が重なる入力があった割合
+        'f1_overlap_range': float,          // 'precision_overlap_range'と'recall_overlap_range'のF値
+        'target_overlap_title': int,// 入力のうち，範囲が重なりWikipediaタイトルも一致する正解があった個数
+        'gs_overlap_title': int,    // 正解データのうち，範囲が重なりWikipediaタイトルも一致する入力があった個数
+        'target_overlap_range': int,// 入力のうち，範囲が重なる正解があった個数
+        'gs_overlap_range': int     // 正解データのうち，範囲が重なる入力があった個数
     }
 }""")
 
@@ -225,18 +319,103 @@ def get_args():
                         required=True,
                         help='入力データを指定します'
                         )
+
+    parser.add_argument('--shard',
+                        type=parse_shard, default=None,
+                        help='語の並びをN等分したi番目（0始まり）の範囲のみを評価し，正解数等の数を出力します（i/N）'
+                        )
     return parser.parse_args()
 
 
+def parse_shard(s: str) -> Tuple[int, int]:
+    """i/N形式の分割の指定を(i, N)に変換します．"""
+    try:
+        i, n = [int(x) for x in s.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'分割の指定が不正です．({s})')
+    if n <= 0 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f'分割の指定が不正です．({s})')
+    return i, n
+
+
 def load_tsv(filepath: str) -> List[ELInstance]:
+    return parse_tsv(fileinput.input(filepath))
+
+
+def parse_tsv(lines: Iterable[str]) -> List[ELInstance]:
     ret = []
-    for i, line in enumerate(fileinput.input(filepath)):
+    for i, line in enumerate(lines):
         if i == 0:
             continue
         ret.append(ELInstance(line.rstrip(), i-1))
     return ret
 
 
+def count_tokens(filepath: str) -> int:
+    """TSVの語数（見出し行を除いた行数）を返します．"""
+    n = 0
+    last = b'\n'
+    with open(filepath, 'rb') as f:
+        for buf in iter(lambda: f.read(1 << 20), b''):
+            n += buf.count(b'\n')
+            last = buf[-1:]
+    if last != b'\n':
+        n += 1
+    return max(0, n - 1)
+
+
+def shard_range(total: int, shard: Tuple[int, int]) -> Tuple[int, int]:
+    """total語をN等分したi番目の範囲[start, end)を返します．"""
+    i, n = shard
+    return total * i // n, total * (i + 1) // n
+
+
+def load_tsv_range(filepath: str, start: int, end: int, reach: int = 0) -> List[ELInstance]:
+    """位置がstart以上end未満の語と，範囲内で始まるメンションの続き（直後に続くIタグの語）を読み込みます．
+    reachを指定すると，位置がreach未満の語とそこで始まるメンションの続きも読み込みます．"""
+    ret = []
+    with open(filepath) as f:
+        # 見出し行を飛ばします
+        for i, line in enumerate(itertools.islice(f, start + 1, None), start):
+            ins = ELInstance(line.rstrip(), i)
+            if i >= max(end, reach) and ins.iob2 != 'I':
+                break
+            ret.append(ins)
+    return ret
+
+
+def load_tsv_ranges(gs_path: str, tg_path: str, start: int, end: int) -> Tuple[List[ELInstance], List[ELInstance]]:
+    """GSデータと評価対象データの位置がstart以上end未満の語を読み込みます．
+    範囲内で始まるメンションの続きと，それと重なる他方のメンションも読み込むため，どちらかのIタグが続く間は両方を読み進めます．"""
+    gs_els = []
+    tg_els = []
+    with open(gs_path) as gs_f, open(tg_path) as tg_f:
+        # 見出し行を飛ばします
+        lines = itertools.zip_longest(itertools.islice(gs_f, start + 1, None), itertools.islice(tg_f, start + 1, None))
+        for i, (gs_line, tg_line) in enumerate(lines, start):
+            gs = None if gs_line is None else ELInstance(gs_line.rstrip(), i)
+            tg = None if tg_line is None else ELInstance(tg_line.rstrip(), i)
+            if i >= end and (gs is None or gs.iob2 != 'I') and (tg is None or tg.iob2 != 'I'):
+                break
+            if gs is not None:
+                gs_els.append(gs)
+            if tg is not None:
+                tg_els.append(tg)
+    return gs_els, tg_els
+
+
+def continued_mention(els: List[ELInstance], start: int) -> Optional[MentionInstance]:
+    """範囲の先頭（位置start）がIタグの場合，前の範囲で始まったメンションのうち範囲内の部分を返します．"""
+    if start == 0 or len(els) == 0 or els[0].index != start or els[0].iob2 != 'I':
+        return None
+    ret = MentionInstance(els[0])
+    for ins in els:
+        if ins.iob2 != 'I':
+            break
+        ret.set_end_el(ins)
+    return ret
+
+
 def extract_mentions(els: List[ELInstance]) -> List[MentionInstance]:
     ret = []
     current = None
@@ -258,29 +437,29 @@ def extract_mentions(els: List[ELInstance]) -> List[MentionInstance]:
     return ret
 
 
-def main():
-    args = get_args()
-
-    # GS読み込み
-    gs_els = load_tsv(args.gs_data)
-    gs_mentions = extract_mentions(gs_els)
-    
-    # 評価対象読み込み
-    tg_els = load_tsv(args.input_file)
-    tg_mentions = extract_mentions(tg_els)
-
+def score(gs_els: List[ELInstance], tg_els: List[ELInstance],
+          gs_mentions: List[MentionInstance], tg_mentions: List[MentionInstance],
+          end: Optional[int] = None, gs_partners: Optional[List[MentionInstance]] = None,
+          tg_partners: Optional[List[MentionInstance]] = None) -> Tuple[MentionEval, SDEval]:
+    """メンション抽出と曖昧性解消の正解数等を数えます．endを指定すると，メンション抽出は位置がend未満の語のみ数えます．
+    範囲の重なりはgs_partnersとtg_partners（省略時はgs_mentionsとtg_mentions）との間で調べます．"""
     m_eval = MentionEval()
     s_eval = SDEval()
 
     # メンション抽出
     for gs, tg in zip(gs_els, tg_els):
+        if end is not None and gs.index >= end:
+            break
         m_eval.add_eval(gs.iob2, tg.iob2)
     
     # 曖昧性解消抽出
-    s_eval.eval(gs_mentions, tg_mentions)
-    
-    # 出力
-    return json.dumps({
+    s_eval.eval(gs_mentions, tg_mentions, gs_partners, tg_partners)
+    return m_eval, s_eval
+
+
+def aggregate(m_eval: MentionEval, s_eval: SDEval) -> dict:
+    """集計結果から，出力のJSONに相当する辞書を返します．"""
+    return {
         'success': True,
         'rep_score': s_eval.f1_title(),
         'version': DATA_VERSION,
@@ -306,9 +485,78 @@ def main():
             'target_correct_title': s_eval.cnt['tg_crr_title'],
             'gs_correct_title': s_eval.cnt['gs_crr_title'],
             'target_correct_range': s_eval.cnt['tg_crr_range'],
-            'gs_correct_range': s_eval.cnt['gs_crr_range']
+            'gs_correct_range': s_eval.cnt['gs_crr_range'],
+            'precision_overlap_title': s_eval.precision_overlap_title(),
+            'recall_overlap_title': s_eval.recall_overlap_title(),
+            'f1_overlap_title': s_eval.f1_overlap_title(),
+            'precision_overlap_range': s_eval.precision_overlap_range(),
+            'recall_overlap_range': s_eval.recall_overlap_range(),
+            'f1_overlap_range': s_eval.f1_overlap_range(),
+            'target_overlap_title': s_eval.cnt['tg_ovl_title'],
+            'gs_overlap_title': s_eval.cnt['gs_ovl_title'],
+            'target_overlap_range': s_eval.cnt['tg_ovl_range'],
+            'gs_overlap_range': s_eval.cnt['gs_ovl_range']
         }
-    }, ensure_ascii=False)
+    }
+
+
+def evaluate(gs_els: List[ELInstance], tg_els: List[ELInstance],
+             gs_mentions: Optional[List[MentionInstance]] = None) -> dict:
+    """読み込み済みのGSデータと評価対象データを評価し，出力のJSONに相当する辞書を返します．"""
+    if gs_mentions is None:
+        gs_mentions = extract_mentions(gs_els)
+    tg_mentions = extract_mentions(tg_els)
+    return aggregate(*score(gs_els, tg_els, gs_mentions, tg_mentions))
+
+
+def evaluate_shard(gs_path: str, tg_path: str, shard: Tuple[int, int]) -> dict:
+    """GSデータと評価対象データの語の並びのうち，分割のi番目の範囲のみを評価し，正解数等の数を返します．"""
+    start, end = shard_range(max(count_tokens(gs_path), count_tokens(tg_path)), shard)
+    gs_els, tg_els = load_tsv_ranges(gs_path, tg_path, start, end)
+
+    # 範囲内で始まるメンションを数え，範囲の重なりは境界をまたぐメンションとも調べます
+    gs_partners = extract_mentions(gs_els)
+    tg_partners = extract_mentions(tg_els)
+    gs_mentions = [x for x in gs_partners if x.start_idx < end]
+    tg_mentions = [x for x in tg_partners if x.start_idx < end]
+    gs_partners[:0] = [x for x in [continued_mention(gs_els, start)] if x is not None]
+    tg_partners[:0] = [x for x in [continued_mention(tg_els, start)] if x is not None]
+    m_eval, s_eval = score(gs_els, tg_els, gs_mentions, tg_mentions, end, gs_partners, tg_partners)
+    return {
+        'success': True,
+        'task': 'entity',
+        'version': DATA_VERSION,
+        'shard': list(shard),
+        'mention': dict(m_eval.cnt),
+        'disambiguation': dict(s_eval.cnt)
+    }
+
+
+def merge_partials(partials: List[dict]) -> dict:
+    """分割評価の正解数等の数を統合し，出力のJSONに相当する辞書を返します．"""
+    m_eval = MentionEval()
+    s_eval = SDEval()
+    for p in partials:
+        m_eval.cnt.update(p['mention'])
+        s_eval.cnt.update(p['disambiguation'])
+    return aggregate(m_eval, s_eval)
+
+
+def main():
+    args = get_args()
+
+    # 分割評価
+    if args.shard is not None:
+        return json.dumps(evaluate_shard(args.gs_data, args.input_file, args.shard), ensure_ascii=False)
+
+    # GS読み込み
+    gs_els = load_tsv(args.gs_data)
+    
+    # 評価対象読み込み
+    tg_els = load_tsv(args.input_file)
+
+    # 出力
+    return json.dumps(evaluate(gs_els, tg_els), ensure_ascii=False)
 
 
 if __name__ == "__main__":
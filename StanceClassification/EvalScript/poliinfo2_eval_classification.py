@@ -41,7 +41,12 @@
     ]
 }
 
-更新：2020.07.05
+【インスタンスごとの出力】-oを指定すると，"ins"の要素を標準出力に含めず，ファイルに出力します．
+--ins-formatで書式を指定します．
+・ndjson：1件1行のJSON（"ins"の要素と同じ書式）
+・columnar：列ごとの配列をnumpyの.npz形式で出力します（numpyが必要です）．列名は"ins"の要素のキーで，nullはnanとします．
+
+更新：2026.10.19
 作成者：乙武 北斗
 """
 
@@ -50,7 +55,7 @@ import sys
 import argparse
 import json
 from collections import Counter
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 # データバージョン
 DATA_VERSION = 'v20200708'
@@ -110,6 +115,49 @@ class EvalInstance(object):
         }
 
 
+class NDJSONWriter(object):
+    """インスタンスごとの評価結果を1件1行のJSONとして逐次書き出します．"""
+
+    def __init__(self, path: str):
+        self.f = open(path, 'w')
+
+    def write(self, record: dict):
+        self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.f.close()
+
+
+class ColumnarWriter(object):
+    """インスタンスごとの評価結果を列ごとの配列にまとめ，numpyの.npz形式で書き出します．"""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.columns: Dict[str, list] = {}
+
+    def write(self, record: dict):
+        for k, v in record.items():
+            self.columns.setdefault(k, []).append(v)
+
+    def close(self):
+        import numpy as np
+        columns = {}
+        for k, v in self.columns.items():
+            if k == 'ID':
+                columns[k] = np.array(v)
+            elif all(isinstance(x, int) for x in v):
+                columns[k] = np.array(v, dtype=np.int64)
+            else:
+                columns[k] = np.array([math.nan if x is None else x for x in v], dtype=np.float64)
+        # np.savezは拡張子.npzを補うため，ファイルオブジェクトに書き出します
+        with open(self.path, 'wb') as f:
+            np.savez(f, **columns)
+
+
+# インスタンスごとの出力の書式
+ins_writers = {'ndjson': NDJSONWriter, 'columnar': ColumnarWriter}
+
+
 def get_args():
     parser = argparse.ArgumentParser(
         description="""NTCIR-15 QA Lab PoliInfo2 Stance Classificationタスクの自動評価スクリプト．
@@ -161,6 +209,16 @@ def get_args():
                         required=True,
                         help='入力データを指定します'
                         )
+
+    parser.add_argument('-o', '--ins-output',
+                        default=None,
+                        help='インスタンスごとの評価結果（"ins"）を標準出力に含めず，出力するファイルを指定します'
+                        )
+
+    parser.add_argument('--ins-format',
+                        choices=list(ins_writers.keys()), default='ndjson',
+                        help='インスタンスごとの評価結果の書式を指定します（ndjson：1件1行のJSON，columnar：列ごとの配列（.npz））'
+                        )
     return parser.parse_args()
 
 
@@ -168,22 +226,15 @@ def load_json(json_str: str) -> Dict[str, SCInstance]:
     return {x['ID']: SCInstance(x) for x in json.loads(json_str)}
 
 
-def main():
-    args = get_args()
-
-    # GS読み込み
-    with open(args.gs_data) as f:
-        gss = load_json(f.read())
-    
-    # 評価対象読み込み
-    with open(args.input_file) as f:
-        targets = load_json(f.read())
-    
+def check_targets(targets: Dict[str, SCInstance]):
     # 古いIDチェック
     if len(targets) > 0:
         if any([list(targets.keys())[0].startswith(prefix) for prefix in old_id_prefix]):
             raise Exception('入力データのIDが古いバージョンになっています．')
-    
+
+
+def count_labels(gss: Dict[str, SCInstance], targets: Dict[str, SCInstance]) -> Tuple[Dict[str, EvalInstance], EvalInstance]:
+    """GSデータ各々の正解数等を数え，インスタンスごとと全体の集計を返します．"""
     # 評価結果
     evals: Dict[str, EvalInstance] = {}
     total_eval = EvalInstance('#TOTAL#')
@@ -232,9 +283,15 @@ def main():
     
     #     # スコアの記録
     #     evals[target.id] = ev
-    
-    # 出力
-    return json.dumps({
+
+    return evals, total_eval
+
+
+def aggregate(evals: Dict[str, EvalInstance], total_eval: EvalInstance, writer=None) -> dict:
+    """集計結果から，出力のJSONに相当する辞書を返します．
+    writerを指定すると，インスタンスごとの評価結果は書き出し，"ins"を含めません．
+    """
+    ret = {
         'success': True,
         'rep_score': total_eval.accuracy(),
         'version': DATA_VERSION,
@@ -247,9 +304,44 @@ def main():
             'P反対': total_eval.precision('反対'),
             'R賛成': total_eval.recall('賛成'),
             'R反対': total_eval.recall('反対')
-        },
-        'ins': [ev.to_dict() for ev in evals.values()]
-    }, ensure_ascii=False)
+        }
+    }
+    if writer is not None:
+        for ev in evals.values():
+            writer.write(ev.to_dict())
+    else:
+        ret['ins'] = [ev.to_dict() for ev in evals.values()]
+    return ret
+
+
+def evaluate(gss: Dict[str, SCInstance], targets: Dict[str, SCInstance], writer=None) -> dict:
+    """読み込み済みのGSデータと評価対象データを評価し，出力のJSONに相当する辞書を返します．"""
+    check_targets(targets)
+    return aggregate(*count_labels(gss, targets), writer)
+
+
+def main():
+    args = get_args()
+
+    # GS読み込み
+    with open(args.gs_data) as f:
+        gss = load_json(f.read())
+    
+    # 評価対象読み込み
+    with open(args.input_file) as f:
+        targets = load_json(f.read())
+
+    # インスタンスごとの出力
+    if args.ins_output is None:
+        return json.dumps(evaluate(gss, targets), ensure_ascii=False)
+    writer = ins_writers[args.ins_format](args.ins_output)
+    try:
+        result = evaluate(gss, targets, writer)
+    finally:
+        writer.close()
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 東京都議会会議録の重複発言検出スクリプト．
+動作要件として，以下のモジュールが必要です．
+・numpy
+
+会議録の発言（Utterance）をMinHashの署名に変換してLSH（署名を帯に分けたバケット）に登録し，
+ほぼ同じ内容の発言（委員会ファイル間で重複する会議録や，出席者一覧等の定型文）をまとめます．
+・署名：NFKC正規化して空白類を除いた発言の文字n-gramを64bitの多項式ハッシュで整数にし，
+  num_perm個のハッシュ関数（(a * x + b) mod 2**64 の上位32bit）の最小値をnumpyでまとめて求めます．
+・LSH：署名をbands個の帯に分け，いずれかの帯が一致する発言の組を候補とし，
+  署名の一致率（Jaccard係数の推定値）がしきい値以上の組を同じまとまりとします．
+まとまりごとに日付・ファイル名・会議・行番号が最も早い発言を代表とし，それ以外の発言を重複として出力します．
+一致率がしきい値以上の組をつないでまとめるため，代表との一致率はしきい値を下回る場合があります．
+署名はファイル単位で求めるため，-jで複数プロセスに分割できます．
+updateは索引に登録済みのファイルのうち，サイズか更新日時が変わったもののみを登録し直し，
+新しいファイルを追加します．ファイルの処理順によらず，buildで作り直した場合と同じ結果になります．
+
+【使い方】
+# 索引の構築（省略時は配布している会議録全体）
+python poliinfo2_dedup_index.py build -o dedup.idx -j 4
+# 会議録の追加・更新
+python poliinfo2_dedup_index.py update -i dedup.idx -m ../TopicDetection
+# 重複の対応表の出力
+python poliinfo2_dedup_index.py dedup -i dedup.idx -o dedup.jsonl -t 0.8
+# 重複を除いて検索用の転置インデックスを構築
+python poliinfo2_minutes_index.py build -o minutes.idx --dedup-map dedup.jsonl
+
+【出力】dedupは重複と判定した発言1件ごとに以下のJSONを1行として出力します（JSON Lines）．
+{
+    "File": string,         // 会議録ファイル名
+    "Meeting": int,         // ファイル内の会議の番号（0始まり）
+    "Line": int,            // 会議内の発言の通し番号
+    "Speaker": string,      // 発言者
+    "DuplicateOf": {        // 代表の発言
+        "File": string,
+        "Meeting": int,
+        "Line": int
+    },
+    "Similarity": float     // 代表の発言との署名の一致率
+}
+
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "num_files": int,       // 索引に登録したファイル数
+    "num_docs": int,        // 索引に登録した発言数
+    "num_indexed_files": int,   // 署名を求めたファイル数（build / update）
+    "num_removed_files": int,   // 索引から取り除いたファイル数（update）
+    "num_clusters": int,    // 重複を含むまとまりの数（dedup）
+    "num_duplicates": int   // 重複と判定した発言数（dedup）
+}
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import pickle
+import argparse
+import json
+import multiprocessing
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from poliinfo2_minutes import iter_meetings, list_minutes_files, normalize_text, parse_date
+
+# 索引の書式バージョン
+INDEX_VERSION = 1
+
+# 文字n-gram・帯のハッシュの基数
+HASH_BASE = np.uint64(1000003)
+
+# 発言の位置（ファイル名, 会議の番号, 行番号）
+DocKey = Tuple[str, int, int]
+
+# 発言IDはファイルの番号と行の番号を (slot << ROW_BITS) | row として1つの整数にします
+ROW_BITS = 24
+
+
+def shingle_hashes(text: str, ngram: int) -> np.ndarray:
+    """正規化した文字列の文字n-gramを，重複を除いた64bitの整数の配列で返します．"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.uint64)
+    width = max(1, len(codes) - ngram + 1)
+    h = np.zeros(width, dtype=np.uint64)
+    for j in range(min(ngram, len(codes))):
+        h = h * HASH_BASE + codes[j:j + width]
+    h ^= h >> np.uint64(29)
+    return np.unique(h)
+
+
+class MinHasher(object):
+    def __init__(self, num_perm: int = 128, seed: int = 1, chunk_size: int = 4096):
+        rng = np.random.default_rng(seed)
+        self.num_perm: int = num_perm
+        # 乗算・シフトによるハッシュ関数の係数（aは奇数）
+        self.a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1) | np.uint64(1))[:, None]
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None] << np.uint64(1)
+        # 一時配列を確保し直さないよう，n-gramをchunk_size個ずつ同じ領域で計算します
+        self.chunk_size: int = chunk_size
+        self.buffer = np.empty((num_perm, chunk_size), dtype=np.uint64)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        """ハッシュ関数ごとの最小値を返します．n-gramがない場合はすべて2**32 - 1とします．"""
+        ret = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for i in range(0, len(shingles), self.chunk_size):
+            x = shingles[None, i:i + self.chunk_size]
+            buf = self.buffer[:, :x.shape[1]]
+            np.multiply(self.a, x, out=buf)
+            np.add(buf, self.b, out=buf)
+            np.minimum(ret, buf.min(axis=1), out=ret)
+        # 最小値の上位32bitは，上位32bitの最小値と同じです
+        return (ret >> np.uint64(32)).astype(np.uint32)
+
+
+class FileEntry(object):
+    """1ファイル分の発言の位置と署名です．"""
+
+    def __init__(self, path: str, size: int, mtime: float):
+        self.path: str = path
+        self.name: str = os.path.basename(path)
+        self.size: int = size
+        self.mtime: float = mtime
+        self.meetings = array('I')
+        self.lines = array('I')
+        self.dates = array('I')  # 日付の序数（datetime.date.toordinal，不明な場合は0）
+        self.speakers: List[str] = []
+        self.signatures: np.ndarray = np.empty((0, 0), dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def changed(self) -> bool:
+        """ファイルが削除されたか，サイズか更新日時が変わったかを返します．"""
+        if not os.path.exists(self.path):
+            return True
+        st = os.stat(self.path)
+        return st.st_size != self.size or st.st_mtime != self.mtime
+
+
+# ワーカープロセスごとの状態
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(num_perm: int, seed: int, ngram: int, min_chars: int):
+    _worker['hasher'] = MinHasher(num_perm, seed)
+    _worker['ngram'] = ngram
+    _worker['min_chars'] = min_chars
+
+
+def _signature_file(path: str) -> FileEntry:
+    hasher: MinHasher = _worker['hasher']
+    st = os.stat(path)
+    entry = FileEntry(path, st.st_size, st.st_mtime)
+    signatures = []
+    for meeting_idx, meeting in enumerate(iter_meetings(path)):
+        date = parse_date(meeting.get('Date'))
+        for i, ut in enumerate(meeting.get('Proceeding', [])):
+            text = normalize_text(ut.get('Utterance', ''))
+            if len(text) < _worker['min_chars']:
+                continue
+            entry.meetings.append(meeting_idx)
+            entry.lines.append(i + 1)
+            entry.dates.append(date.toordinal() if date is not None else 0)
+            entry.speakers.append(ut.get('Speaker', 'null'))
+            signatures.append(hasher.signature(shingle_hashes(text, _worker['ngram'])))
+    if len(signatures) > 0:
+        entry.signatures = np.stack(signatures)
+    else:
+        entry.signatures = np.empty((0, hasher.num_perm), dtype=np.uint32)
+    return entry
+
+
+class UnionFind(object):
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent.get(x, x)
+        return root
+
+    def union(self, x: int, y: int):
+        x = self.find(x)
+        y = self.find(y)
+        if x != y:
+            self.parent[max(x, y)] = min(x, y)
+
+
+class DedupIndex(object):
+    def __init__(self, num_perm: int = 128, bands: int = 16, ngram: int = 5, min_chars: int = 20, seed: int = 1):
+        if num_perm % bands != 0:
+            raise Exception(f'num_perm（{num_perm}）はbands（{bands}）で割り切れる必要があります．')
+        self.version: int = INDEX_VERSION
+        self.num_perm: int = num_perm
+        self.bands: int = bands
+        self.ngram: int = ngram
+        self.min_chars: int = min_chars
+        self.seed: int = seed
+        # ファイルの番号→ファイル．番号は取り除いた後も再利用しません
+        self.files: Dict[int, FileEntry] = {}
+        self.next_slot: int = 0
+        # 帯ごとに，帯のハッシュ→発言IDのリスト
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.files.values())
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """発言×帯ごとの帯のハッシュを返します．"""
+        rows = self.num_perm // self.bands
+        sig = signatures.reshape(len(signatures), self.bands, rows).astype(np.uint64)
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for t in range(rows):
+            keys = keys * HASH_BASE + sig[:, :, t]
+        return keys
+
+    def add(self, entry: FileEntry):
+        slot = self.next_slot
+        self.next_slot += 1
+        self.files[slot] = entry
+        for row, keys in enumerate(self.band_keys(entry.signatures).tolist()):
+            doc_id = (slot << ROW_BITS) | row
+            for band, key in zip(self.buckets, keys):
+                band.setdefault(key, []).append(doc_id)
+
+    def remove(self, slot: int):
+        entry = self.files.pop(slot)
+        for row, keys in enumerate(self.band_keys(entry.signatures).tolist()):
+            doc_id = (slot << ROW_BITS) | row
+            for band, key in zip(self.buckets, keys):
+                docs = band[key]
+                docs.remove(doc_id)
+                if len(docs) == 0:
+                    del band[key]
+
+    def index_files(self, paths: List[str], workers: int = 1) -> int:
+        """ファイルの署名を求めて登録します．登録済みで変更のないファイルは読み飛ばし，変更されたものは登録し直します．"""
+        registered = {x.path: slot for slot, x in self.files.items()}
+        targets = []
+        for path in map(os.path.abspath, paths):
+            slot = registered.get(path)
+            if slot is not None:
+                if not self.files[slot].changed():
+                    continue
+                self.remove(slot)
+            targets.append(path)
+
+        init_args = (self.num_perm, self.seed, self.ngram, self.min_chars)
+        if workers <= 1:
+            _init_worker(*init_args)
+            for path in targets:
+                self.add(_signature_file(path))
+        else:
+            with multiprocessing.Pool(workers, _init_worker, init_args) as pool:
+                for entry in pool.imap(_signature_file, targets):
+                    self.add(entry)
+        return len(targets)
+
+    def prune(self) -> int:
+        """削除されたファイルを索引から取り除きます．"""
+        removed = [slot for slot, x in self.files.items() if not os.path.exists(x.path)]
+        for slot in removed:
+            self.remove(slot)
+        return len(removed)
+
+    def signature(self, doc_id: int) -> np.ndarray:
+        return self.files[doc_id >> ROW_BITS].signatures[doc_id & ((1 << ROW_BITS) - 1)]
+
+    def doc_key(self, doc_id: int) -> DocKey:
+        entry = self.files[doc_id >> ROW_BITS]
+        row = doc_id & ((1 << ROW_BITS) - 1)
+        return entry.name, entry.meetings[row], entry.lines[row]
+
+    def sort_key(self, doc_id: int) -> Tuple[int, str, int, int]:
+        """代表を選ぶ順序（日付，ファイル名，会議の番号，行番号）です．日付が不明な発言は後にします．"""
+        entry = self.files[doc_id >> ROW_BITS]
+        row = doc_id & ((1 << ROW_BITS) - 1)
+        date = entry.dates[row] or sys.maxsize
+        return date, entry.name, entry.meetings[row], entry.lines[row]
+
+    def clusters(self, threshold: float) -> List[List[int]]:
+        """同じバケットに入った発言の組のうち，署名の一致率がthreshold以上のものをまとめます．"""
+        uf = UnionFind()
+        for band in self.buckets:
+            for docs in band.values():
+                if len(docs) < 2:
+                    continue
+                # 近い発言の組は多くの帯で同じバケットに入るため，まとめ済みのバケットは読み飛ばします
+                root = uf.find(docs[0])
+                if all(uf.find(d) == root for d in docs[1:]):
+                    continue
+                # 署名が同じ発言はそのまままとめ，異なる署名どうしのみ一致率を求めます
+                reps: Dict[bytes, int] = {}
+                for d in docs:
+                    uf.union(d, reps.setdefault(self.signature(d).tobytes(), d))
+                if len(reps) < 2:
+                    continue
+                ids = list(reps.values())
+                sigs = np.stack([self.signature(d) for d in ids])
+                for i in range(len(ids) - 1):
+                    sims = (sigs[i + 1:] == sigs[i]).mean(axis=1)
+                    for j in np.nonzero(sims >= threshold)[0].tolist():
+                        uf.union(ids[i], ids[i + 1 + j])
+        # 親を持つ発言とその根（根は親を持ちません）をまとまりごとに集めます
+        groups: Dict[int, List[int]] = {}
+        for d in list(uf.parent.keys()):
+            root = uf.find(d)
+            groups.setdefault(root, [root]).append(d)
+        ret = [sorted(g, key=self.sort_key) for g in groups.values() if len(g) > 1]
+        ret.sort(key=lambda g: self.sort_key(g[0]))
+        return ret
+
+    def iter_duplicates(self, threshold: float) -> Iterator[dict]:
+        """重複と判定した発言を，代表の発言の順に返します．"""
+        for group in self.clusters(threshold):
+            rep = group[0]
+            rep_sig = self.signature(rep)
+            rep_file, rep_meeting, rep_line = self.doc_key(rep)
+            for d in group[1:]:
+                name, meeting, line = self.doc_key(d)
+                entry = self.files[d >> ROW_BITS]
+                yield {
+                    'File': name,
+                    'Meeting': meeting,
+                    'Line': line,
+                    'Speaker': entry.speakers[d & ((1 << ROW_BITS) - 1)],
+                    'DuplicateOf': {'File': rep_file, 'Meeting': rep_meeting, 'Line': rep_line},
+                    'Similarity': float((self.signature(d) == rep_sig).mean())
+                }
+
+    def save(self, path: str):
+        """パラメータとファイルごとの署名のみを保存します（バケットは読み込み時に作り直します）．"""
+        state = {
+            'version': self.version,
+            'params': [self.num_perm, self.bands, self.ngram, self.min_chars, self.seed],
+            'next_slot': self.next_slot,
+            'files': {slot: x.__dict__ for slot, x in self.files.items()}
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> 'DedupIndex':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if not isinstance(state, dict) or state.get('version') != INDEX_VERSION:
+            raise Exception(f'索引の書式バージョンが異なります．再構築してください．({path})')
+        idx = DedupIndex(*state['params'])
+        for slot, attrs in sorted(state['files'].items()):
+            entry = FileEntry.__new__(FileEntry)
+            entry.__dict__.update(attrs)
+            idx.next_slot = slot
+            idx.add(entry)
+        idx.next_slot = state['next_slot']
+        return idx
+
+
+def load_dedup_map(path: str) -> Dict[DocKey, DocKey]:
+    """dedupの出力を読み込み，重複した発言の位置→代表の発言の位置の辞書を返します．"""
+    ret = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip() == '':
+                continue
+            x = json.loads(line)
+            rep = x['DuplicateOf']
+            ret[(x['File'], x['Meeting'], x['Line'])] = (rep['File'], rep['Meeting'], rep['Line'])
+    return ret
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 東京都議会会議録の重複発言検出スクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help='索引を構築します')
+    p.add_argument('-m', '--minutes', nargs='*', default=None,
+                   help='会議録JSONまたはディレクトリを指定します（省略時は配布データ全体）')
+    p.add_argument('-o', '--output', required=True,
+                   help='索引の出力先を指定します')
+    p.add_argument('-j', '--jobs', type=int, default=1,
+                   help='並列に処理するプロセス数を指定します')
+    p.add_argument('--num-perm', type=int, default=128,
+                   help='MinHashのハッシュ関数の数を指定します')
+    p.add_argument('--bands', type=int, default=16,
+                   help='LSHの帯の数を指定します（num-permの約数）')
+    p.add_argument('-n', '--ngram', type=int, default=5,
+                   help='署名に用いる文字n-gramの長さを指定します')
+    p.add_argument('--min-chars', type=int, default=20,
+                   help='正規化後の文字数がこれ未満の発言を登録しません')
+    p.add_argument('--seed', type=int, default=1,
+                   help='ハッシュ関数の乱数の種を指定します')
+
+    p = sub.add_parser('update', help='索引に会議録を追加・更新します')
+    p.add_argument('-i', '--index', required=True,
+                   help='索引を指定します（上書きします）')
+    p.add_argument('-m', '--minutes', nargs='*', default=None,
+                   help='会議録JSONまたはディレクトリを指定します（省略時は配布データ全体）')
+    p.add_argument('-j', '--jobs', type=int, default=1,
+                   help='並列に処理するプロセス数を指定します')
+
+    p = sub.add_parser('dedup', help='重複の対応表を出力します')
+    p.add_argument('-i', '--index', required=True,
+                   help='索引を指定します')
+    p.add_argument('-o', '--output', required=True,
+                   help='対応表の出力先（JSON Lines）を指定します')
+    p.add_argument('-t', '--threshold', type=float, default=0.8,
+                   help='重複とみなす署名の一致率の下限を指定します')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    result = {'success': True}
+
+    if args.command == 'build':
+        idx = DedupIndex(args.num_perm, args.bands, args.ngram, args.min_chars, args.seed)
+        result['num_indexed_files'] = idx.index_files(list_minutes_files(args.minutes), args.jobs)
+        idx.save(args.output)
+
+    elif args.command == 'update':
+        idx = DedupIndex.load(args.index)
+        result['num_removed_files'] = idx.prune()
+        result['num_indexed_files'] = idx.index_files(list_minutes_files(args.minutes), args.jobs)
+        idx.save(args.index)
+
+    else:
+        idx = DedupIndex.load(args.index)
+        clusters = set()
+        num_duplicates = 0
+        with open(args.output, 'w') as f:
+            for x in idx.iter_duplicates(args.threshold):
+                clusters.add((x['DuplicateOf']['File'], x['DuplicateOf']['Meeting'], x['DuplicateOf']['Line']))
+                num_duplicates += 1
+                f.write(json.dumps(x, ensure_ascii=False) + '\n')
+        result['num_clusters'] = len(clusters)
+        result['num_duplicates'] = num_duplicates
+
+    result['num_files'] = len(idx.files)
+    result['num_docs'] = len(idx)
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Dialog Summarizationの抽出型オラクル・ベースライン要約生成スクリプト．
+動作要件として，以下のモジュールが必要です．
+・mecab-python3
+
+Training-Segmented等の正解要約付きのインスタンスについて，poliinfo2_line_index.pyの索引から
+質問・答弁の原文を取り出し，文単位の抽出型要約をQuestionLength/AnswerLengthの文字数以内で生成します．
+・oracle：評価スクリプトと同じextract_words（内容語）で，ROUGE-1-Rが最大となる文を貪欲に選択します．
+  文を1つ加えたときの増分は，選択済みの語の出現数を保持して加える文の語についてのみ計算します．
+・lead：原文の先頭から順に，文字数制限に収まる文を選択します．
+選択した文は原文での出現順に連結します．
+
+【使い方】
+python poliinfo2_ds_baseline.py -f PoliInfo2-DialogSummarization-JA-Formal-Training-Segmented.json -i lines.idx -d [unidic_path] -o oracle.json
+python poliinfo2_ds_baseline.py -f PoliInfo2-DialogSummarization-JA-Formal-Training-Segmented.json -i lines.idx -d [unidic_path] -o lead.json -m lead -j 4
+
+【出力】要約はAnswerSheetと同じJSON書式（QuestionSummary/AnswerSummaryを記入したもの）でファイルに出力し，
+poliinfo2_eval_summarization_cli.pyの入力にそのまま利用できます．
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "method": string,          // oracle または lead
+    "num_instances": int,      // インスタンス数
+    "num_missing_lines": int,  // 索引に見つからなかった行の数
+    "rouge_1_r": {             // 内容語のROUGE-1-R（クリップした一致語数/正解要約の語数）のマクロ平均
+        "QA": float,
+        "Q": float,
+        "A": float
+    }
+}
+
+更新：2026.10.19
+"""
+
+import re
+import sys
+import argparse
+import json
+import multiprocessing
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import MeCab
+
+from poliinfo2_evalscripts import import_eval_script
+from poliinfo2_line_index import LineIndex, instance_passages
+
+# 評価スクリプトの語の取り出し方を用います
+extract_words = import_eval_script('summarization').extract_words
+
+# 文の区切り（句点の直後と改行）
+sentence_regex = re.compile(r'[^。\n]+。?')
+
+methods = ['oracle', 'lead']
+
+# ワーカープロセスごとの状態
+_worker: Dict[str, object] = {}
+
+
+class Sentence(object):
+    def __init__(self, idx: int, text: str, words: List[str]):
+        self.idx: int = idx
+        self.text: str = text
+        self.words: Counter = Counter(words)
+
+
+def split_sentences(text: str) -> List[str]:
+    ret = []
+    for m in sentence_regex.finditer(text):
+        s = m.group(0).strip(' 　')
+        if s != '':
+            ret.append(s)
+    return ret
+
+
+def recall(summary: Counter, reference: Counter) -> float:
+    total = sum(reference.values())
+    if total == 0:
+        return 0.0
+    return sum(min(c, summary[w]) for w, c in reference.items()) / total
+
+
+def select_oracle(sentences: List[Sentence], reference: Counter, limit: int) -> List[Sentence]:
+    """ROUGE-1-Rの増分が最大の文を，文字数制限に収まる範囲で増分がなくなるまで選択します．"""
+    selected: List[Sentence] = []
+    current: Counter = Counter()
+    length = 0
+    remaining = [s for s in sentences if len(s.text) <= limit]
+    while len(remaining) > 0:
+        best = None
+        best_gain = 0
+        for s in remaining:
+            if length + len(s.text) > limit:
+                continue
+            # 加える文の語についてのみ，クリップした一致語数の増分を計算します
+            gain = 0
+            for w, c in s.words.items():
+                ref = reference.get(w, 0)
+                cur = current[w]
+                if cur < ref:
+                    gain += min(ref, cur + c) - cur
+            if gain > best_gain or (gain == best_gain and gain > 0 and len(s.text) < len(best.text)):
+                best = s
+                best_gain = gain
+        if best is None:
+            break
+        selected.append(best)
+        current.update(best.words)
+        length += len(best.text)
+        remaining = [s for s in remaining if s is not best and length + len(s.text) <= limit]
+    return sorted(selected, key=lambda x: x.idx)
+
+
+def select_lead(sentences: List[Sentence], limit: int) -> List[Sentence]:
+    selected = []
+    length = 0
+    for s in sentences:
+        if length + len(s.text) <= limit:
+            selected.append(s)
+            length += len(s.text)
+    return selected
+
+
+def summarize(mecab, method: str, source: str, reference: str, limit: int) -> Tuple[str, float]:
+    """原文から要約を生成し，要約と内容語のROUGE-1-Rを返します．"""
+    sentences = [Sentence(i, s, extract_words(mecab, s)) for i, s in enumerate(split_sentences(source))]
+    ref = Counter(extract_words(mecab, reference)) if reference != '' else Counter()
+    if method == 'oracle':
+        selected = select_oracle(sentences, ref, limit)
+    else:
+        selected = select_lead(sentences, limit)
+    summary = Counter()
+    for s in selected:
+        summary.update(s.words)
+    return ''.join(s.text for s in selected), recall(summary, ref)
+
+
+def _init_worker(index_path: str, unidic_path: str, method: str):
+    _worker['idx'] = LineIndex.load(index_path)
+    _worker['mecab'] = MeCab.Tagger('-d {0}'.format(unidic_path))
+    _worker['method'] = method
+
+
+def _process(instance: dict) -> Tuple[dict, float, List[float], int]:
+    idx: LineIndex = _worker['idx']
+    mecab = _worker['mecab']
+    method: str = _worker['method']
+    passages, missing = instance_passages(idx, instance)
+
+    ret = dict(instance)
+    ret['QuestionSummary'], q_score = summarize(mecab, method, passages['Question'],
+                                                instance.get('QuestionSummary', ''), instance['QuestionLength'])
+    answers = [summarize(mecab, method, p, r, l) for p, r, l in zip(
+        passages['Answer'], instance.get('AnswerSummary', []), instance['AnswerLength'])]
+    ret['AnswerSummary'] = [x[0] for x in answers]
+    return ret, q_score, [x[1] for x in answers], missing
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 Dialog Summarizationの抽出型オラクル・ベースライン要約生成スクリプトです．')
+
+    parser.add_argument('-f', '--input-file',
+                        required=True,
+                        help='正解要約付きのAnswerSheet（Training-Segmented等）を指定します'
+                        )
+
+    parser.add_argument('-i', '--index',
+                        required=True,
+                        help='poliinfo2_line_index.pyで構築した索引を指定します'
+                        )
+
+    parser.add_argument('-d', '--unidic-path',
+                        required=True,
+                        help='MeCabで用いるUnidicのパスを指定します'
+                        )
+
+    parser.add_argument('-o', '--output',
+                        required=True,
+                        help='要約の出力先を指定します'
+                        )
+
+    parser.add_argument('-m', '--method',
+                        choices=methods, default='oracle',
+                        help='要約の生成方法を指定します'
+                        )
+
+    parser.add_argument('-j', '--jobs',
+                        type=int, default=1,
+                        help='並列に処理するプロセス数を指定します'
+                        )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    with open(args.input_file) as f:
+        instances = json.load(f)
+
+    if args.jobs > 1:
+        with multiprocessing.Pool(args.jobs, _init_worker, (args.index, args.unidic_path, args.method)) as pool:
+            results = pool.map(_process, instances, chunksize=max(1, len(instances) // (args.jobs * 8)))
+    else:
+        _init_worker(args.index, args.unidic_path, args.method)
+        results = [_process(x) for x in instances]
+
+    with open(args.output, 'w') as f:
+        json.dump([x[0] for x in results], f, ensure_ascii=False, indent=2)
+
+    # 内容語のROUGE-1-Rのマクロ平均（QAは質問と答弁の平均）
+    n = len(results)
+    q = sum(x[1] for x in results)
+    a = sum(sum(x[2]) / len(x[2]) if len(x[2]) > 0 else 0.0 for x in results)
+    qa = sum((x[1] + sum(x[2])) / (1 + len(x[2])) for x in results)
+
+    # 出力
+    return json.dumps({
+        'success': True,
+        'method': args.method,
+        'num_instances': n,
+        'num_missing_lines': sum(x[3] for x in results),
+        'rouge_1_r': {
+            'QA': qa / n if n > 0 else 0.0,
+            'Q': q / n if n > 0 else 0.0,
+            'A': a / n if n > 0 else 0.0
+        }
+    }, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Entity Linkingの辞書引きベースラインスクリプト．
+
+build：Training等のBIタグ付きTSVから，メンションの形態素の並びごとに
+リンク先のWikipediaタイトルの候補と出現数（事前分布）を集めた別名辞書（JSON）を作成します．
+あわせて，同じTSV中でその形態素の並びが現れた回数を数え，メンションとして現れた割合（リンク確率）を求めます．
+link：別名辞書を形態素単位のトライに変換し，形態素の列を先頭から最長一致で走査して，
+一致した範囲にBIタグと出現数が最大の候補のタイトル・ページを付けたTSVを出力します．
+トライの遷移は(節点, 語ID)を1つの整数にした表に平坦化しており，1語の遷移は辞書の参照1回で済みます．
+
+【使い方】
+python poliinfo2_el_linker.py build -f PoliInfo2-EntityLinking-JA-Formal-Training.tsv -o aliases.json
+python poliinfo2_el_linker.py link -a aliases.json -f PoliInfo2-EntityLinking-JA-Formal-Test.tsv -o linked.tsv
+python poliinfo2_el_linker.py link -a aliases.json -f PoliInfo2-EntityLinking-JA-Formal-Test.tsv -o linked.tsv --min-link-prob 0.5
+
+【入力】TSVはEntity Linkingの評価スクリプトの入力と同じ書式（見出し行付き，タブ区切り，UTF-8 LF改行）です．
+形態素\tIOB2\tメンション\twikipediaタイトル\twikipediaページ
+linkの入力はIOB2以降の列が空でも構いません（形態素の列のみ用います）．
+
+【出力】buildは別名辞書を以下のJSON書式で出力します．
+{
+    "files": [string],          // 作成に用いたTSV
+    "aliases": [
+        {
+            "tokens": [string], // メンションの形態素の並び
+            "mention": string,  // メンションの表記（最も多いもの）
+            "count": int,       // メンションとして現れた回数
+            "occurrences": int, // 形態素の並びが現れた回数
+            "candidates": [     // 出現数の降順
+                {"title": string, "page": string, "count": int}
+            ]
+        }
+    ]
+}
+linkは評価スクリプトの入力と同じ書式のTSVを出力し，poliinfo2_eval.py entityでそのまま評価できます．
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "num_aliases": int,     // 別名辞書の件数（build）またはトライに登録した件数（link）
+    "num_tokens": int,      // 処理した語数
+    "num_mentions": int     // 収集（build）または付与（link）したメンション数
+}
+
+更新：2026.10.19
+"""
+
+import sys
+import argparse
+import json
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+from poliinfo2_evalscripts import import_eval_script
+
+# 根の節点
+ROOT = 0
+# 語の並びの終端でない節点
+NO_ALIAS = -1
+
+
+class Alias(object):
+    def __init__(self, tokens: Tuple[str, ...]):
+        self.tokens: Tuple[str, ...] = tokens
+        self.mentions: Counter = Counter()
+        self.titles: Counter = Counter()
+        self.pages: Dict[str, Counter] = defaultdict(Counter)
+        self.occurrences: int = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.titles.values())
+
+    def candidates(self) -> List[dict]:
+        # 出現数の降順，同数の場合はタイトル順とします
+        return [{'title': title, 'page': self.pages[title].most_common(1)[0][0], 'count': c}
+                for title, c in sorted(self.titles.items(), key=lambda x: (-x[1], x[0]))]
+
+    def toDict(self) -> dict:
+        return {
+            'tokens': list(self.tokens),
+            'mention': self.mentions.most_common(1)[0][0],
+            'count': self.count,
+            'occurrences': self.occurrences,
+            'candidates': self.candidates()
+        }
+
+
+class AliasTrie(object):
+    """語の並びを登録する形態素単位のトライです．遷移は 節点 * 語彙数 + 語ID をキーとする表に持ちます．"""
+
+    def __init__(self, token_seqs: List[Tuple[str, ...]]):
+        self.vocab: Dict[str, int] = {}
+        for tokens in token_seqs:
+            for t in tokens:
+                self.vocab.setdefault(t, len(self.vocab))
+        self.width: int = len(self.vocab)
+        self.transitions: Dict[int, int] = {}
+        # 節点→終端となる語の並びの番号
+        self.outputs = array('l', [NO_ALIAS])
+        for k, tokens in enumerate(token_seqs):
+            node = ROOT
+            for t in tokens:
+                key = node * self.width + self.vocab[t]
+                child = self.transitions.get(key)
+                if child is None:
+                    child = len(self.outputs)
+                    self.transitions[key] = child
+                    self.outputs.append(NO_ALIAS)
+                node = child
+            self.outputs[node] = k
+
+    def encode(self, tokens: List[str]) -> List[int]:
+        """語を語IDに変換します．語彙にない語は-1とします．"""
+        get = self.vocab.get
+        return [get(t, -1) for t in tokens]
+
+    def prefixes(self, ids: List[int], start: int) -> Iterator[Tuple[int, int]]:
+        """startから始まる登録済みの語の並びを，短い順に(終了位置, 番号)で返します．"""
+        transitions = self.transitions
+        outputs = self.outputs
+        width = self.width
+        node = ROOT
+        for j in range(start, len(ids)):
+            x = ids[j]
+            if x < 0:
+                return
+            node = transitions.get(node * width + x)
+            if node is None:
+                return
+            k = outputs[node]
+            if k != NO_ALIAS:
+                yield j + 1, k
+
+    def longest_matches(self, ids: List[int]) -> List[Tuple[int, int, int]]:
+        """先頭から最長一致で走査し，重ならない一致を(開始位置, 終了位置, 番号)で返します．"""
+        transitions = self.transitions
+        outputs = self.outputs
+        width = self.width
+        n = len(ids)
+        ret = []
+        i = 0
+        while i < n:
+            node = ROOT
+            best = None
+            j = i
+            while j < n:
+                x = ids[j]
+                if x < 0:
+                    break
+                node = transitions.get(node * width + x)
+                if node is None:
+                    break
+                j += 1
+                if outputs[node] != NO_ALIAS:
+                    best = j, outputs[node]
+            if best is None:
+                i += 1
+            else:
+                ret.append((i, best[0], best[1]))
+                i = best[0]
+        return ret
+
+
+def read_morphs(filepath: str) -> Tuple[str, List[str]]:
+    """TSVの見出し行と形態素の列を返します．"""
+    morphs = []
+    with open(filepath) as f:
+        header = f.readline().rstrip('\n')
+        for line in f:
+            # 全角空白等の形態素もそのまま出力するため，改行のみを除きます
+            morphs.append(line.rstrip('\r\n').split('\t', 1)[0])
+    return header, morphs
+
+
+def build(args) -> dict:
+    m = import_eval_script('entity')
+    aliases: Dict[Tuple[str, ...], Alias] = {}
+    documents: List[List[str]] = []
+    num_mentions = 0
+
+    # メンションの収集
+    for path in args.input_files:
+        els = m.load_tsv(path)
+        documents.append([ins.morph for ins in els])
+        for mention in m.extract_mentions(els):
+            tokens = tuple(ins.morph for ins in els[mention.start_idx:mention.end_idx + 1])
+            if mention.wikipedia_title is None or '' in tokens:
+                continue
+            alias = aliases.get(tokens)
+            if alias is None:
+                alias = aliases[tokens] = Alias(tokens)
+            alias.mentions[mention.mention or ''.join(tokens)] += 1
+            alias.titles[mention.wikipedia_title] += 1
+            alias.pages[mention.wikipedia_title][mention.wikipedia_page or ''] += 1
+            num_mentions += 1
+
+    # 形態素の並びの出現数（重なりを含めてすべての位置で数えます）
+    entries = sorted(aliases.values(), key=lambda x: x.tokens)
+    trie = AliasTrie([x.tokens for x in entries])
+    for morphs in documents:
+        ids = trie.encode(morphs)
+        for i in range(len(ids)):
+            for _, k in trie.prefixes(ids, i):
+                entries[k].occurrences += 1
+
+    # 出力
+    with open(args.output, 'w') as f:
+        json.dump({
+            'files': args.input_files,
+            'aliases': [x.toDict() for x in entries]
+        }, f, ensure_ascii=False, indent=1)
+    return {
+        'success': True,
+        'num_aliases': len(entries),
+        'num_tokens': sum(len(x) for x in documents),
+        'num_mentions': num_mentions
+    }
+
+
+def load_aliases(filepath: str, min_count: int, min_link_prob: float) -> List[dict]:
+    """別名辞書を読み込み，出現数とリンク確率の下限を満たすものを返します．"""
+    with open(filepath) as f:
+        aliases = json.load(f)['aliases']
+    ret = []
+    for x in aliases:
+        if x['count'] < min_count or len(x['candidates']) == 0:
+            continue
+        if x['occurrences'] > 0 and x['count'] / x['occurrences'] < min_link_prob:
+            continue
+        ret.append(x)
+    return ret
+
+
+def link(args) -> dict:
+    aliases = load_aliases(args.aliases, args.min_count, args.min_link_prob)
+    trie = AliasTrie([tuple(x['tokens']) for x in aliases])
+
+    # 評価対象読み込み
+    header, morphs = read_morphs(args.input_file)
+
+    # 最長一致
+    matches = trie.longest_matches(trie.encode(morphs))
+
+    # 出力
+    rows = [f'{morph}\t\t\t\t' for morph in morphs]
+    for start, end, k in matches:
+        alias = aliases[k]
+        best = alias['candidates'][0]
+        tags = f'\t{alias["mention"]}\t{best["title"]}\t{best["page"]}'
+        rows[start] = f'{morphs[start]}\tB{tags}'
+        for i in range(start + 1, end):
+            rows[i] = f'{morphs[i]}\tI{tags}'
+    with open(args.output, 'w') as f:
+        f.write(header + '\n')
+        for row in rows:
+            f.write(row + '\n')
+    return {
+        'success': True,
+        'num_aliases': len(aliases),
+        'num_tokens': len(morphs),
+        'num_mentions': len(matches)
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 Entity Linkingの辞書引きベースラインスクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help='BIタグ付きのTSVから別名辞書を作成します')
+    p.add_argument('-f', '--input-files', nargs='+', required=True,
+                   help='BIタグ付きのTSV（Training等）を指定します')
+    p.add_argument('-o', '--output', required=True,
+                   help='別名辞書（JSON）の出力先を指定します')
+    p.set_defaults(func=build)
+
+    p = sub.add_parser('link', help='別名辞書の最長一致でBIタグとタイトルを付与します')
+    p.add_argument('-a', '--aliases', required=True,
+                   help='buildで作成した別名辞書を指定します')
+    p.add_argument('-f', '--input-file', required=True,
+                   help='BIタグを付与するTSVを指定します')
+    p.add_argument('-o', '--output', required=True,
+                   help='BIタグを付与したTSVの出力先を指定します')
+    p.add_argument('--min-count', type=int, default=1,
+                   help='メンションとして現れた回数がこれ未満の語の並びを用いません')
+    p.add_argument('--min-link-prob', type=float, default=0.0,
+                   help='リンク確率（メンションとして現れた割合）がこれ未満の語の並びを用いません')
+    p.set_defaults(func=link)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    # 出力
+    return json.dumps(args.func(args), ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 評価スクリプトの共通入口．
+
+4タスク（Dialog Summarization / Stance Classification / Entity Linking / Topic Detection）の評価を
+サブコマンドとして実行します．評価スクリプトは指定したサブコマンドのものだけを読み込むため，
+Stance Classification / Entity LinkingではMeCab・numpy等を読み込みません．
+GSデータは省略時に配布しているものを用います（Topic Detectionは-gの指定が必要です）．
+Dialog Summarization / Entity Linkingは--shard i/Nで分割して評価でき，mergeでN個の出力を統合すると
+1台で評価した場合と同じ集計結果になります（Dialog Summarizationの"ins"は出力しません）．
+-j Nを指定すると，GSデータを1回だけ読み込んで共有メモリに配置し（poliinfo2_gs_store.py），
+N個のワーカープロセスで同じ分割の評価を行って統合します．
+--dbを指定すると，インスタンスごとと全体の評価結果をSQLiteのファイルに蓄積します（poliinfo2_results_db.pyで集計します）．
+
+【使い方】
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path]
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -e native -g PoliInfo2-DialogSummarization-JA-Formal-CorrectAnswer.json
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -c checkpoint.jsonl --resume
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -g PoliInfo2-DialogSummarization-JA-Formal-Training-Unsegmented.json --segments
+python poliinfo2_eval.py stance -f submission.json
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -o ins.ndjson
+python poliinfo2_eval.py stance -f submission.json -o ins.npz --ins-format columnar
+python poliinfo2_eval.py entity -f submission.tsv -g PoliInfo2-EntityLinking-JA-Formal-Test-GSD.tsv
+python poliinfo2_eval.py entity -f submission.tsv -j 4
+python poliinfo2_eval.py stance -f submission.json --db results.sqlite --run-name teamA-run1
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -e native -j 4
+python poliinfo2_eval.py summarization -f submission.json -d [unidic_path] -e native --references alt_gs.json --scoring-formula best
+python poliinfo2_eval.py topic -f submission.json -g topic_gs.json
+python poliinfo2_eval.py summarization -f submission.json --no-mecab
+
+# 分割評価（各ノードで実行し，出力を集めて統合します）
+python poliinfo2_eval.py entity -f submission.tsv --shard 0/2 > shard0.json
+python poliinfo2_eval.py entity -f submission.tsv --shard 1/2 > shard1.json
+python poliinfo2_eval.py merge shard0.json shard1.json
+
+【出力】評価結果は各評価スクリプトの標準出力と同じJSON書式で出力します．
+評価に失敗した場合は以下のJSON書式で出力します．
+{
+    "success": false,
+    "error": string     // エラー内容
+}
+
+更新：2026.10.19
+"""
+
+import sys
+import argparse
+import json
+from typing import List
+
+from poliinfo2_evalscripts import default_gs_paths, import_eval_script
+
+
+def open_ins_writer(args, m):
+    """-oの出力先と--dbの蓄積先をまとめたwriterを返します．-oを指定しない場合はNoneを返し，"ins"を出力します．"""
+    if args.ins_output is None:
+        return None
+    writer = m.ins_writers[args.ins_format](args.ins_output)
+    if args.sink is not None:
+        args.sink.writer = writer
+        return args.sink
+    return writer
+
+
+def eval_summarization(args) -> dict:
+    m = import_eval_script('summarization')
+    args.rouge_engine = m.select_rouge_engine(args.rouge_engine, args.no_mecab)
+    if not args.no_mecab and args.unidic_path is None:
+        raise Exception('MeCabで用いるUnidicのパス（-d）を指定してください．')
+
+    # GS読み込み
+    with open(args.gs_data) as f:
+        gss = m.load_json_todic(f.read())
+
+    # 別の正解の読み込み
+    references = None
+    if args.references:
+        if args.segments or args.jobs > 1:
+            raise Exception('--referencesは--segments，-jと同時に指定できません．')
+        m.load_references(gss, args.references)
+        references = {'files': args.references, 'scoring_formula': args.scoring_formula}
+
+    if args.jobs > 1:
+        return eval_summarization_parallel(args, m, gss)
+    if args.no_mecab:
+        mecab = m.CharTokenizer()
+    else:
+        import MeCab
+        mecab = MeCab.Tagger('-d {0}'.format(args.unidic_path))
+
+    # 評価対象読み込み
+    with open(args.input_file) as f:
+        targets = m.load_json(f.read())
+
+    # チェックポイント
+    checkpoint = None
+    if args.checkpoint is not None:
+        checkpoint = m.Checkpoint(args.checkpoint, args.rouge_engine, args.resume, segments=args.segments,
+                                  references=references, no_mecab=args.no_mecab)
+    elif args.resume:
+        raise Exception('--resumeには-cでチェックポイントファイルを指定してください．')
+
+    # インスタンスごとの出力
+    writer = open_ins_writer(args, m)
+
+    try:
+        if args.shard is not None:
+            m.check_targets(targets)
+            stats, _, errors = m.evaluate_instances(mecab, gss, m.shard_slice(targets, args.shard),
+                                                    progress=args.progress, rouge_engine=args.rouge_engine,
+                                                    checkpoint=checkpoint, writer=writer, segments=args.segments,
+                                                    scoring_formula=args.scoring_formula)
+            return m.partial_result(stats, errors, args.rouge_engine, args.shard, args.segments, references,
+                                    args.no_mecab)
+        return m.evaluate(mecab, gss, targets, progress=args.progress, rouge_engine=args.rouge_engine,
+                          checkpoint=checkpoint, writer=writer, segments=args.segments,
+                          scoring_formula=args.scoring_formula)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if writer is not None:
+            writer.close()
+
+
+def eval_summarization_parallel(args, m, gss) -> dict:
+    from poliinfo2_gs_store import evaluate_summarization
+    if args.checkpoint is not None or args.resume or args.shard is not None or args.no_mecab:
+        raise Exception('-jは-c，--resume，--shard，--no-mecabと同時に指定できません．')
+
+    # インスタンスごとの出力
+    writer = open_ins_writer(args, m)
+    try:
+        return evaluate_summarization(gss, args.input_file, args.unidic_path, args.jobs, args.rouge_engine,
+                                      writer, args.segments)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def eval_stance(args) -> dict:
+    m = import_eval_script('stance')
+
+    # GS読み込み
+    with open(args.gs_data) as f:
+        gss = m.load_json(f.read())
+
+    # 評価対象読み込み
+    with open(args.input_file) as f:
+        targets = m.load_json(f.read())
+
+    # 会派ごとの正誤
+    if args.sink is not None:
+        from poliinfo2_results_db import stance_party_scores
+        args.sink.add_scores(stance_party_scores(gss, targets))
+
+    # インスタンスごとの出力
+    writer = open_ins_writer(args, m)
+    if writer is None:
+        return m.evaluate(gss, targets)
+    try:
+        return m.evaluate(gss, targets, writer)
+    finally:
+        writer.close()
+
+
+def eval_entity(args) -> dict:
+    m = import_eval_script('entity')
+    if args.jobs > 1:
+        if args.shard is not None:
+            raise Exception('-jは--shardと同時に指定できません．')
+        from poliinfo2_gs_store import evaluate_entity
+        return evaluate_entity(args.gs_data, args.input_file, args.jobs)
+    if args.shard is not None:
+        return m.evaluate_shard(args.gs_data, args.input_file, args.shard)
+
+    # GS読み込み
+    gs_els = m.load_tsv(args.gs_data)
+
+    # 評価対象読み込み
+    tg_els = m.load_tsv(args.input_file)
+
+    return m.evaluate(gs_els, tg_els)
+
+
+def eval_topic(args) -> dict:
+    m = import_eval_script('topic')
+    if args.gs_data is None:
+        raise Exception('Topic DetectionのGSデータ（-g）を指定してください．')
+
+    # GS読み込み
+    gss = m.load_topics(args.gs_data)
+
+    # 評価対象読み込み
+    targets = m.load_topics(args.input_file)
+    return m.evaluate(gss, targets, args.ngram, args.threshold)
+
+
+def merge(args) -> dict:
+    partials: List[dict] = []
+    for path in args.partials:
+        with open(path) as f:
+            partials.append(json.load(f))
+
+    # 分割評価の出力の組のチェック
+    if any(not p.get('success') or 'shard' not in p for p in partials):
+        raise Exception('分割評価の出力ではないファイルが含まれています．')
+    for key in ['task', 'version']:
+        if len(set(p[key] for p in partials)) > 1:
+            raise Exception(f'分割評価の出力の{key}が一致しません．')
+    n = partials[0]['shard'][1]
+    if sorted(tuple(p['shard']) for p in partials) != [(i, n) for i in range(n)]:
+        raise Exception(f'分割評価の出力が{n}個の分割に過不足なく対応していません．')
+
+    partials.sort(key=lambda p: p['shard'][0])
+    return import_eval_script(partials[0]['task']).merge_partials(partials)
+
+
+def parse_shard(s: str):
+    """i/N形式の分割の指定を(i, N)に変換します．解釈は評価スクリプトと共通です（--shardの指定時のみ読み込みます）．"""
+    return import_eval_script('entity').parse_shard(s)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 評価スクリプトの共通入口です．')
+    subparsers = parser.add_subparsers(dest='task', required=True)
+
+    # Dialog Summarization
+    p = subparsers.add_parser('summarization', help='Dialog Summarizationを評価します')
+    p.add_argument('-g', '--gs-data',
+                   default=default_gs_paths['summarization'],
+                   help='GSデータを指定します'
+                   )
+    p.add_argument('-f', '--input-file',
+                   required=True,
+                   help='評価対象データを指定します'
+                   )
+    p.add_argument('-d', '--unidic-path',
+                   default=None,
+                   help='MeCabで用いるUnidicのパスを指定します（--no-mecabを指定しない場合は必須です）'
+                   )
+    p.add_argument('--no-mecab',
+                   action='store_true',
+                   help='MeCabを用いずに，語のとり方が文字のスコアのみを計算します'
+                   )
+    p.add_argument('-e', '--rouge-engine',
+                   choices=['perl', 'native'], default=None,
+                   help='ROUGEの計算方法を指定します（native：ROUGE-1.5.5.plを呼び出さずに同じ値を計算します．'
+                        '省略時はperl，--no-mecabではnativeです）'
+                   )
+    p.add_argument('--progress',
+                   action='store_true',
+                   help='進捗を標準エラー出力に表示します'
+                   )
+    p.add_argument('-c', '--checkpoint',
+                   default=None,
+                   help='評価済みのインスタンスを追記するチェックポイントファイルを指定します'
+                   )
+    p.add_argument('--resume',
+                   action='store_true',
+                   help='チェックポイントファイルに記録済みのインスタンスを評価せずに再開します'
+                   )
+    p.add_argument('--segments',
+                   action='store_true',
+                   help='〔1〕〔2〕…の印で区切った要約（Unsegmented）を，区切りごとに正解と対応付けて評価します'
+                   )
+    p.add_argument('--references',
+                   nargs='+', default=None,
+                   help='正解の要約を別に作成したGSデータ（同じ書式・ID）を指定し，複数の正解で評価します'
+                   )
+    p.add_argument('--scoring-formula',
+                   choices=['average', 'best'], default='average',
+                   help='正解が複数の場合の計算方法を指定します（average：一致数の和，best：最も一致する正解）'
+                   )
+    p.add_argument('--shard',
+                   type=parse_shard, default=None,
+                   help='評価対象データをN等分したi番目（0始まり）のみを評価し，集計途中の値を出力します（i/N）'
+                   )
+    p.add_argument('-j', '--jobs',
+                   type=int, default=1,
+                   help='GSデータを共有メモリに配置し，指定した数のワーカープロセスで評価します'
+                   )
+    p.add_argument('-o', '--ins-output',
+                   default=None,
+                   help='インスタンスごとの評価結果（"ins"）を標準出力に含めず，出力するファイルを指定します'
+                   )
+    p.add_argument('--ins-format',
+                   choices=['ndjson', 'columnar'], default='ndjson',
+                   help='インスタンスごとの評価結果の書式を指定します（ndjson：1件1行のJSON，columnar：列ごとの配列（.npz））'
+                   )
+    p.add_argument('--db',
+                   default=None,
+                   help='評価結果を追記するSQLiteのファイルを指定します（poliinfo2_results_db.pyで集計します）'
+                   )
+    p.add_argument('--run-name',
+                   default=None,
+                   help='--dbに登録する実行の名前を指定します（省略時は入力ファイル名と日時，同じ名前の実行は置き換えます）'
+                   )
+    p.set_defaults(func=eval_summarization)
+
+    # Stance Classification
+    p = subparsers.add_parser('stance', help='Stance Classificationを評価します')
+    p.add_argument('-g', '--gs-data',
+                   default=default_gs_paths['stance'],
+                   help='GSデータを指定します'
+                   )
+    p.add_argument('-f', '--input-file',
+                   required=True,
+                   help='評価対象データを指定します'
+                   )
+    p.add_argument('-o', '--ins-output',
+                   default=None,
+                   help='インスタンスごとの評価結果（"ins"）を標準出力に含めず，出力するファイルを指定します'
+                   )
+    p.add_argument('--ins-format',
+                   choices=['ndjson', 'columnar'], default='ndjson',
+                   help='インスタンスごとの評価結果の書式を指定します（ndjson：1件1行のJSON，columnar：列ごとの配列（.npz））'
+                   )
+    p.add_argument('--db',
+                   default=None,
+                   help='評価結果を追記するSQLiteのファイルを指定します（poliinfo2_results_db.pyで集計します）'
+                   )
+    p.add_argument('--run-name',
+                   default=None,
+                   help='--dbに登録する実行の名前を指定します（省略時は入力ファイル名と日時，同じ名前の実行は置き換えます）'
+                   )
+    p.set_defaults(func=eval_stance)
+
+    # Entity Linking
+    p = subparsers.add_parser('entity', help='Entity Linkingを評価します')
+    p.add_argument('-g', '--gs-data',
+                   default=default_gs_paths['entity'],
+                   help='GSデータを指定します'
+                   )
+    p.add_argument('-f', '--input-file',
+                   required=True,
+                   help='評価対象データを指定します'
+                   )
+    p.add_argument('--shard',
+                   type=parse_shard, default=None,
+                   help='語の並びをN等分したi番目（0始まり）の範囲のみを評価し，正解数等の数を出力します（i/N）'
+                   )
+    p.add_argument('-j', '--jobs',
+                   type=int, default=1,
+                   help='GSデータを共有メモリに配置し，指定した数のワーカープロセスで評価します'
+                   )
+    p.add_argument('--db',
+                   default=None,
+                   help='評価結果を追記するSQLiteのファイルを指定します（poliinfo2_results_db.pyで集計します）'
+                   )
+    p.add_argument('--run-name',
+                   default=None,
+                   help='--dbに登録する実行の名前を指定します（省略時は入力ファイル名と日時，同じ名前の実行は置き換えます）'
+                   )
+    p.set_defaults(func=eval_entity)
+
+    # Topic Detection
+    p = subparsers.add_parser('topic', help='Topic Detectionを評価します')
+    p.add_argument('-g', '--gs-data',
+                   default=default_gs_paths['topic'],
+                   help='GSデータを指定します'
+                   )
+    p.add_argument('-f', '--input-file',
+                   required=True,
+                   help='評価対象データを指定します'
+                   )
+    p.add_argument('-n', '--ngram',
+                   type=int, default=2,
+                   help='fuzzyで比べる文字n-gramの長さを指定します'
+                   )
+    p.add_argument('-t', '--threshold',
+                   type=float, default=0.5,
+                   help='fuzzyで対応付けるDice係数の閾値を指定します'
+                   )
+    p.add_argument('--db',
+                   default=None,
+                   help='評価結果を追記するSQLiteのファイルを指定します（poliinfo2_results_db.pyで集計します）'
+                   )
+    p.add_argument('--run-name',
+                   default=None,
+                   help='--dbに登録する実行の名前を指定します（省略時は入力ファイル名と日時，同じ名前の実行は置き換えます）'
+                   )
+    p.set_defaults(func=eval_topic)
+
+    # 分割評価の統合
+    p = subparsers.add_parser('merge', help='--shardで分割して評価した出力を統合します')
+    p.add_argument('partials',
+                   nargs='+',
+                   help='分割評価の出力（JSON）を指定します'
+                   )
+    p.set_defaults(func=merge)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    # 評価結果の蓄積
+    args.sink = None
+    if getattr(args, 'db', None) is not None:
+        if getattr(args, 'shard', None) is not None:
+            raise Exception('--dbは--shardと同時に指定できません．')
+        from poliinfo2_results_db import ResultsSink
+        params = {k: getattr(args, k) for k in ['rouge_engine', 'segments', 'references', 'scoring_formula',
+                                                 'no_mecab', 'ngram', 'threshold']
+                  if getattr(args, k, None) is not None}
+        args.sink = ResultsSink(args.db, args.task, args.run_name, args.input_file, args.gs_data, params)
+    result = args.func(args)
+    if args.sink is not None:
+        args.sink.commit(result)
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 評価スクリプトのベンチマークスクリプト．
+
+配布しているGSデータ・AnswerSheetから，規模を指定して合成したGSデータと評価対象データを生成し，
+3タスクの評価スクリプト（poliinfo2_eval_summarization_cli / poliinfo2_eval_classification /
+poliinfo2_eval_entity）の処理時間をフェーズごとに計測します．
+・generate：合成データを生成します．乱数の種を固定しているため，同じ引数では同じデータになります．
+  - Dialog Summarization：Formal-TestのGSデータを-n倍に複製し，要約を切り詰め・並べ替え等で崩した評価対象
+    （runでは複製ごとにTokenizerを作り直し，同じ要約を複製をまたいでキャッシュから返さないようにします）
+  - Stance Classification：-b件の議案×-p会派の賛否と，一部の賛否を反転した評価対象
+  - Entity Linking：Formal-Test-GSDを-t語まで繰り返したTSVと，一部のメンションを崩した評価対象（逐次書き出し）
+・run：フェーズ（setup / load / tokenize / score / aggregate / output）ごとの時間を-r回計測して最小値をとり，
+  履歴ファイル（JSON Lines）に1行追記します．
+・report：履歴の最新の記録を，同じ条件（合成データの規模とROUGEの計算方法）の直近の記録の中央値と比較し，
+  閾値を超えて遅くなったフェーズを回帰として報告します．
+
+【使い方】
+python poliinfo2_eval_bench.py generate -o bench -n 10 -b 5000 -p 20 -t 2000000
+python poliinfo2_eval_bench.py run -i bench -d [unidic_path] --history bench_history.jsonl
+python poliinfo2_eval_bench.py report --history bench_history.jsonl --threshold 0.1 --strict
+
+【出力】runは標準出力で以下のJSON書式です（履歴ファイルの1行と同じ内容です）．
+{
+    "success": true,
+    "timestamp": string,     // 計測日時（ISO 8601）
+    "label": string,         // -lで指定したラベル
+    "commit": string,        // gitのコミット（取得できない場合はnull）
+    "python": string,
+    "platform": string,
+    "params": {...},         // 合成データの生成条件
+    "rouge_engine": string,
+    "repeat": int,
+    "tasks": {
+        "summarization": {
+            "phases": {"setup": float, "load": float, "tokenize": float, "score": float, "aggregate": float, "output": float},
+            "total": float,      // 秒
+            "unit": string,      // 処理量の単位（instances / labels / tokens）
+            "count": int,        // 処理量
+            "throughput": float, // count / total
+            "tokenize_throughput": float  // Dialog Summarizationのみ．tokenizeの1秒あたりの語数（解析した要約のMeCabの形態素数）
+        },
+        "stance": {...},
+        "entity": {...}
+    }
+}
+reportは標準出力で以下のJSON書式です．--strictを指定すると，回帰がある場合は終了コード1で終了します．
+{
+    "success": true,
+    "num_baseline": int,     // 比較した記録の数
+    "regressed": bool,
+    "regressions": [
+        {"task": string, "phase": string, "baseline": float, "latest": float, "ratio": float}
+    ],
+    "comparisons": {task: {phase: {"baseline": float, "latest": float, "ratio": float}}}
+}
+
+更新：2026.10.19
+"""
+
+import os
+import re
+import sys
+import argparse
+import json
+import time
+import random
+import datetime
+import platform
+import statistics
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+from poliinfo2_minutes import REPO_ROOT
+from poliinfo2_evalscripts import default_gs_paths, import_eval_script
+
+tasks = ['summarization', 'stance', 'entity']
+
+# 合成データのファイル名
+file_names = {
+    'summarization': ('ds_gs.json', 'ds_submission.json'),
+    'stance': ('sc_gs.json', 'sc_submission.json'),
+    'entity': ('el_gs.tsv', 'el_submission.tsv')
+}
+MANIFEST_NAME = 'manifest.json'
+
+stance_labels = ['賛成', '反対']
+
+# 差がこれ未満（秒）のフェーズは回帰とみなしません
+MIN_DIFF_SECONDS = 0.005
+
+sentence_regex = re.compile(r'[^。]+。?')
+
+
+def perturb_summary(rng: random.Random, text: str) -> str:
+    """要約を切り詰め・文の並べ替え・文字の削除のいずれかで崩します（一部はそのまま残します）．"""
+    x = rng.random()
+    if x < 0.25 or text == '':
+        return text
+    if x < 0.5:
+        return text[:rng.randrange(len(text) + 1)]
+    if x < 0.75:
+        sentences = sentence_regex.findall(text)
+        rng.shuffle(sentences)
+        return ''.join(sentences)
+    return ''.join(c for c in text if rng.random() >= 0.2)
+
+
+def generate_summarization(rng: random.Random, out_dir: str, scale: int) -> int:
+    with open(default_gs_paths['summarization']) as f:
+        base = json.load(f)
+    gs = []
+    submission = []
+    for k in range(scale):
+        for x in base:
+            y = dict(x)
+            y['ID'] = f'{x["ID"]}-{k:04d}'
+            gs.append(y)
+            z = dict(y)
+            z['QuestionSummary'] = perturb_summary(rng, x['QuestionSummary'])
+            z['AnswerSummary'] = [perturb_summary(rng, a) for a in x['AnswerSummary']]
+            submission.append(z)
+    for obj, name in zip((gs, submission), file_names['summarization']):
+        with open(os.path.join(out_dir, name), 'w') as f:
+            json.dump(obj, f, ensure_ascii=False)
+    return len(gs)
+
+
+def generate_stance(rng: random.Random, out_dir: str, num_bills: int, num_parties: int, noise: float) -> int:
+    with open(default_gs_paths['stance']) as f:
+        base = json.load(f)
+    parties = sorted({p for x in base for p in x['ProsConsPartyListBinary']})
+    while len(parties) < num_parties:
+        parties.append(f'会派{len(parties) + 1}')
+    # 配布データの賛成の割合で賛否を決めます
+    labels = [v for x in base for v in x['ProsConsPartyListBinary'].values()]
+    pros_rate = labels.count('賛成') / len(labels)
+    gs = []
+    submission = []
+    for i in range(num_bills):
+        template = base[i % len(base)]
+        pc = {p: '賛成' if rng.random() < pros_rate else '反対' for p in rng.sample(parties, num_parties)}
+        y = {k: v for k, v in template.items() if not k.startswith('ProsConsPartyList')}
+        y['ID'] = f'PoliInfo2-StanceClassification-JA-Bench-{i + 1:07d}'
+        y['ProsConsPartyListBinary'] = pc
+        gs.append(y)
+        z = dict(y)
+        z['ProsConsPartyListBinary'] = {p: (stance_labels[1 - stance_labels.index(v)] if rng.random() < noise else v)
+                                        for p, v in pc.items()}
+        submission.append(z)
+    for obj, name in zip((gs, submission), file_names['stance']):
+        with open(os.path.join(out_dir, name), 'w') as f:
+            json.dump(obj, f, ensure_ascii=False)
+    return num_bills * num_parties
+
+
+def generate_entity(rng: random.Random, out_dir: str, num_tokens: int, noise: float) -> int:
+    """Formal-Test-GSDの本文を繰り返し，num_tokens語のTSVを逐次書き出します．"""
+    with open(default_gs_paths['entity']) as f:
+        header = f.readline()
+        body = f.readlines()
+    gs_path, tg_path = [os.path.join(out_dir, name) for name in file_names['entity']]
+    count = 0
+    with open(gs_path, 'w') as gs_f, open(tg_path, 'w') as tg_f:
+        gs_f.write(header)
+        tg_f.write(header)
+        action = None  # 処理中のメンションの崩し方
+        while count < num_tokens:
+            for line in body:
+                if count >= num_tokens:
+                    break
+                count += 1
+                gs_f.write(line)
+                cols = line.rstrip('\n').split('\t')
+                if len(cols) < 2 or cols[1] not in ('B', 'I'):
+                    action = None
+                    tg_f.write(line)
+                    continue
+                if cols[1] == 'B':
+                    x = rng.random()
+                    action = None if x >= noise else ('drop' if x < noise / 2 else 'title')
+                if action == 'drop':
+                    tg_f.write(cols[0] + '\n')
+                elif action == 'title':
+                    cols[3:5] = ['NIL', 'NIL']
+                    tg_f.write('\t'.join(cols) + '\n')
+                else:
+                    tg_f.write(line)
+    return count
+
+
+class PhaseTimer(object):
+    """フェーズごとの処理時間を計測します．"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def run(self, name: str, func: Callable, *args):
+        start = time.perf_counter()
+        ret = func(*args)
+        self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+        return ret
+
+
+def bench_summarization(in_dir: str, unidic_path: str, rouge_engine: str) -> Dict[str, float]:
+    m = import_eval_script('summarization')
+    gs_path, tg_path = [os.path.join(in_dir, name) for name in file_names['summarization']]
+    timer = PhaseTimer()
+
+    def setup():
+        import MeCab
+        return MeCab.Tagger('-d {0}'.format(unidic_path))
+
+    def load():
+        with open(gs_path) as f:
+            gss = m.load_json_todic(f.read())
+        with open(tg_path) as f:
+            targets = m.load_json(f.read())
+        m.check_targets(targets)
+        return gss, targets
+
+    tagger = timer.run('setup', setup)
+    gss, targets = timer.run('load', load)
+    pairs = [(x, gss[x.id]) for x in targets]
+    # 複製（IDの末尾の番号）ごとのTokenizer
+    tokenizers = []
+
+    def tokenize():
+        ret = []
+        copies = {}
+        for x, g in pairs:
+            copy = copy_of(x.id)
+            if copy not in copies:
+                copies[copy] = m.Tokenizer(tagger)
+            tokenizers.append(copies[copy])
+            ret.append(m.tokenize_instance(copies[copy], x, g))
+        return ret
+
+    tokenized = timer.run('tokenize', tokenize)
+    scores = timer.run('score', lambda: [m.score_instance(q, a, rouge_engine, cache=t.references,
+                                                          types=t.extract_types)
+                                         for t, (q, a) in zip(tokenizers, tokenized)])
+    result = timer.run('aggregate', lambda: m.aggregate(
+        [m.eval_instance(x, g, q, a) for (x, g), (q, a) in zip(pairs, scores)]))
+    timer.run('output', lambda: json.dumps(result, ensure_ascii=False))
+    return timer.phases
+
+
+def copy_of(instance_id: str) -> str:
+    """generateで複製したインスタンスのIDから複製の番号を返します．"""
+    return instance_id.rsplit('-', 1)[-1]
+
+
+def count_summarization_tokens(in_dir: str, unidic_path: str) -> int:
+    """tokenizeで解析する要約（複製ごとに異なる文字列）のMeCabの形態素数を返します．
+    同じ複製の中で同じ要約はキャッシュから返すため，1回だけ数えます．
+    """
+    import MeCab
+    mecab = MeCab.Tagger('-d {0}'.format(unidic_path))
+    gs_path, tg_path = [os.path.join(in_dir, name) for name in file_names['summarization']]
+    parsed = set()
+    count = 0
+    for path in [gs_path, tg_path]:
+        with open(path) as f:
+            for x in json.load(f):
+                for s in [x['QuestionSummary']] + x['AnswerSummary']:
+                    if (copy_of(x['ID']), s) in parsed:
+                        continue
+                    parsed.add((copy_of(x['ID']), s))
+                    count += sum(1 for line in mecab.parse(s).splitlines() if line != 'EOS')
+    return count
+
+
+def bench_stance(in_dir: str) -> Dict[str, float]:
+    m = import_eval_script('stance')
+    gs_path, tg_path = [os.path.join(in_dir, name) for name in file_names['stance']]
+    timer = PhaseTimer()
+
+    def load():
+        with open(gs_path) as f:
+            gss = m.load_json(f.read())
+        with open(tg_path) as f:
+            targets = m.load_json(f.read())
+        m.check_targets(targets)
+        return gss, targets
+
+    gss, targets = timer.run('load', load)
+    evals, total_eval = timer.run('score', m.count_labels, gss, targets)
+    result = timer.run('aggregate', m.aggregate, evals, total_eval)
+    timer.run('output', lambda: json.dumps(result, ensure_ascii=False))
+    return timer.phases
+
+
+def bench_entity(in_dir: str) -> Dict[str, float]:
+    m = import_eval_script('entity')
+    gs_path, tg_path = [os.path.join(in_dir, name) for name in file_names['entity']]
+    timer = PhaseTimer()
+
+    gs_els, tg_els = timer.run('load', lambda: (m.load_tsv(gs_path), m.load_tsv(tg_path)))
+    gs_mentions, tg_mentions = timer.run('tokenize', lambda: (m.extract_mentions(gs_els), m.extract_mentions(tg_els)))
+    m_eval, s_eval = timer.run('score', m.score, gs_els, tg_els, gs_mentions, tg_mentions)
+    result = timer.run('aggregate', m.aggregate, m_eval, s_eval)
+    timer.run('output', lambda: json.dumps(result, ensure_ascii=False))
+    return timer.phases
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', '-C', REPO_ROOT, 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_history(path: str) -> List[dict]:
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip() != '']
+
+
+def comparable(a: dict, b: dict) -> bool:
+    return a.get('params') == b.get('params') and a.get('rouge_engine') == b.get('rouge_engine')
+
+
+def compare(history: List[dict], threshold: float, window: int) -> dict:
+    """最新の記録を，同じ条件の直近window件の記録の中央値と比較します．"""
+    if len(history) == 0:
+        raise Exception('履歴に記録がありません．')
+    latest = history[-1]
+    baselines = [x for x in history[:-1] if comparable(x, latest)][-window:]
+    regressions = []
+    comparisons = {}
+    for task, result in latest['tasks'].items():
+        comparisons[task] = {}
+        for phase, t in list(result['phases'].items()) + [('total', result['total'])]:
+            values = [x['tasks'][task]['phases'].get(phase) if phase != 'total' else x['tasks'][task]['total']
+                      for x in baselines if task in x['tasks']]
+            values = [v for v in values if v is not None]
+            if len(values) == 0:
+                continue
+            base = statistics.median(values)
+            ratio = t / base if base > 0 else None
+            comparisons[task][phase] = {'baseline': base, 'latest': t, 'ratio': ratio}
+            if ratio is not None and ratio > 1 + threshold and t - base >= MIN_DIFF_SECONDS:
+                regressions.append({'task': task, 'phase': phase, 'baseline': base, 'latest': t, 'ratio': ratio})
+    return {
+        'success': True,
+        'num_baseline': len(baselines),
+        'regressed': len(regressions) > 0,
+        'regressions': regressions,
+        'comparisons': comparisons
+    }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 評価スクリプトのベンチマークスクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('generate', help='合成データを生成します')
+    p.add_argument('-o', '--output-dir', required=True,
+                   help='合成データの出力先ディレクトリを指定します')
+    p.add_argument('-n', '--ds-scale', type=int, default=1,
+                   help='Dialog SummarizationのGSデータを複製する倍数を指定します')
+    p.add_argument('-b', '--bills', type=int, default=1000,
+                   help='Stance Classificationの議案数を指定します')
+    p.add_argument('-p', '--parties', type=int, default=10,
+                   help='Stance Classificationの議案あたりの会派数を指定します')
+    p.add_argument('-t', '--el-tokens', type=int, default=1000000,
+                   help='Entity Linkingの語数（TSVの行数）を指定します')
+    p.add_argument('--noise', type=float, default=0.2,
+                   help='評価対象で賛否の反転・メンションを崩す割合を指定します')
+    p.add_argument('--seed', type=int, default=0,
+                   help='乱数の種を指定します')
+
+    p = sub.add_parser('run', help='処理時間を計測して履歴に追記します')
+    p.add_argument('-i', '--input-dir', required=True,
+                   help='generateで生成したディレクトリを指定します')
+    p.add_argument('-d', '--unidic-path', default=None,
+                   help='MeCabで用いるUnidicのパスを指定します（省略時はDialog Summarizationを計測しません）')
+    p.add_argument('-e', '--rouge-engine', choices=['perl', 'native'], default='native',
+                   help='Dialog SummarizationのROUGEの計算方法を指定します')
+    p.add_argument('--tasks', nargs='+', choices=tasks, default=tasks,
+                   help='計測するタスクを指定します')
+    p.add_argument('-r', '--repeat', type=int, default=3,
+                   help='計測の繰り返し回数を指定します（フェーズごとに最小値をとります）')
+    p.add_argument('-l', '--label', default='',
+                   help='記録に付けるラベルを指定します')
+    p.add_argument('--history', default='bench_history.jsonl',
+                   help='履歴ファイル（JSON Lines）を指定します')
+
+    p = sub.add_parser('report', help='最新の記録を直近の記録と比較します')
+    p.add_argument('--history', default='bench_history.jsonl',
+                   help='履歴ファイル（JSON Lines）を指定します')
+    p.add_argument('--threshold', type=float, default=0.1,
+                   help='回帰とみなす処理時間の増加率を指定します')
+    p.add_argument('-w', '--window', type=int, default=5,
+                   help='比較する直近の記録の数を指定します')
+    p.add_argument('--strict', action='store_true',
+                   help='回帰がある場合に終了コード1で終了します')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    if args.command == 'generate':
+        os.makedirs(args.output_dir, exist_ok=True)
+        rng = random.Random(args.seed)
+        params = {
+            'ds_scale': args.ds_scale,
+            'bills': args.bills,
+            'parties': args.parties,
+            'el_tokens': args.el_tokens,
+            'noise': args.noise,
+            'seed': args.seed
+        }
+        counts = {
+            'summarization': generate_summarization(rng, args.output_dir, args.ds_scale),
+            'stance': generate_stance(rng, args.output_dir, args.bills, args.parties, args.noise),
+            'entity': generate_entity(rng, args.output_dir, args.el_tokens, args.noise)
+        }
+        manifest = {'params': params, 'counts': counts}
+        with open(os.path.join(args.output_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return json.dumps(dict({'success': True}, **manifest), ensure_ascii=False)
+
+    if args.command == 'report':
+        result = compare(read_history(args.history), args.threshold, args.window)
+        if args.strict and result['regressed']:
+            print(json.dumps(result, ensure_ascii=False))
+            sys.exit(1)
+        return json.dumps(result, ensure_ascii=False)
+
+    with open(os.path.join(args.input_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    units = {'summarization': 'instances', 'stance': 'labels', 'entity': 'tokens'}
+    benches = {
+        'summarization': lambda: bench_summarization(args.input_dir, args.unidic_path, args.rouge_engine),
+        'stance': lambda: bench_stance(args.input_dir),
+        'entity': lambda: bench_entity(args.input_dir)
+    }
+    results = {}
+    for task in args.tasks:
+        if task == 'summarization' and args.unidic_path is None:
+            continue
+        runs = [benches[task]() for _ in range(max(1, args.repeat))]
+        phases = {name: min(r[name] for r in runs) for name in runs[0]}
+        total = sum(phases.values())
+        count = manifest['counts'][task]
+        results[task] = {
+            'phases': phases,
+            'total': total,
+            'unit': units[task],
+            'count': count,
+            'throughput': count / total if total > 0 else None
+        }
+        if task == 'summarization':
+            tokens = count_summarization_tokens(args.input_dir, args.unidic_path)
+            results[task]['tokenize_throughput'] = tokens / phases['tokenize'] if phases['tokenize'] > 0 else None
+
+    record = {
+        'success': True,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': manifest['params'],
+        'rouge_engine': args.rouge_engine,
+        'repeat': args.repeat,
+        'tasks': results
+    }
+    # 出力
+    out = json.dumps(record, ensure_ascii=False)
+    with open(args.history, 'a') as f:
+        f.write(out + '\n')
+    return out
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 評価サーバ．
+
+3タスク（Dialog Summarization / Stance Classification / Entity Linking）のGSデータと，
+Dialog Summarization用のMeCab（Unidic）を読み込んだまま常駐し，HTTPで評価を受け付けます．
+localhostのTCPポートまたはUnixドメインソケットで待ち受け，複数の評価要求を並行して処理します．
+MeCabのTaggerは起動時に--pool-size個作成してTokenizerで包み，GSデータの要約を解析しておきます．
+Dialog Summarizationの評価要求はプールから空いているTokenizerを取り出して用い，評価の後に戻すため，
+要求（接続ごとのスレッド）をまたいで辞書の読み込みとGSデータの解析結果を再利用します．
+評価対象の語の語ID・キャッシュは評価の後に捨て（Tokenizer.restore），Tokenizerが要求ごとに大きくならないようにします．
+空いているTokenizerがない場合は，評価を終えたものが戻るまで待ちます．
+
+【使い方】
+python poliinfo2_eval_daemon.py -d [unidic_path] -p 8080
+python poliinfo2_eval_daemon.py -d [unidic_path] -u /tmp/poliinfo2_eval.sock
+python poliinfo2_eval_daemon.py -d [unidic_path] -e native
+python poliinfo2_eval_daemon.py -d [unidic_path] --pool-size 8
+
+# 評価要求（リクエストボディは各評価スクリプトの入力ファイルの内容）
+curl --data-binary @submission.json http://localhost:8080/summarization
+curl --data-binary @submission.json http://localhost:8080/stance
+curl --data-binary @submission.tsv --unix-socket /tmp/poliinfo2_eval.sock http://localhost/entity
+
+# 検証要求（評価の前に評価対象データを検証します．poliinfo2_validate.py）
+curl --data-binary @submission.json http://localhost:8080/validate/summarization
+
+【出力】評価結果は各評価スクリプトの標準出力と同じJSON書式で返します．
+検証結果はpoliinfo2_validate.pyの標準出力と同じJSON書式で返します．
+Dialog Summarizationの検証は，-dを省略してGSデータを読み込んだ場合も受け付けます．
+評価に失敗した場合は以下のJSON書式で返します．
+{
+    "success": false,
+    "error": string     // エラー内容
+}
+GET /healthには以下のJSON書式で返します．
+{
+    "success": true,
+    "tasks": [string],  // 評価を受け付けるタスク
+    "validate_tasks": [string]  // 検証を受け付けるタスク
+}
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import argparse
+import json
+import queue
+import signal
+import socketserver
+import stat
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+from poliinfo2_evalscripts import default_gs_paths, import_eval_script
+import poliinfo2_validate
+
+# リクエストボディの上限（バイト）
+MAX_BODY_SIZE = 256 << 20
+
+
+class EvalService(object):
+    """読み込み済みのGSデータで評価を行います．"""
+
+    def __init__(self, gs_paths: Dict[str, Optional[str]], unidic_path: Optional[str] = None,
+                 rouge_engine: str = 'perl', pool_size: int = 4):
+        self.modules = {}
+        self.gs = {}
+        # 検証に用いるGSデータの索引
+        self.indexes = {}
+        self.unidic_path: Optional[str] = unidic_path
+        self.rouge_engine: str = rouge_engine
+        # Dialog Summarizationの評価に用いる(Tokenizer, GSデータを解析した時点の状態)のプール
+        self.tokenizers: queue.Queue = queue.Queue()
+
+        # GS読み込み
+        if gs_paths.get('summarization') is not None and unidic_path is not None:
+            m = import_eval_script('summarization')
+            with open(gs_paths['summarization']) as f:
+                self.gs['summarization'] = m.load_json_todic(f.read())
+            self.modules['summarization'] = m
+            for _ in range(pool_size):
+                tokenizer = self.new_tokenizer()
+                self.tokenizers.put((tokenizer, tokenizer.snapshot()))
+        if gs_paths.get('stance') is not None:
+            m = import_eval_script('stance')
+            with open(gs_paths['stance']) as f:
+                self.gs['stance'] = m.load_json(f.read())
+            self.modules['stance'] = m
+        if gs_paths.get('entity') is not None:
+            m = import_eval_script('entity')
+            gs_els = m.load_tsv(gs_paths['entity'])
+            self.gs['entity'] = (gs_els, m.extract_mentions(gs_els))
+            self.modules['entity'] = m
+        for task in poliinfo2_validate.tasks:
+            if gs_paths.get(task) is not None:
+                self.indexes[task] = poliinfo2_validate.load_index(task, gs_paths[task])
+
+    def tasks(self):
+        return list(self.modules.keys())
+
+    def validate_tasks(self):
+        return list(self.indexes.keys())
+
+    def new_tokenizer(self):
+        """MeCabのTaggerをTokenizerで包み，GSデータの要約を解析しておいたものを返します．"""
+        import MeCab
+        tokenizer = self.modules['summarization'].Tokenizer(MeCab.Tagger('-d {0}'.format(self.unidic_path)))
+        for gs in self.gs['summarization'].values():
+            for ref in [gs] + gs.alternatives:
+                for x in [ref.question_summary] + ref.answer_summary:
+                    tokenizer.words(x)
+        return tokenizer
+
+    @contextmanager
+    def tokenizer(self) -> Iterator[object]:
+        """プールからTokenizerを取り出し，評価の後にGSデータを解析した時点の状態に戻してプールに返します．"""
+        tokenizer, snapshot = self.tokenizers.get()
+        try:
+            yield tokenizer
+        finally:
+            tokenizer.restore(snapshot)
+            self.tokenizers.put((tokenizer, snapshot))
+
+    def evaluate(self, task: str, body: str) -> dict:
+        m = self.modules[task]
+        if task == 'summarization':
+            targets = m.load_json(body)
+            with self.tokenizer() as tokenizer:
+                return m.evaluate(tokenizer, self.gs[task], targets, progress=False,
+                                  rouge_engine=self.rouge_engine)
+        if task == 'stance':
+            return m.evaluate(self.gs[task], m.load_json(body))
+        gs_els, gs_mentions = self.gs[task]
+        return m.evaluate(gs_els, m.parse_tsv(body.splitlines(keepends=True)), gs_mentions)
+
+    def validate(self, task: str, body: str) -> dict:
+        submission = body.splitlines(keepends=True) if task == 'entity' else body
+        return poliinfo2_validate.validate(task, self.indexes[task], submission)
+
+
+class EvalRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1とし，Expect: 100-continueの要求に即座に応答します
+    protocol_version = 'HTTP/1.1'
+    service: EvalService = None
+    quiet: bool = False
+
+    def send_json(self, status: int, obj: dict):
+        data = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            self.send_json(200, {'success': True, 'tasks': self.service.tasks(),
+                                 'validate_tasks': self.service.validate_tasks()})
+        else:
+            self.send_json(404, {'success': False, 'error': f'不明なパスです．({self.path})'})
+
+    def do_POST(self):
+        task = self.path.strip('/')
+        if task.startswith('validate/'):
+            task = task[len('validate/'):]
+            if task not in self.service.validate_tasks():
+                self.send_json(404, {'success': False, 'error': f'検証を受け付けていないタスクです．({task})'})
+                return
+            process = self.service.validate
+        elif task not in self.service.tasks():
+            self.send_json(404, {'success': False, 'error': f'評価を受け付けていないタスクです．({task})'})
+            return
+        else:
+            process = self.service.evaluate
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0 or length > MAX_BODY_SIZE:
+            self.send_json(400, {'success': False, 'error': f'リクエストボディの長さが不正です．({length})'})
+            return
+        try:
+            body = self.rfile.read(length).decode('utf-8')
+            result = process(task, body)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            self.send_json(200, {'success': False, 'error': str(e)})
+            return
+        self.send_json(200, result)
+
+    def address_string(self) -> str:
+        # Unixドメインソケットではclient_addressが文字列になります
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def remove_socket(path: str):
+    """pathにUnixドメインソケットがあれば削除します．ソケット以外のファイルがある場合は削除せずに例外を投げます．"""
+    if not os.path.lexists(path):
+        return
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise Exception(f'Unixドメインソケットのパスにソケット以外のファイルがあります．({path})')
+    os.remove(path)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 評価サーバです．')
+
+    parser.add_argument('-d', '--unidic-path',
+                        default=None,
+                        help='MeCabで用いるUnidicのパスを指定します（省略時はDialog Summarizationの評価を受け付けません）'
+                        )
+
+    parser.add_argument('-e', '--rouge-engine',
+                        choices=['perl', 'native'], default='perl',
+                        help='Dialog SummarizationのROUGEの計算方法を指定します（native：ROUGE-1.5.5.plを呼び出さずに同じ値を計算します）'
+                        )
+
+    parser.add_argument('--pool-size',
+                        type=int, default=4,
+                        help='Dialog Summarizationの評価に用いるMeCabのTagger（Tokenizer）の数（同時に評価できる数）を指定します'
+                        )
+
+    parser.add_argument('--summarization-gs',
+                        default=default_gs_paths['summarization'],
+                        help='Dialog SummarizationのGSデータを指定します'
+                        )
+
+    parser.add_argument('--stance-gs',
+                        default=default_gs_paths['stance'],
+                        help='Stance ClassificationのGSデータを指定します'
+                        )
+
+    parser.add_argument('--entity-gs',
+                        default=default_gs_paths['entity'],
+                        help='Entity LinkingのGSデータを指定します'
+                        )
+
+    parser.add_argument('-p', '--port',
+                        type=int, default=8080,
+                        help='待ち受けるlocalhostのポート番号を指定します'
+                        )
+
+    parser.add_argument('-u', '--unix-socket',
+                        default=None,
+                        help='待ち受けるUnixドメインソケットのパスを指定します（指定時はTCPで待ち受けません．ソケット以外のファイルがある場合はエラーとします）'
+                        )
+
+    parser.add_argument('-q', '--quiet',
+                        action='store_true',
+                        help='アクセスログを出力しません'
+                        )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    # GSデータを読み込む前に，-uのパスにソケット以外のファイルがないことを確かめます
+    if args.unix_socket is not None:
+        remove_socket(args.unix_socket)
+
+    EvalRequestHandler.service = EvalService({
+        'summarization': args.summarization_gs,
+        'stance': args.stance_gs,
+        'entity': args.entity_gs
+    }, args.unidic_path, args.rouge_engine, args.pool_size)
+    EvalRequestHandler.quiet = args.quiet
+
+    if args.unix_socket is not None:
+        server = ThreadingUnixHTTPServer(args.unix_socket, EvalRequestHandler)
+        address = args.unix_socket
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), EvalRequestHandler)
+        address = f'http://127.0.0.1:{args.port}'
+    print(json.dumps({
+        'success': True,
+        'address': address,
+        'tasks': EvalRequestHandler.service.tasks()
+    }, ensure_ascii=False), flush=True)
+
+    # SIGTERMでも後始末をして終了します
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket is not None:
+            remove_socket(args.unix_socket)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 各タスクの評価スクリプトの読み込みモジュール．
+
+各タスクのEvalScriptディレクトリの評価スクリプトを，必要になった時点でモジュールとして読み込みます．
+Dialog Summarizationの評価スクリプトはMeCab等を読み込むため，他のタスクのみを用いる場合は読み込みません．
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import importlib
+from types import ModuleType
+
+from poliinfo2_minutes import REPO_ROOT
+
+# 評価スクリプトの配置
+SUMMARIZATION_EVAL_DIR = os.path.join(REPO_ROOT, 'DialogSummarization', 'EvalScript')
+STANCE_EVAL_DIR = os.path.join(REPO_ROOT, 'StanceClassification', 'EvalScript')
+ENTITY_EVAL_DIR = os.path.join(REPO_ROOT, 'EntityLinking', 'EvalScript')
+TOPIC_EVAL_DIR = os.path.join(REPO_ROOT, 'TopicDetection', 'EvalScript')
+
+# 配布しているGSデータ
+SUMMARIZATION_GS_PATH = os.path.join(SUMMARIZATION_EVAL_DIR, 'PoliInfo2-DialogSummarization-JA-Formal-CorrectAnswer.json')
+STANCE_GS_PATH = os.path.join(STANCE_EVAL_DIR, 'PoliInfo2-StanceClassification-JA-Formal-CorrectAnswer.json')
+ENTITY_GS_PATH = os.path.join(REPO_ROOT, 'EntityLinking', 'AnswerSheet', 'PoliInfo2-EntityLinking-JA-Formal-Test-GSD.tsv')
+
+# タスク名→(評価スクリプトのディレクトリ, モジュール名)
+tasks = {
+    'summarization': (SUMMARIZATION_EVAL_DIR, 'poliinfo2_eval_summarization_cli'),
+    'stance': (STANCE_EVAL_DIR, 'poliinfo2_eval_classification'),
+    'entity': (ENTITY_EVAL_DIR, 'poliinfo2_eval_entity'),
+    'topic': (TOPIC_EVAL_DIR, 'poliinfo2_eval_topic')
+}
+
+# タスク名→既定のGSデータ（Topic DetectionのGSデータは配布していません）
+default_gs_paths = {
+    'summarization': SUMMARIZATION_GS_PATH,
+    'stance': STANCE_GS_PATH,
+    'entity': ENTITY_GS_PATH,
+    'topic': None
+}
+
+
+def import_eval_script(task: str) -> ModuleType:
+    """タスクの評価スクリプトをモジュールとして読み込みます．"""
+    if task not in tasks:
+        raise Exception(f'タスク名が不正です．({task})')
+    path, name = tasks[task]
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(name)
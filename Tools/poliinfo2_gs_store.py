@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 GSデータの共有メモリ配置モジュール．
+動作要件として，以下のモジュールが必要です．
+・numpy
+
+複数のプロセスで評価する際に，GSデータを親プロセスで1回だけ読み込み，読み取り専用の配列として
+multiprocessing.shared_memoryの1つの領域に配置します．ワーカープロセスは領域の名前で接続し，
+配列をコピーせずに参照します．
+・Entity Linking：load_tsvの結果から，語ごとのIOB2タグの番号（int8），メンションの開始・終了位置，
+  Wikipediaタイトルの番号と，タイトルの文字列表（UTF-8のバイト列と各文字列の開始位置）を配置します．
+・Dialog Summarization：load_json_todicの結果から，ID・要約の文字列表と，Tokenizerで解析した
+  語のとり方ごとの語IDの列（要約ごとの開始位置付き），語IDの文字列表（語彙）を配置します．
+  ワーカーのTokenizerには語彙を同じ順に登録するため，正解の要約を解析し直さずに語IDを比べられます．
+領域の先頭には配列名・型・形状・位置のJSONを置き，各配列は64バイト境界に揃えます．
+同じ配置でファイルに保存し（GSStore.save），np.memmapで読み込むこともできます（GSStore.open）．
+poliinfo2_stance_features.pyの特徴量ファイルはこの形式です．
+
+poliinfo2_eval.pyの-jはこのモジュールを用いて，--shardと同じ分割の評価をワーカープロセスで行い，
+mergeと同じ方法で統合します．
+
+【使い方】
+from poliinfo2_gs_store import evaluate_entity, evaluate_summarization
+result = evaluate_entity(gs_path, input_file, jobs=4)
+
+更新：2026.10.19
+"""
+
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from poliinfo2_evalscripts import import_eval_script
+
+# 領域の先頭の識別子
+MAGIC = b'PI2GS001'
+# 配列の境界
+ALIGNMENT = 64
+# タイトルがないメンション
+NO_TITLE = -1
+
+# ワーカープロセスごとの状態
+_worker: Dict[str, object] = {}
+
+
+def aligned(n: int) -> int:
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def pack_strings(name: str, strings: List[str]) -> Dict[str, np.ndarray]:
+    """文字列のリストを，UTF-8のバイト列（name/blob）と各文字列の開始位置（name/offsets）の配列にします．"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {
+        f'{name}/blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        f'{name}/offsets': offsets
+    }
+
+
+class StoredStrings(object):
+    """pack_stringsで配置した文字列表を，参照した文字列のみ復号して返します．"""
+
+    def __init__(self, store: 'GSStore', name: str):
+        self.blob: np.ndarray = store[f'{name}/blob']
+        self.offsets: np.ndarray = store[f'{name}/offsets']
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def slice(self, start: int, end: int) -> List[str]:
+        return [self[i] for i in range(start, end)]
+
+
+class GSStore(object):
+    """名前付きの配列を1つの連続した領域に配置します．"""
+
+    def __init__(self, meta: dict, arrays: Dict[str, np.ndarray],
+                 shm: Optional[Union[shared_memory.SharedMemory, np.memmap]] = None):
+        self.meta: dict = meta
+        self.arrays: Dict[str, np.ndarray] = arrays
+        # 配列が参照する領域（共有メモリかファイルのメモリマップ）
+        self.shm: Optional[Union[shared_memory.SharedMemory, np.memmap]] = shm
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def layout(self) -> Tuple[bytes, int, Dict[str, int], int]:
+        """(識別子と見出し, 配列の開始位置, 配列ごとの相対位置, 領域全体の大きさ)を返します．"""
+        # 配列の位置は見出しの後の境界からの相対位置とします
+        offsets = {}
+        size = 0
+        for name, a in self.arrays.items():
+            offsets[name] = size
+            size += aligned(a.nbytes)
+        header = json.dumps({
+            'meta': self.meta,
+            'arrays': {name: [a.dtype.str, list(a.shape), offsets[name]] for name, a in self.arrays.items()}
+        }, ensure_ascii=False).encode('utf-8')
+        head = MAGIC + len(header).to_bytes(8, 'little') + header
+        base = aligned(len(head))
+        return head, base, offsets, base + max(size, 1)
+
+    def share(self) -> shared_memory.SharedMemory:
+        """共有メモリの領域を作成して配列を書き込みます．呼び出し側で使用後にclose()とunlink()を行います．"""
+        head, base, offsets, size = self.layout()
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        buf = shm.buf
+        buf[:len(head)] = head
+        for name, a in self.arrays.items():
+            np.ndarray(a.shape, dtype=a.dtype, buffer=buf, offset=base + offsets[name])[...] = a
+        return shm
+
+    def save(self, path: str):
+        """共有メモリと同じ配置でファイルに書き出します．"""
+        head, base, offsets, size = self.layout()
+        with open(path, 'wb') as f:
+            f.write(head)
+            for name, a in self.arrays.items():
+                f.seek(base + offsets[name])
+                f.write(np.ascontiguousarray(a).data)
+            f.truncate(size)
+
+    @staticmethod
+    def from_buffer(buf, owner, source: str) -> 'GSStore':
+        """領域の見出しを読み，配列を読み取り専用のビューとして返します．"""
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise Exception(f'配列を配置した領域ではありません．({source})')
+        length = int.from_bytes(bytes(buf[len(MAGIC):len(MAGIC) + 8]), 'little')
+        header = json.loads(bytes(buf[len(MAGIC) + 8:len(MAGIC) + 8 + length]).decode('utf-8'))
+        base = aligned(len(MAGIC) + 8 + length)
+        store = GSStore(header['meta'], {}, owner)
+        for k, (dtype, shape, offset) in header['arrays'].items():
+            a = np.ndarray(shape, dtype=dtype, buffer=buf, offset=base + offset)
+            a.flags.writeable = False
+            store.arrays[k] = a
+        return store
+
+    @staticmethod
+    def attach(name: str) -> 'GSStore':
+        """共有メモリの領域に接続し，配列を読み取り専用のビューとして返します．"""
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            return GSStore.from_buffer(shm.buf, shm, f'name={name}')
+        except Exception:
+            shm.close()
+            raise
+
+    @staticmethod
+    def open(path: str) -> 'GSStore':
+        """saveで書き出したファイルをメモリマップし，配列を読み取り専用のビューとして返します．"""
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        return GSStore.from_buffer(mm, mm, f'path={path}')
+
+
+def pack_entity(gs_els: list) -> GSStore:
+    """Entity LinkingのGSデータ（load_tsvの結果）を配置します．"""
+    m = import_eval_script('entity')
+    labels = ['', 'B', 'I']
+    label_ids = {x: i for i, x in enumerate(labels)}
+    codes = np.empty(len(gs_els), dtype=np.int8)
+    for i, ins in enumerate(gs_els):
+        k = label_ids.get(ins.iob2)
+        if k is None:
+            k = label_ids[ins.iob2] = len(labels)
+            labels.append(ins.iob2)
+        codes[i] = k
+
+    mentions = m.extract_mentions(gs_els)
+    titles: Dict[str, int] = {}
+    title_ids = [NO_TITLE if x.wikipedia_title is None else titles.setdefault(x.wikipedia_title, len(titles))
+                 for x in mentions]
+    arrays = {
+        'labels': codes,
+        'mention_start': np.array([x.start_idx for x in mentions], dtype=np.int64),
+        'mention_end': np.array([x.end_idx for x in mentions], dtype=np.int64),
+        'mention_title': np.array(title_ids, dtype=np.int32)
+    }
+    arrays.update(pack_strings('titles', list(titles.keys())))
+    return GSStore({'task': 'entity', 'version': m.DATA_VERSION, 'labels': labels}, arrays)
+
+
+class EntityGS(object):
+    """共有メモリに配置したEntity LinkingのGSデータで，分割評価を行います．"""
+
+    def __init__(self, store: GSStore):
+        self.m = import_eval_script('entity')
+        self.store: GSStore = store
+        self.labels: np.ndarray = store['labels']
+        self.mention_start: np.ndarray = store['mention_start']
+        self.mention_end: np.ndarray = store['mention_end']
+        self.mention_title: np.ndarray = store['mention_title']
+        self.titles = StoredStrings(store, 'titles')
+
+    def title(self, k: int) -> Optional[str]:
+        return None if k == NO_TITLE else self.titles[k]
+
+    def evaluate_shard(self, tg_path: str, shard: Tuple[int, int]) -> dict:
+        """evaluate_shardと同じ集計途中の値を返します．GSデータは配置した配列のみを参照します．"""
+        m = self.m
+        n = len(self.labels)
+        start, end = m.shard_range(max(n, m.count_tokens(tg_path)), shard)
+        # 範囲内で始まるGSデータのメンション（と重なる評価対象のメンション）の終わりまで読み込みます
+        lo, hi = np.searchsorted(self.mention_start, [start, end])
+        reach = int(self.mention_end[hi - 1]) + 1 if hi > lo else 0
+        tg_els = m.load_tsv_range(tg_path, start, end, reach)
+        m_eval = m.MentionEval()
+        s_eval = m.SDEval()
+
+        # メンション抽出（BIタグ以外はOとみなします）
+        stop = min(end, n, start + len(tg_els))
+        gs = self.labels[start:stop]
+        tg = np.array([1 if x.iob2 == 'B' else 2 if x.iob2 == 'I' else 0 for x in tg_els[:max(stop - start, 0)]],
+                      dtype=np.int8)
+        for k, v in [('tp', (gs != 0) & (gs == tg)), ('tn', (gs == 0) & (tg == 0)),
+                     ('fp', (gs == 0) & (tg != 0)), ('fn', (gs != 0) & (gs != tg))]:
+            if v.any():
+                m_eval.cnt[k] += int(v.sum())
+
+        # 曖昧性解消（範囲内で始まるメンション）
+        gs_start = self.mention_start[lo:hi]
+        tg_partners = m.extract_mentions(tg_els)
+        tg_mentions = [x for x in tg_partners if x.start_idx < end]
+        s_eval.cnt['tg_cnt'] += len(tg_mentions)
+        s_eval.cnt['gs_cnt'] += int(hi - lo)
+        for tg in tg_mentions:
+            k = lo + int(np.searchsorted(gs_start, tg.start_idx))
+            if k == hi or self.mention_start[k] != tg.start_idx or self.mention_end[k] != tg.end_idx:
+                continue
+            # 開始位置と終了位置が一致する組は，適合率・再現率のどちらでも同じ組として数えます
+            s_eval.cnt['tg_crr_range'] += 1
+            s_eval.cnt['gs_crr_range'] += 1
+            if self.title(int(self.mention_title[k])) == tg.wikipedia_title:
+                s_eval.cnt['tg_crr_title'] += 1
+                s_eval.cnt['gs_crr_title'] += 1
+
+        # 範囲の重なり（GSデータのメンションは終了位置も昇順のため，重なる最初のものを二分探索します）
+        gs_range = np.zeros(hi - lo, dtype=bool)
+        gs_title = np.zeros(hi - lo, dtype=bool)
+        continued = m.continued_mention(tg_els, start)
+        for i, tg in enumerate(([continued] if continued is not None else []) + tg_partners):
+            hit = False
+            title = False
+            k = int(np.searchsorted(self.mention_end, tg.start_idx))
+            while k < len(self.mention_start) and self.mention_start[k] <= tg.end_idx:
+                same = self.title(int(self.mention_title[k])) == tg.wikipedia_title
+                hit = True
+                title = title or same
+                if lo <= k < hi:
+                    gs_range[k - lo] = True
+                    gs_title[k - lo] |= same
+                k += 1
+            if tg.start_idx < end and (continued is None or i > 0):
+                s_eval.cnt['tg_ovl_range'] += hit
+                s_eval.cnt['tg_ovl_title'] += title
+        s_eval.cnt['gs_ovl_range'] += int(gs_range.sum())
+        s_eval.cnt['gs_ovl_title'] += int(gs_title.sum())
+        return {
+            'success': True,
+            'task': 'entity',
+            'version': m.DATA_VERSION,
+            'shard': list(shard),
+            'mention': dict(m_eval.cnt),
+            'disambiguation': dict(s_eval.cnt)
+        }
+
+
+def pack_summarization(gss: dict, tokenizer) -> GSStore:
+    """Dialog SummarizationのGSデータ（load_json_todicの結果）と，Tokenizerで解析した語IDの列を配置します．"""
+    m = import_eval_script('summarization')
+    instances = list(gss.values())
+    answers = [x for gs in instances for x in gs.answer_summary]
+    answer_ptr = np.zeros(len(instances) + 1, dtype=np.int64)
+    np.cumsum([len(gs.answer_summary) for gs in instances], out=answer_ptr[1:])
+
+    # 要約はインスタンスごとに質問，答弁の順に並べます
+    words = [[] for _ in m.extract_types]
+    for gs in instances:
+        for s in [gs.question_summary] + gs.answer_summary:
+            for k, x in enumerate(tokenizer.words(s)):
+                words[k].append(x)
+    arrays = {'answer_ptr': answer_ptr}
+    for k, ws in enumerate(words):
+        ptr = np.zeros(len(ws) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in ws], out=ptr[1:])
+        arrays[f'words{k}'] = np.fromiter((w for x in ws for w in x), dtype=np.int32, count=int(ptr[-1]))
+        arrays[f'words{k}_ptr'] = ptr
+    arrays.update(pack_strings('ids', [gs.id for gs in instances]))
+    arrays.update(pack_strings('question', [gs.question_summary for gs in instances]))
+    arrays.update(pack_strings('answer', answers))
+    arrays.update(pack_strings('vocab', tokenizer.strings))
+    return GSStore({'task': 'summarization', 'version': m.DATA_VERSION, 'num_types': len(words)}, arrays)
+
+
+class StoredDSInstance(object):
+    """評価に用いるDSInstanceの属性と，解析済みの正解の要約の語IDの列（words）を持ちます．"""
+
+    def __init__(self, ins_id: str, question_summary: str, answer_summary: List[str], words: tuple):
+        self.id: str = ins_id
+        self.question_summary: str = question_summary
+        self.answer_summary: List[str] = answer_summary
+        self.words: tuple = words
+        self.alternatives: list = []
+
+
+class SummarizationGS(object):
+    """共有メモリに配置したDialog SummarizationのGSデータを，IDからStoredDSInstanceを返す辞書として扱います．"""
+
+    def __init__(self, store: GSStore):
+        self.store: GSStore = store
+        self.ids = StoredStrings(store, 'ids')
+        self.question = StoredStrings(store, 'question')
+        self.answer = StoredStrings(store, 'answer')
+        self.answer_ptr: np.ndarray = store['answer_ptr']
+        self.num_types: int = store.meta['num_types']
+        self.rows: Dict[str, int] = {self.ids[i]: i for i in range(len(self.ids))}
+
+    def tokenizer(self, mecab):
+        """語彙を配置した順に登録したTokenizerを返します．"""
+        tokenizer = import_eval_script('summarization').Tokenizer(mecab)
+        vocab = StoredStrings(self.store, 'vocab')
+        for i in range(len(vocab)):
+            tokenizer.intern(vocab[i])
+        return tokenizer
+
+    def summary_words(self, j: int) -> tuple:
+        """j番目の要約の語IDの列を語のとり方ごとに返します．"""
+        ret = []
+        for k in range(self.num_types):
+            ptr = self.store[f'words{k}_ptr']
+            ret.append(self.store[f'words{k}'][ptr[j]:ptr[j + 1]].tolist())
+        return tuple(ret)
+
+    def get(self, ins_id: str) -> Optional[StoredDSInstance]:
+        i = self.rows.get(ins_id)
+        if i is None:
+            return None
+        a0, a1 = int(self.answer_ptr[i]), int(self.answer_ptr[i + 1])
+        # i番目のインスタンスの質問の要約の番号（それより前の質問i個と答弁a0個の後）
+        q = i + a0
+        return StoredDSInstance(ins_id, self.question[i], self.answer.slice(a0, a1),
+                                (self.summary_words(q), [self.summary_words(q + 1 + j) for j in range(a1 - a0)]))
+
+
+def _init_entity_worker(shm_name: str):
+    _worker['gs'] = EntityGS(GSStore.attach(shm_name))
+
+
+def _evaluate_entity_shard(args: Tuple[str, Tuple[int, int]]) -> dict:
+    input_file, shard = args
+    return _worker['gs'].evaluate_shard(input_file, shard)
+
+
+def evaluate_entity(gs_path: str, input_file: str, jobs: int) -> dict:
+    """Entity LinkingのGSデータを共有メモリに配置し，jobs個のワーカープロセスで分割評価して統合します．"""
+    m = import_eval_script('entity')
+    store = pack_entity(m.load_tsv(gs_path))
+    shm = store.share()
+    # 配置した後は親プロセスの配列を解放します
+    del store
+    try:
+        with multiprocessing.Pool(jobs, _init_entity_worker, (shm.name,)) as pool:
+            partials = pool.map(_evaluate_entity_shard, [(input_file, (i, jobs)) for i in range(jobs)])
+    finally:
+        shm.close()
+        shm.unlink()
+    return m.merge_partials(partials)
+
+
+def _init_summarization_worker(shm_name: str, unidic_path: str, rouge_engine: str, segments: bool):
+    import MeCab
+    gs = SummarizationGS(GSStore.attach(shm_name))
+    _worker['gs'] = gs
+    _worker['tokenizer'] = gs.tokenizer(MeCab.Tagger('-d {0}'.format(unidic_path)))
+    _worker['rouge_engine'] = rouge_engine
+    _worker['segments'] = segments
+
+
+def _evaluate_summarization_shard(args: Tuple[str, Tuple[int, int]]) -> dict:
+    input_file, shard = args
+    m = import_eval_script('summarization')
+    with open(input_file) as f:
+        targets = m.load_json(f.read())
+    stats, evals, errors = m.evaluate_instances(_worker['tokenizer'], _worker['gs'], m.shard_slice(targets, shard),
+                                                progress=False, rouge_engine=_worker['rouge_engine'],
+                                                segments=_worker['segments'])
+    return {'stats': stats.toDict(), 'ins': [ev.toDict() for ev in evals], 'errors': errors}
+
+
+def evaluate_summarization(gss: dict, input_file: str, unidic_path: str, jobs: int, rouge_engine: str = 'perl',
+                           writer=None, segments: bool = False) -> dict:
+    """Dialog SummarizationのGSデータを解析して共有メモリに配置し，jobs個のワーカープロセスで評価して統合します．
+    writerを指定すると，インスタンスごとの評価結果は評価対象データの順に書き出し，"ins"を含めません．
+    """
+    m = import_eval_script('summarization')
+    import MeCab
+    with open(input_file) as f:
+        m.check_targets(m.load_json(f.read()))
+    store = pack_summarization(gss, m.Tokenizer(MeCab.Tagger('-d {0}'.format(unidic_path))))
+    shm = store.share()
+    del store
+    try:
+        with multiprocessing.Pool(jobs, _init_summarization_worker,
+                                  (shm.name, unidic_path, rouge_engine, segments)) as pool:
+            parts = pool.map(_evaluate_summarization_shard, [(input_file, (i, jobs)) for i in range(jobs)])
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # 統合
+    stats = m.Stats(m.rouge_types, m.extract_types)
+    evals = []
+    errors = []
+    for p in parts:
+        stats.merge(m.Stats.fromDict(p['stats']))
+        evals.extend(m.EvalInstance.fromDict(x) for x in p['ins'])
+        errors.extend(p['errors'])
+    if writer is not None:
+        for ev in evals:
+            writer.write(ev)
+        return m.summarize(stats, None, errors)
+    return m.summarize(stats, evals, errors)
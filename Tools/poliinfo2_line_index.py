@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Dialog Summarizationの行番号索引スクリプト．
+
+Dialog Summarizationの会議録（Pref13_tokyo.json，以下の書式の発言のリスト）について，
+(会議, 会議の日付, 行番号)から発言のファイル内のバイト位置を引く索引を構築し，
+インスタンスのQuestionStartingLine～QuestionEndingLine，AnswerStartingLine～AnswerEndingLineの
+原文を取り出します．索引の構築後は会議録を読み直さず，発言ごとに1回の読み出しで取得します．
+会議は元号の年と回（例：'平成23年第2回'）で，会議録はTitle（なければVolume），インスタンスはMeetingから求めます．
+同じ会議・日付・行番号の発言が複数ある場合，その行の取得はエラーとします．
+{
+    "ID": "130001_230617_2",
+    "Line": 2,
+    "Volume": "平成23年_第２回",
+    "Year": 23,              // 元号の年
+    "Month": 6,
+    "Day": 17,
+    "Title": "平成23年_第２回定例会(第７号)",
+    "Speaker": "和田宗春",
+    "Utterance": "ただいまから平成二十三年第二回東京都議会定例会を開会いたします。"
+}
+
+【使い方】
+# 索引の構築
+python poliinfo2_line_index.py build -o lines.idx
+# インスタンスの原文の取得
+python poliinfo2_line_index.py passages -i lines.idx -f PoliInfo2-DialogSummarization-JA-Formal-Training-Segmented.json
+
+【出力】passagesの結果は標準出力で以下のJSON書式です．範囲が0のもの（未記入）は空文字列です．
+{
+    "success": true,
+    "num_missing_lines": int,  // 索引に見つからなかった行の数（会議を特定できないインスタンスの行を含みます）
+    "passages": {
+        ID: {
+            "Question": string,  // 質問の原文（発言を改行で連結したもの）
+            "Answer": [string]   // 答弁の原文（AnswerStartingLine等の要素ごと）
+        },
+        ...
+    }
+}
+
+更新：2026.10.19
+"""
+
+import os
+import re
+import sys
+import argparse
+import json
+import mmap
+import pickle
+import datetime
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from poliinfo2_minutes import REPO_ROOT, iter_json_array_spans, parse_date
+
+# Dialog Summarizationの会議録の配置
+DS_MINUTES_PATH = os.path.join(
+    REPO_ROOT, 'DialogSummarization', 'TokyoMetropolitanAssemblyMinutes', 'Pref13_tokyo.json')
+
+# 索引の書式バージョン
+INDEX_VERSION = 2
+
+# 元号の元年の前年（西暦＝元号の年＋オフセット）
+era_offsets = {'明治': 1867, '大正': 1911, '昭和': 1925, '平成': 1988, '令和': 2018}
+era_regex = re.compile('(' + '|'.join(era_offsets.keys()) + ')')
+# 会議の元号の年と回（NFKC正規化して'_'と空白類を除いたもの）：「平成23年第2回定例会(第7号)」→「平成23年第2回」
+meeting_regex = re.compile('((?:' + '|'.join(era_offsets.keys()) + r')(?:\d+|元)年第\d+回)')
+
+
+def record_date(record: dict) -> Optional[datetime.date]:
+    """会議録の発言の日付を返します．YearはVolumeまたはTitleの元号で西暦に変換します．"""
+    try:
+        year = int(record['Year'])
+        month = int(record['Month'])
+        day = int(record['Day'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if year < 1000:
+        m = era_regex.search(str(record.get('Volume', '')) + str(record.get('Title', '')))
+        if m is None:
+            return None
+        year += era_offsets[m.group(1)]
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def meeting_key(s: Optional[str]) -> Optional[str]:
+    """会議名（Meeting，Title，Volume）から元号の年と回（例：'平成23年第2回'）を返します．求められない場合はNoneを返します．"""
+    if s is None:
+        return None
+    m = meeting_regex.search(''.join(unicodedata.normalize('NFKC', str(s)).replace('_', '').split()))
+    return m.group(1) if m is not None else None
+
+
+def record_meeting(record: dict) -> Optional[str]:
+    """会議録の発言の会議をTitle（なければVolume）から返します．"""
+    return meeting_key(record.get('Title')) or meeting_key(record.get('Volume'))
+
+
+def line_key(meeting: str, d: datetime.date, line: int) -> Tuple[str, int]:
+    return meeting, (d.toordinal() << 20) | line
+
+
+class LineIndex(object):
+    def __init__(self, path: str):
+        self.version: int = INDEX_VERSION
+        self.path: str = os.path.abspath(path)
+        self.size: int = 0
+        self.keys: Dict[Tuple[str, int], int] = {}  # line_key→発言の番号
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.num_duplicates: int = 0
+        # 同じline_keyの発言が複数あったもの
+        self.duplicates: set = set()
+        self._file = None
+        self._mm = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_file'] = None
+        state['_mm'] = None
+        return state
+
+    @staticmethod
+    def build(path: str) -> 'LineIndex':
+        idx = LineIndex(path)
+        idx.size = os.path.getsize(path)
+        for record, offset, length in iter_json_array_spans(path):
+            d = record_date(record)
+            meeting = record_meeting(record)
+            if d is None or meeting is None or record.get('Line') is None:
+                continue
+            key = line_key(meeting, d, int(record['Line']))
+            if key in idx.keys:
+                # どちらの発言か決められないため，取得時にエラーとします
+                idx.num_duplicates += 1
+                idx.duplicates.add(key)
+                continue
+            idx.keys[key] = len(idx.offsets)
+            idx.offsets.append(offset)
+            idx.lengths.append(length)
+        return idx
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> 'LineIndex':
+        with open(path, 'rb') as f:
+            idx = pickle.load(f)
+        if getattr(idx, 'version', None) != INDEX_VERSION:
+            raise Exception(f'索引の書式バージョンが異なります．再構築してください．({path})')
+        if not os.path.isfile(idx.path) or os.path.getsize(idx.path) != idx.size:
+            raise Exception(f'会議録が索引の構築時から変更されています．再構築してください．({idx.path})')
+        return idx
+
+    def open(self):
+        if self._mm is None:
+            self._file = open(self.path, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._file = None
+
+    def record(self, meeting: str, d: datetime.date, line: int) -> Optional[dict]:
+        """会議（meeting_keyの値）・日付・行番号から発言を返します．見つからない場合はNoneを返します．"""
+        key = line_key(meeting, d, line)
+        if key in self.duplicates:
+            raise Exception(f'同じ会議・日付・行番号の発言が複数あります．({meeting}, {d}, {line}行)')
+        i = self.keys.get(key)
+        if i is None:
+            return None
+        self.open()
+        offset = self.offsets[i]
+        return json.loads(self._mm[offset:offset + self.lengths[i]].decode('utf-8'))
+
+    def span(self, meeting: str, d: datetime.date, start: int, end: int) -> Tuple[List[dict], int]:
+        """start～end行の発言のリストと，見つからなかった行の数を返します．"""
+        records = []
+        missing = 0
+        for line in range(start, end + 1):
+            r = self.record(meeting, d, line)
+            if r is None:
+                missing += 1
+            else:
+                records.append(r)
+        return records, missing
+
+
+def span_text(records: List[dict]) -> str:
+    return '\n'.join(r.get('Utterance', '') for r in records)
+
+
+def instance_passages(idx: LineIndex, instance: dict) -> Tuple[dict, int]:
+    """インスタンスの質問・答弁の原文と，見つからなかった行の数を返します．"""
+    d = parse_date(instance.get('Date'))
+    meeting = meeting_key(instance.get('Meeting'))
+    missing = 0
+
+    def get(start: int, end: int) -> str:
+        nonlocal missing
+        if start <= 0 or end < start:
+            return ''
+        if d is None or meeting is None:
+            missing += end - start + 1
+            return ''
+        records, m = idx.span(meeting, d, start, end)
+        missing += m
+        return span_text(records)
+
+    question = get(instance.get('QuestionStartingLine', 0), instance.get('QuestionEndingLine', 0))
+    answers = [get(s, e) for s, e in zip(instance.get('AnswerStartingLine', []), instance.get('AnswerEndingLine', []))]
+    return {'Question': question, 'Answer': answers}, missing
+
+
+class PassageLoader(object):
+    """インスタンスIDから原文を返すローダー．"""
+
+    def __init__(self, idx: LineIndex, answer_sheets: Iterable[str]):
+        self.idx: LineIndex = idx
+        self.instances: Dict[str, dict] = {}
+        for path in answer_sheets:
+            with open(path) as f:
+                for x in json.load(f):
+                    self.instances[x['ID']] = x
+
+    def get(self, ids: Iterable[str]) -> Tuple[Dict[str, dict], int]:
+        """IDごとの原文と，見つからなかった行の総数を返します．"""
+        ret = {}
+        num_missing = 0
+        for i in ids:
+            ret[i], missing = instance_passages(self.idx, self.instances[i])
+            num_missing += missing
+        return ret, num_missing
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 Dialog Summarizationの行番号索引スクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help='索引を構築します')
+    p.add_argument('-m', '--minutes', default=DS_MINUTES_PATH,
+                   help='Dialog Summarizationの会議録（Pref13_tokyo.json）を指定します')
+    p.add_argument('-o', '--output', required=True,
+                   help='索引の出力先を指定します')
+
+    p = sub.add_parser('passages', help='インスタンスの原文を取得します')
+    p.add_argument('-i', '--index', required=True,
+                   help='索引を指定します')
+    p.add_argument('-f', '--input-file', required=True, nargs='+',
+                   help='Dialog SummarizationのAnswerSheetを指定します')
+    p.add_argument('--ids', nargs='*', default=None,
+                   help='取得するインスタンスのIDを指定します（省略時は全件）')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    if args.command == 'build':
+        idx = LineIndex.build(args.minutes)
+        idx.save(args.output)
+        return json.dumps({
+            'success': True,
+            'num_lines': len(idx),
+            'num_duplicates': idx.num_duplicates
+        }, ensure_ascii=False)
+
+    idx = LineIndex.load(args.index)
+    loader = PassageLoader(idx, args.input_file)
+    ids = args.ids if args.ids is not None else list(loader.instances.keys())
+    passages, num_missing = loader.get(ids)
+    idx.close()
+
+    # 出力
+    return json.dumps({
+        'success': True,
+        'num_missing_lines': num_missing,
+        'passages': passages
+    }, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 東京都議会会議録の共通読み込みモジュール．
+
+Stance Classification / Topic Detectionで配布している会議録JSON（以下の書式）を
+会議単位・発言単位で逐次読み込みます．
+[
+    {
+        "Date": "2001/8/8",
+        "Prefecture": "東京都",
+        "ProceedingTitle": ...,
+        "URL": ...,
+        "Proceeding": [
+            {"Speaker": ..., "Utterance": ...},
+            ...
+        ]
+    },
+    ...
+]
+
+発言の行番号（Line）は，Dialog Summarizationの会議録（Pref13_tokyo.json）と同様に，
+会議（Proceeding）内の発言の通し番号（1始まり，Speakerが"null"の発言も含む）とします．
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import glob
+import json
+import datetime
+import unicodedata
+from typing import Iterator, List, Optional, Tuple
+
+# リポジトリのルートディレクトリ
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 会議録の配置ディレクトリ
+STANCE_MINUTES_DIR = os.path.join(
+    REPO_ROOT, 'StanceClassification', 'TokyoMetropolitanAssemblyMinutes')
+TOPIC_MINUTES_DIR = os.path.join(REPO_ROOT, 'TopicDetection')
+
+# Git LFSのポインタファイルの先頭
+LFS_POINTER_PREFIX = b'version https://git-lfs.github.com/spec/'
+
+# 逐次読み込み時のバッファサイズ
+READ_CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class Utterance(object):
+    def __init__(self, path: str, meeting_idx: int, line: int, meeting: dict, utterance: dict):
+        self.path: str = path
+        self.meeting_idx: int = meeting_idx
+        self.line: int = line
+        self.date: Optional[datetime.date] = parse_date(meeting.get('Date'))
+        self.title: str = meeting.get('ProceedingTitle', '')
+        self.url: str = meeting.get('URL', '')
+        self.speaker: str = utterance.get('Speaker', 'null')
+        self.utterance: str = utterance.get('Utterance', '')
+
+    def is_null_speaker(self) -> bool:
+        return self.speaker is None or self.speaker == 'null'
+
+
+def parse_date(s: Optional[str]) -> Optional[datetime.date]:
+    """'2008/6/10'や'2011-06-23'形式の日付を変換します．不正な値はNoneを返します．"""
+    if s is None or s == '':
+        return None
+    try:
+        y, m, d = s.replace('-', '/').split('/')
+        return datetime.date(int(y), int(m), int(d))
+    except ValueError:
+        return None
+
+
+def normalize_text(s: str) -> str:
+    """NFKC正規化して空白類を取り除きます．"""
+    s = unicodedata.normalize('NFKC', s)
+    return ''.join(s.split())
+
+
+def is_lfs_pointer(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def list_minutes_files(roots: Optional[List[str]] = None) -> List[str]:
+    """会議録JSONの一覧を返します．Git LFSのポインタのまま取得されていないファイルは除外します．"""
+    if roots is None:
+        roots = [STANCE_MINUTES_DIR, TOPIC_MINUTES_DIR]
+    ret = []
+    for root in roots:
+        if os.path.isfile(root):
+            paths = [root]
+        else:
+            paths = sorted(glob.glob(os.path.join(root, '**', '*.json'), recursive=True))
+        for path in paths:
+            if is_lfs_pointer(path):
+                print(f'Git LFSの実体が取得されていないため読み飛ばします．({path})', file=sys.stderr)
+                continue
+            ret.append(path)
+    return ret
+
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """トップレベルがJSON配列のファイルから要素を1つずつ読み込みます．
+
+    メモリ上に保持するのは読み込み中の要素1つ分とバッファのみです．
+    """
+    for obj, _, _ in _scan_json_array(path, chunk_size, False):
+        yield obj
+
+
+def iter_json_array_spans(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[dict, int, int]]:
+    """iter_json_arrayと同様に要素を読み込み，(要素, ファイル先頭からのバイト位置, バイト長)を返します．"""
+    return _scan_json_array(path, chunk_size, True)
+
+
+def _scan_json_array(path: str, chunk_size: int, with_spans: bool) -> Iterator[Tuple[dict, int, int]]:
+    # with_spansがTrueの場合，読み終えた部分の文字列をUTF-8で数えてバイト位置を求めます
+    with open(path, encoding='utf-8', newline='') as f:
+        buf = ''
+        pos = 0
+        counted = 0    # バイト数を数え終えたbuf内の位置
+        buf_bytes = 0  # buf[counted]のバイト位置
+        started = False
+        eof = False
+        while True:
+            # 空白と区切り文字を読み飛ばす
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ',')):
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                if with_spans:
+                    buf_bytes += len(buf[counted:].encode('utf-8'))
+                    counted = 0
+                buf = f.read(chunk_size)
+                pos = 0
+                eof = len(buf) < chunk_size
+            if pos >= len(buf):
+                if started:
+                    raise ValueError(f'JSON配列が閉じられていません．({path})')
+                return
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError(f'トップレベルがJSON配列ではありません．({path})')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            # 要素1つ分をデコードできるまで読み足す
+            while True:
+                try:
+                    obj, end = _decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    chunk = f.read(chunk_size)
+                    eof = len(chunk) < chunk_size
+                    if with_spans:
+                        buf_bytes += len(buf[counted:pos].encode('utf-8'))
+                        counted = 0
+                    buf = buf[pos:] + chunk
+                    pos = 0
+            if with_spans:
+                start = buf_bytes + len(buf[counted:pos].encode('utf-8'))
+                length = len(buf[pos:end].encode('utf-8'))
+                counted = end
+                buf_bytes = start + length
+                yield obj, start, length
+            else:
+                yield obj, 0, 0
+            pos = end
+
+
+def iter_meetings(path: str) -> Iterator[dict]:
+    """会議録JSONを会議（Proceeding）単位で逐次読み込みます．"""
+    return iter_json_array(path)
+
+
+def iter_utterances(paths: List[str]) -> Iterator[Utterance]:
+    """会議録JSONを発言単位で逐次読み込みます．"""
+    for path in paths:
+        for meeting_idx, meeting in enumerate(iter_meetings(path)):
+            for i, ut in enumerate(meeting.get('Proceeding', [])):
+                yield Utterance(path, meeting_idx, i + 1, meeting, ut)
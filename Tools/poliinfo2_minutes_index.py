@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 東京都議会会議録の転置インデックス・検索スクリプト．
+
+会議録の発言を文字bigramで索引付けした位置情報付き転置インデックスを構築し，
+日付範囲・発言者で絞り込んだBM25検索を行います．
+Stance Classificationの議案ごとの候補発言の取得に用いることを想定しています．
+billsでは，poliinfo2_speaker_index.pyで発言者をSpeakerListの議員と対応付けて絞り込みます．
+
+【使い方】
+# インデックスの構築
+python poliinfo2_minutes_index.py build -o minutes.idx
+# poliinfo2_dedup_index.pyで重複と判定した発言を除いて構築
+python poliinfo2_minutes_index.py build -o minutes.idx --dedup-map dedup.jsonl
+# 検索
+python poliinfo2_minutes_index.py search -i minutes.idx -q 東京都医師奨学金貸与条例 -s 2008/6/10 -e 2008/6/25
+# Stance Classificationの議案ごとの候補発言の取得
+python poliinfo2_minutes_index.py bills -i minutes.idx -f PoliInfo2-StanceClassification-JA-Formal-Test.json
+
+【出力】search/billsの結果は標準出力で以下のJSON書式です．
+{
+    "success": true,
+    "results": {
+        ID or クエリ: [
+            {
+                "file": string,     // 会議録ファイル名
+                "date": string,     // 会議の日付
+                "title": string,    // 会議録のタイトル
+                "line": int,        // 会議内の発言の通し番号
+                "speaker": string,  // 発言者
+                "score": float      // BM25スコア
+            },
+            ...
+        ],
+        ...
+    }
+}
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import math
+import pickle
+import argparse
+import json
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Callable, Container, Dict, Iterable, List, Optional, Set, Tuple
+
+from poliinfo2_minutes import Utterance, iter_utterances, list_minutes_files, normalize_text, parse_date
+from poliinfo2_speaker_index import SpeakerResolver, normalize_name
+
+# インデックスの書式バージョン
+INDEX_VERSION = 1
+
+# BM25のパラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def char_ngrams(text: str, n: int = 2) -> List[str]:
+    """正規化した文字列を文字n-gramに分割します．n文字未満の文字列はそのまま1語とします．"""
+    text = normalize_text(text)
+    if len(text) < n:
+        return [text] if text != '' else []
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class Posting(object):
+    """1語分のポスティングリスト．文書IDの昇順で，文書ごとの出現位置を保持します．"""
+
+    def __init__(self):
+        self.docs = array('I')
+        self.tfs = array('I')
+        self.pos_offsets = array('I', [0])
+        self.positions = array('I')
+
+    def add(self, doc_id: int, positions: List[int]):
+        self.docs.append(doc_id)
+        self.tfs.append(len(positions))
+        self.positions.extend(positions)
+        self.pos_offsets.append(len(self.positions))
+
+    def range(self, doc_lo: int, doc_hi: int) -> Tuple[int, int]:
+        """文書IDが[doc_lo, doc_hi)の範囲にあるポスティングの添字範囲を返します．"""
+        return bisect_left(self.docs, doc_lo), bisect_left(self.docs, doc_hi)
+
+    def positions_at(self, i: int) -> array:
+        return self.positions[self.pos_offsets[i]:self.pos_offsets[i + 1]]
+
+
+class MinutesIndex(object):
+    def __init__(self, ngram: int = 2):
+        self.version: int = INDEX_VERSION
+        self.ngram: int = ngram
+        self.files: List[str] = []
+        self.speakers: List[str] = []
+        self.speakers_norm: List[str] = []
+        # 文書（発言）ごとの属性．文書IDは日付の昇順に振ります
+        self.doc_file = array('I')
+        self.doc_meeting = array('I')
+        self.doc_line = array('I')
+        self.doc_date = array('I')  # 日付の序数（datetime.date.toordinal）
+        self.doc_speaker = array('I')
+        self.doc_len = array('I')
+        self.titles: Dict[Tuple[int, int], str] = {}
+        self.postings: Dict[str, Posting] = {}
+        self.avg_len: float = 0.0
+        # 文書ごとの議員ID（attach_membersで設定し，インデックスには保存しません）
+        self.doc_member: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    @staticmethod
+    def build(utterances: Iterable[Utterance], ngram: int = 2, skip_null_speaker: bool = True,
+              skip: Optional[Container[Tuple[str, int, int]]] = None) -> 'MinutesIndex':
+        """skipには索引付けしない発言の(ファイル名, 会議の番号, 行番号)の集合を指定します．"""
+        idx = MinutesIndex(ngram)
+        file_ids: Dict[str, int] = {}
+        speaker_ids: Dict[str, int] = {}
+
+        # 発言の読み込み（日付順に並べ替えるため一旦保持します）
+        docs = []
+        for ut in utterances:
+            if ut.date is None or (skip_null_speaker and ut.is_null_speaker()):
+                continue
+            name = os.path.basename(ut.path)
+            if skip is not None and (name, ut.meeting_idx, ut.line) in skip:
+                continue
+            if name not in file_ids:
+                file_ids[name] = len(idx.files)
+                idx.files.append(name)
+            if ut.speaker not in speaker_ids:
+                speaker_ids[ut.speaker] = len(idx.speakers)
+                idx.speakers.append(ut.speaker)
+                idx.speakers_norm.append(normalize_text(ut.speaker))
+            fid = file_ids[name]
+            idx.titles[(fid, ut.meeting_idx)] = ut.title
+            docs.append((ut.date.toordinal(), fid, ut.meeting_idx, ut.line, speaker_ids[ut.speaker], ut.utterance))
+        docs.sort(key=lambda x: x[:4])
+
+        # 転置インデックスの構築
+        total_len = 0
+        postings: Dict[str, Posting] = defaultdict(Posting)
+        for doc_id, (date, fid, meeting_idx, line, speaker_id, text) in enumerate(docs):
+            grams = char_ngrams(text, ngram)
+            idx.doc_date.append(date)
+            idx.doc_file.append(fid)
+            idx.doc_meeting.append(meeting_idx)
+            idx.doc_line.append(line)
+            idx.doc_speaker.append(speaker_id)
+            idx.doc_len.append(len(grams))
+            total_len += len(grams)
+            positions: Dict[str, List[int]] = defaultdict(list)
+            for p, g in enumerate(grams):
+                positions[g].append(p)
+            for g, ps in positions.items():
+                postings[g].add(doc_id, ps)
+        idx.postings = dict(postings)
+        idx.avg_len = total_len / len(docs) if len(docs) > 0 else 0.0
+        return idx
+
+    def save(self, path: str):
+        doc_member, self.doc_member = self.doc_member, None
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.doc_member = doc_member
+
+    @staticmethod
+    def load(path: str) -> 'MinutesIndex':
+        with open(path, 'rb') as f:
+            idx = pickle.load(f)
+        if getattr(idx, 'version', None) != INDEX_VERSION:
+            raise Exception(f'インデックスの書式バージョンが異なります．再構築してください．({path})')
+        idx.doc_member = None
+        return idx
+
+    def doc_range(self, start: Optional[datetime.date], end: Optional[datetime.date]) -> Tuple[int, int]:
+        """日付が[start, end]の範囲にある文書IDの範囲[lo, hi)を返します．"""
+        lo = 0 if start is None else bisect_left(self.doc_date, start.toordinal())
+        hi = len(self) if end is None else bisect_right(self.doc_date, end.toordinal())
+        return lo, hi
+
+    def speaker_ids(self, pred: Callable[[str], bool]) -> Set[int]:
+        """正規化済みの発言者文字列に対してpredが真となる発言者IDの集合を返します．"""
+        return {i for i, sp in enumerate(self.speakers_norm) if pred(sp)}
+
+    def attach_members(self, resolver: SpeakerResolver) -> int:
+        """発言者を議員名簿と対応付け，文書ごとの議員IDを設定します．特定できた文書数を返します．
+
+        議員IDはresolver.membersの添字で，特定できない文書は-1とします．
+        """
+        self.doc_member = array('i')
+        for doc_id in range(len(self)):
+            resolved = resolver.resolve(self.speakers[self.doc_speaker[doc_id]],
+                                        datetime.date.fromordinal(self.doc_date[doc_id]))
+            self.doc_member.append(resolver.member_ids[resolved[0]] if resolved is not None else -1)
+        return sum(1 for m in self.doc_member if m >= 0)
+
+    def idf(self, df: int) -> float:
+        n = len(self)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str,
+               start: Optional[datetime.date] = None,
+               end: Optional[datetime.date] = None,
+               speakers: Optional[Set[int]] = None,
+               members: Optional[Set[int]] = None,
+               phrase: bool = False,
+               top_k: int = 100) -> List[Tuple[int, float]]:
+        """BM25で検索し，(文書ID, スコア)のリストをスコアの降順で返します．
+
+        クエリは空白区切りで複数の語句を指定できます．
+        phraseがTrueの場合は，各語句をそのまま含む発言のみを返します．
+        membersによる絞り込みには事前にattach_membersを呼び出しておく必要があります．
+        """
+        parts = [char_ngrams(q, self.ngram) for q in query.split()]
+        parts = [p for p in parts if len(p) > 0]
+        grams = [g for p in parts for g in p]
+        if len(grams) == 0:
+            return []
+        lo, hi = self.doc_range(start, end)
+        if lo >= hi:
+            return []
+        qtf: Dict[str, int] = defaultdict(int)
+        for g in grams:
+            qtf[g] += 1
+
+        scores: Dict[int, float] = defaultdict(float)
+        for g, cnt in qtf.items():
+            posting = self.postings.get(g)
+            if posting is None:
+                if phrase:
+                    return []
+                continue
+            idf = self.idf(len(posting.docs))
+            b, e = posting.range(lo, hi)
+            for i in range(b, e):
+                doc_id = posting.docs[i]
+                if speakers is not None and self.doc_speaker[doc_id] not in speakers:
+                    continue
+                if members is not None and self.doc_member[doc_id] not in members:
+                    continue
+                tf = posting.tfs[i]
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_len[doc_id] / self.avg_len)
+                scores[doc_id] += cnt * idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+        if phrase:
+            scores = {d: s for d, s in scores.items() if all(self.contains_phrase(d, p) for p in parts)}
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return ranked[:top_k] if top_k > 0 else ranked
+
+    def contains_phrase(self, doc_id: int, grams: List[str]) -> bool:
+        """位置情報を用いて，文書がgramsを連続して含むかを判定します．"""
+        candidates = None
+        for offset, g in enumerate(grams):
+            posting = self.postings.get(g)
+            if posting is None:
+                return False
+            i = bisect_left(posting.docs, doc_id)
+            if i >= len(posting.docs) or posting.docs[i] != doc_id:
+                return False
+            ps = {p - offset for p in posting.positions_at(i)}
+            candidates = ps if candidates is None else candidates & ps
+            if len(candidates) == 0:
+                return False
+        return True
+
+    def doc_to_dict(self, doc_id: int, score: float) -> dict:
+        fid = self.doc_file[doc_id]
+        return {
+            'file': self.files[fid],
+            'date': format_date(datetime.date.fromordinal(self.doc_date[doc_id])),
+            'title': self.titles.get((fid, self.doc_meeting[doc_id]), ''),
+            'line': self.doc_line[doc_id],
+            'speaker': self.speakers[self.doc_speaker[doc_id]],
+            'score': score
+        }
+
+
+def format_date(d: datetime.date) -> str:
+    return f'{d.year}/{d.month}/{d.day}'
+
+
+def speaker_list_predicate(speaker_list: Iterable[str]) -> Callable[[str], bool]:
+    """SpeakerListの議員名のいずれかを含む発言者文字列を選ぶ述語を返します．"""
+    names = [normalize_text(x) for x in speaker_list if normalize_text(x) != '']
+
+    def pred(speaker: str) -> bool:
+        return any(name in speaker for name in names)
+
+    return pred
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 東京都議会会議録の転置インデックス・検索スクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help='インデックスを構築します')
+    p.add_argument('-m', '--minutes', nargs='*', default=None,
+                   help='会議録JSONまたはディレクトリを指定します（省略時は配布データ全体）')
+    p.add_argument('-o', '--output', required=True,
+                   help='インデックスの出力先を指定します')
+    p.add_argument('-n', '--ngram', type=int, default=2,
+                   help='索引語とする文字n-gramの長さを指定します')
+    p.add_argument('--dedup-map', default=None,
+                   help='poliinfo2_dedup_index.py dedupの出力を指定すると，重複と判定した発言を索引付けしません')
+
+    p = sub.add_parser('search', help='クエリで検索します')
+    p.add_argument('-i', '--index', required=True,
+                   help='インデックスを指定します')
+    p.add_argument('-q', '--query', required=True, nargs='+',
+                   help='クエリを指定します')
+    p.add_argument('-s', '--start-date', default=None,
+                   help='検索対象の開始日（例：2008/6/10）を指定します')
+    p.add_argument('-e', '--end-date', default=None,
+                   help='検索対象の終了日（例：2008/6/25）を指定します')
+    p.add_argument('--speaker', nargs='*', default=None,
+                   help='発言者を議員名で絞り込みます')
+    p.add_argument('--phrase', action='store_true',
+                   help='クエリ文字列をそのまま含む発言のみを返します')
+    p.add_argument('-k', '--top-k', type=int, default=100,
+                   help='出力する発言数の上限を指定します（0で無制限）')
+
+    p = sub.add_parser('bills', help='Stance Classificationの議案ごとに候補発言を検索します')
+    p.add_argument('-i', '--index', required=True,
+                   help='インデックスを指定します')
+    p.add_argument('-f', '--input-file', required=True,
+                   help='Stance ClassificationのAnswerSheetを指定します')
+    p.add_argument('--no-speaker-filter', action='store_true',
+                   help='SpeakerListによる発言者の絞り込みを行いません')
+    p.add_argument('-k', '--top-k', type=int, default=100,
+                   help='議案ごとに出力する発言数の上限を指定します（0で無制限）')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    if args.command == 'build':
+        skip = None
+        if args.dedup_map is not None:
+            # numpyを用いるため，指定した場合のみ読み込みます
+            from poliinfo2_dedup_index import load_dedup_map
+            skip = load_dedup_map(args.dedup_map)
+        idx = MinutesIndex.build(iter_utterances(list_minutes_files(args.minutes)), ngram=args.ngram, skip=skip)
+        idx.save(args.output)
+        return json.dumps({
+            'success': True,
+            'num_docs': len(idx),
+            'num_terms': len(idx.postings)
+        }, ensure_ascii=False)
+
+    idx = MinutesIndex.load(args.index)
+    results = {}
+
+    if args.command == 'search':
+        speakers = None
+        if args.speaker is not None:
+            speakers = idx.speaker_ids(speaker_list_predicate(args.speaker))
+        for q in args.query:
+            hits = idx.search(q, parse_date(args.start_date), parse_date(args.end_date),
+                              speakers=speakers, phrase=args.phrase, top_k=args.top_k)
+            results[q] = [idx.doc_to_dict(d, s) for d, s in hits]
+
+    elif args.command == 'bills':
+        with open(args.input_file) as f:
+            bills = json.load(f)
+        resolver = None
+        if not args.no_speaker_filter:
+            # 発言者をSpeakerListの議員名簿と対応付けます
+            resolver = SpeakerResolver.from_stance_files([args.input_file])
+            idx.attach_members(resolver)
+        for bill in bills:
+            members = None
+            if resolver is not None:
+                members = {resolver.member_ids[n] for n in map(normalize_name, bill.get('SpeakerList', {}).keys())
+                           if n in resolver.member_ids}
+            # 議案名と議案番号の双方をクエリとします
+            query = bill.get('Bill', '') + ' ' + bill.get('BillNumber', '')
+            hits = idx.search(query, parse_date(bill.get('MeetingStartDate')), parse_date(bill.get('MeetingEndDate')),
+                              members=members, top_k=args.top_k)
+            results[bill['ID']] = [idx.doc_to_dict(d, s) for d, s in hits]
+
+    # 出力
+    return json.dumps({
+        'success': True,
+        'results': results
+    }, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 評価結果の蓄積・集計スクリプト．
+
+poliinfo2_eval.pyの--dbで，評価結果をSQLiteのファイルに追記します．
+実行（run）ごとに，インスタンスごとのスコア（"ins"の要素）と全体のスコア・正解数等を
+(実行, インスタンス, 指標)をキーとする表に1つのトランザクションでまとめて書き込みます．
+・指標名は"ins"の要素のキーを/でつないだものです（例：Q/ROUGE-1-R/内容語，P賛成）．
+  Dialog Summarizationの答弁（A）のスコアは答弁ごとの値の平均とします．
+  Stance Classificationは会派ごとの正誤（party/会派名，正解で1）も記録します．
+・全体のスコアは評価結果のJSONの数値を同様に/でつないだ指標名で記録します
+  （例：rep_score，macro_ave/available/QA/ROUGE-1-R/内容語，mention/tp，disambiguation/gs_count）．
+・インスタンス名・指標名は番号に置き換え，スコアの表は主キー（実行, インスタンス, 指標）と
+  (指標, インスタンス, 実行, 値)の索引のみで検索できるようにしています．
+同じ名前の実行を登録すると，以前の結果を置き換えます．
+
+【使い方】
+python poliinfo2_eval.py stance -f submission.json --db results.sqlite --run-name teamA-run1
+python poliinfo2_results_db.py runs -i results.sqlite
+# すべての実行でスコアが0.2未満のインスタンス
+python poliinfo2_results_db.py failing -i results.sqlite -m Q/ROUGE-1-R/内容語 -t 0.2
+# 実行ごとの会派別の正解率（LIKEのパターンで指標を指定します）
+python poliinfo2_results_db.py trend -i results.sqlite -m 'party/%'
+python poliinfo2_results_db.py trend -i results.sqlite -m rep_score --run-level
+python poliinfo2_results_db.py sql -i results.sqlite -q 'SELECT COUNT(*) FROM scores'
+
+【出力】標準出力で以下のJSON書式です．
+{
+    "success": true,
+    "columns": [string],    // 列名
+    "rows": [[...]]         // 結果の行
+}
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    task TEXT NOT NULL,
+    version TEXT,
+    created TEXT NOT NULL,
+    input_file TEXT,
+    gs_data TEXT,
+    params TEXT,
+    success INTEGER,
+    num_instances INTEGER
+);
+CREATE TABLE IF NOT EXISTS instances (
+    instance_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    metric_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id INTEGER NOT NULL,
+    instance_id INTEGER NOT NULL,
+    metric_id INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, instance_id, metric_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_by_metric ON scores (metric_id, instance_id, run_id, value);
+CREATE TABLE IF NOT EXISTS run_scores (
+    run_id INTEGER NOT NULL,
+    metric_id INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, metric_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS run_scores_by_metric ON run_scores (metric_id, run_id, value);
+CREATE TABLE IF NOT EXISTS errors (
+    run_id INTEGER NOT NULL,
+    instance TEXT NOT NULL,
+    error TEXT
+);
+'''
+
+# 全体のスコアとして記録しない評価結果のキー
+RESULT_SKIP_KEYS = {'success', 'version', 'ins', 'errors', 'task', 'shard', 'stats'}
+
+
+def flatten(obj, prefix: str = '') -> Iterable[Tuple[str, Optional[float]]]:
+    """入れ子の辞書の数値を，キーを/でつないだ指標名と値の組で返します．リストは平均とします．"""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from flatten(v, f'{prefix}/{k}' if prefix else k)
+    elif isinstance(obj, list):
+        values = [float(x) for x in obj if x is not None]
+        yield prefix, sum(values) / len(values) if len(values) > 0 else None
+    elif obj is None or isinstance(obj, (bool, int, float)):
+        yield prefix, None if obj is None else float(obj)
+
+
+def stance_party_scores(gss: dict, targets: dict) -> Iterable[Tuple[str, str, float]]:
+    """Stance ClassificationのGSデータの会派ごとに，(ID, party/会派名, 正解で1)を返します．"""
+    for gs in gss.values():
+        target = targets.get(gs.id)
+        for party, label in gs.pc_parties.items():
+            ok = target is not None and target.pc_parties.get(party) == label
+            yield gs.id, f'party/{party}', 1.0 if ok else 0.0
+
+
+class ResultsDB(object):
+    def __init__(self, path: str, readonly: bool = False):
+        self.path: str = path
+        if readonly:
+            if not os.path.exists(path):
+                raise Exception(f'評価結果のファイルが見つかりません．(path={path})')
+            self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def ids(self, table: str, key: str, names: Iterable[str]) -> Dict[str, int]:
+        """インスタンス名・指標名の番号を返します．未登録のものは登録します．"""
+        names = list(set(names))
+        self.conn.executemany(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', [(x,) for x in names])
+        ret = {}
+        # SQLiteの変数の上限を超えないように分けて引きます
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            ret.update(self.conn.execute(
+                f'SELECT name, {key} FROM {table} WHERE name IN ({",".join("?" * len(chunk))})', chunk))
+        return ret
+
+    def add_run(self, name: str, task: str, result: dict, scores: List[Tuple[str, str, Optional[float]]],
+                input_file: Optional[str] = None, gs_data: Optional[str] = None,
+                params: Optional[dict] = None) -> int:
+        """実行を1つのトランザクションで登録し，実行の番号を返します．"""
+        with self.conn:
+            old = self.conn.execute('SELECT run_id FROM runs WHERE name = ?', (name,)).fetchone()
+            if old is not None:
+                for table in ['scores', 'run_scores', 'errors', 'runs']:
+                    self.conn.execute(f'DELETE FROM {table} WHERE run_id = ?', old)
+            cur = self.conn.execute(
+                'INSERT INTO runs (name, task, version, created, input_file, gs_data, params, success, num_instances) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (name, task, result.get('version'), datetime.datetime.now().isoformat(timespec='seconds'),
+                 input_file, gs_data, json.dumps(params or {}, ensure_ascii=False), int(bool(result.get('success'))),
+                 len(set(x[0] for x in scores))))
+            run_id = cur.lastrowid
+
+            run_scores = [(k, v) for k, v in flatten({k: v for k, v in result.items() if k not in RESULT_SKIP_KEYS})]
+            instance_ids = self.ids('instances', 'instance_id', (x[0] for x in scores))
+            metric_ids = self.ids('metrics', 'metric_id', [x[1] for x in scores] + [x[0] for x in run_scores])
+            self.conn.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)',
+                                  ((run_id, instance_ids[i], metric_ids[m], v) for i, m, v in scores))
+            self.conn.executemany('INSERT OR REPLACE INTO run_scores VALUES (?, ?, ?)',
+                                  ((run_id, metric_ids[m], v) for m, v in run_scores))
+            self.conn.executemany('INSERT INTO errors VALUES (?, ?, ?)',
+                                  ((run_id, str(x.get('ID')), x.get('error')) for x in result.get('errors', [])))
+        self.conn.execute('PRAGMA optimize')
+        return run_id
+
+    def query(self, sql: str, params: tuple = ()) -> dict:
+        cur = self.conn.execute(sql, params)
+        return {
+            'success': True,
+            'columns': [x[0] for x in cur.description] if cur.description is not None else [],
+            'rows': [list(x) for x in cur.fetchall()]
+        }
+
+
+class ResultsSink(object):
+    """インスタンスごとの評価結果を受け取り，評価を終えた時点で実行として登録します．
+    writerを指定すると，受け取った評価結果をそのまま渡します（-oと併用する場合）．
+    """
+
+    def __init__(self, path: str, task: str, name: Optional[str], input_file: str,
+                 gs_data: Optional[str] = None, params: Optional[dict] = None, writer=None):
+        self.path: str = path
+        self.task: str = task
+        self.name: str = name or f'{os.path.basename(input_file)}@{datetime.datetime.now().isoformat(timespec="seconds")}'
+        self.input_file: str = input_file
+        self.gs_data: Optional[str] = gs_data
+        self.params: dict = params or {}
+        self.writer = writer
+        self.scores: List[Tuple[str, str, Optional[float]]] = []
+
+    def write(self, record):
+        if self.writer is not None:
+            self.writer.write(record)
+        # Dialog SummarizationのEvalInstanceは辞書に変換します
+        if hasattr(record, 'toDict'):
+            record = record.toDict()
+        ins_id = record['ID']
+        for metric, value in flatten({k: v for k, v in record.items() if k != 'ID'}):
+            self.scores.append((ins_id, metric, value))
+
+    def add_scores(self, scores: Iterable[Tuple[str, str, Optional[float]]]):
+        self.scores.extend(scores)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def commit(self, result: dict) -> int:
+        """評価結果を登録します．結果に"ins"が含まれる場合はそれを用います．"""
+        for record in result.get('ins', []):
+            for metric, value in flatten({k: v for k, v in record.items() if k != 'ID'}):
+                self.scores.append((record['ID'], metric, value))
+        db = ResultsDB(self.path)
+        try:
+            return db.add_run(self.name, self.task, result, self.scores, self.input_file, self.gs_data, self.params)
+        finally:
+            db.close()
+
+
+def runs(db: ResultsDB, args) -> dict:
+    return db.query(
+        'SELECT r.name, r.task, r.created, r.success, rs.value AS rep_score, r.num_instances '
+        'FROM runs r LEFT JOIN metrics m ON m.name = \'rep_score\' '
+        'LEFT JOIN run_scores rs ON rs.run_id = r.run_id AND rs.metric_id = m.metric_id '
+        'WHERE (? IS NULL OR r.task = ?) ORDER BY r.run_id', (args.task, args.task))
+
+
+def failing(db: ResultsDB, args) -> dict:
+    # 指標を含むすべての実行で値がしきい値未満のインスタンス
+    return db.query(
+        'SELECT i.name AS instance, COUNT(*) AS num_runs, MAX(s.value) AS best, AVG(s.value) AS mean '
+        'FROM scores s JOIN metrics m ON m.metric_id = s.metric_id JOIN instances i ON i.instance_id = s.instance_id '
+        'WHERE m.name = ? GROUP BY s.instance_id '
+        'HAVING MAX(s.value) < ? AND COUNT(*) >= ? ORDER BY best, i.name',
+        (args.metric, args.threshold, args.min_runs))
+
+
+def trend(db: ResultsDB, args) -> dict:
+    # 指標の番号を先に求め，(指標, インスタンス, 実行, 値)の索引のみを読みます
+    if args.run_level:
+        return db.query(
+            'SELECT r.name AS run, r.created, m.name AS metric, rs.value '
+            'FROM run_scores rs JOIN metrics m ON m.metric_id = rs.metric_id JOIN runs r ON r.run_id = rs.run_id '
+            'WHERE rs.metric_id IN (SELECT metric_id FROM metrics WHERE name LIKE ?) '
+            'ORDER BY r.run_id, m.name', (args.metric,))
+    # インスタンスの値を実行・指標ごとに平均します
+    return db.query(
+        'SELECT r.name AS run, r.created, m.name AS metric, t.mean, t.n FROM ('
+        'SELECT run_id, metric_id, AVG(value) AS mean, COUNT(value) AS n FROM scores '
+        'WHERE metric_id IN (SELECT metric_id FROM metrics WHERE name LIKE ?) GROUP BY run_id, metric_id) t '
+        'JOIN metrics m ON m.metric_id = t.metric_id JOIN runs r ON r.run_id = t.run_id '
+        'ORDER BY r.run_id, m.name', (args.metric,))
+
+
+def sql(db: ResultsDB, args) -> dict:
+    return db.query(args.query)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 評価結果の蓄積・集計スクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_db(p):
+        p.add_argument('-i', '--db', required=True,
+                       help='poliinfo2_eval.py --dbで作成したSQLiteのファイルを指定します')
+
+    p = sub.add_parser('runs', help='登録済みの実行を一覧します')
+    add_db(p)
+    p.add_argument('--task', default=None,
+                   help='タスク（summarization / stance / entity / topic）で絞り込みます')
+    p.set_defaults(func=runs)
+
+    p = sub.add_parser('failing', help='すべての実行で指標の値がしきい値未満のインスタンスを出力します')
+    add_db(p)
+    p.add_argument('-m', '--metric', required=True,
+                   help='指標名を指定します（例：Q/ROUGE-1-R/内容語）')
+    p.add_argument('-t', '--threshold', type=float, required=True,
+                   help='しきい値を指定します')
+    p.add_argument('--min-runs', type=int, default=1,
+                   help='この数以上の実行で評価されたインスタンスのみを出力します')
+    p.set_defaults(func=failing)
+
+    p = sub.add_parser('trend', help='実行ごとの指標の値（インスタンスの平均）を出力します')
+    add_db(p)
+    p.add_argument('-m', '--metric', required=True,
+                   help='指標名をSQLのLIKEのパターンで指定します（例：party/%%）')
+    p.add_argument('--run-level', action='store_true',
+                   help='インスタンスごとのスコアではなく，全体のスコアを出力します')
+    p.set_defaults(func=trend)
+
+    p = sub.add_parser('sql', help='SQLの問い合わせを読み取り専用で実行します')
+    add_db(p)
+    p.add_argument('-q', '--query', required=True,
+                   help='SQLを指定します')
+    p.set_defaults(func=sql)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    db = ResultsDB(args.db, readonly=True)
+    try:
+        result = args.func(db, args)
+    finally:
+        db.close()
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
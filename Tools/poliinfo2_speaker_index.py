@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 会議録の発言者と議員・会派の対応付けスクリプト．
+
+会議録の発言者文字列（例：'六十七番（岡本こうき君）'，'田中議長'，'大西（由）委員'）を正規化し，
+Stance ClassificationのSpeakerList（議員名→会派）から作成した議員名簿と対応付けます．
+議員名の完全一致はハッシュで，委員会速記録の姓のみの表記は議員名の接頭辞索引で引き当て，
+会派は会議の日付を含む会期（MeetingStartDate～MeetingEndDate）の名簿から決定します．
+本会議の「役職（氏名君）」の表記は，役職が議席番号（N番）か議員の役職の場合のみ議員と対応付けます（知事や局長は対応付けません）．
+氏名が名簿と一致しない場合は，議席番号か委員の表記で，氏名の姓（かなの名の前の漢字）が分かる場合のみ，
+その姓で始まる議員が1人に限られれば対応付けます．
+
+【使い方】
+python poliinfo2_speaker_index.py -f PoliInfo2-StanceClassification-JA-Formal-Test.json -o speakers.tsv
+
+【出力】発言ごとの対応付け結果を以下のTSV書式（タブ区切り，UTF-8 LF改行，1行目はヘッダ）で出力します．
+会議録ファイル名\t会議番号\t行番号\t日付\t発言者\t議員\t会派
+議員・会派が特定できない発言（知事や局長の発言など）は空欄です．
+
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "num_utterances": int,  // 発言の総数
+    "num_resolved": int,    // 議員を特定できた発言数
+    "num_speakers": int,    // 発言者文字列の種類数
+    "num_members": int      // 名簿の議員数
+}
+
+更新：2026.10.19
+"""
+
+import os
+import re
+import sys
+import argparse
+import json
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from poliinfo2_minutes import iter_utterances, list_minutes_files, normalize_text, parse_date
+
+# 議員の役職（委員会速記録では「姓＋役職」で表記されます）
+member_roles = ['臨時副委員長', '臨時委員長', '副委員長', '委員長', '委員', '副座長', '座長',
+                '理事', '臨時議長', '副議長', '議長']
+
+# 本会議の議席番号：「六十七番」
+seat_number_regex = re.compile(r'^[〇一二三四五六七八九十百千0-9]+番$')
+# 氏名の姓：かなの名の前の漢字（2文字以上）
+surname_regex = re.compile(r'^(?P<surname>[\u3400-\u9fff\uf900-\ufaff々]{2,})[\u3041-\u30ff]')
+
+# 本会議の発言者表記：「役職（氏名君）」
+full_name_regex = re.compile(r'^(?P<role>.*?)\((?P<name>[^()]+?)君?\)$')
+# 委員会速記録の同姓の区別：「姓（名の頭文字）役職」
+hinted_surname_regex = re.compile(r'^(?P<surname>[^()]+)\((?P<hint>[^()]+)\)(?P<role>.+)$')
+
+
+class ParsedSpeaker(object):
+    def __init__(self, name: str = '', surname: str = '', hint: str = '', role: str = ''):
+        self.name: str = name        # 氏名（本会議の表記）
+        self.surname: str = surname  # 姓（委員会速記録の表記）
+        self.hint: str = hint        # 同姓の区別のための名の一部
+        self.role: str = role
+
+
+def normalize_name(s: str) -> str:
+    return normalize_text(s).replace('君', '') if s is not None else ''
+
+
+def is_member_role(role: str) -> bool:
+    """本会議の表記の役職が議員のもの（議席番号か議員の役職）かどうかを返します．"""
+    return role in member_roles or seat_number_regex.match(role) is not None
+
+
+def surname_of(name: str) -> Optional[str]:
+    """氏名の姓（かなの名の前の2文字以上の漢字）を返します．姓と名の境が分からない場合はNoneを返します．"""
+    m = surname_regex.match(name)
+    return m.group('surname') if m is not None else None
+
+
+def parse_speaker(speaker: str) -> Optional[ParsedSpeaker]:
+    """発言者文字列を氏名・姓・役職に分解します．議員の発言でないと判断できる場合はNoneを返します．"""
+    if speaker is None or speaker == 'null':
+        return None
+    s = normalize_text(speaker)
+    m = full_name_regex.match(s)
+    if m is not None:
+        return ParsedSpeaker(name=normalize_name(m.group('name')), role=m.group('role'))
+    m = hinted_surname_regex.match(s)
+    if m is not None and m.group('role') in member_roles:
+        return ParsedSpeaker(surname=m.group('surname'), hint=m.group('hint'), role=m.group('role'))
+    for role in member_roles:
+        if s.endswith(role) and len(s) > len(role):
+            return ParsedSpeaker(surname=s[:-len(role)], role=role)
+    return None
+
+
+class Roster(object):
+    """1会期分の議員名簿．"""
+
+    def __init__(self, start: datetime.date, end: datetime.date):
+        self.start: datetime.date = start
+        self.end: datetime.date = end
+        self.parties: Dict[int, str] = {}
+
+    def distance(self, d: datetime.date) -> int:
+        if d < self.start:
+            return (self.start - d).days
+        if d > self.end:
+            return (d - self.end).days
+        return 0
+
+
+class SpeakerResolver(object):
+    def __init__(self):
+        self.members: List[str] = []
+        self.member_ids: Dict[str, int] = {}
+        # 議員名の接頭辞→議員IDの集合
+        self.prefixes: Dict[str, Set[int]] = defaultdict(set)
+        self.rosters: List[Roster] = []
+        self.roster_starts: List[datetime.date] = []
+        self.cache: Dict[Tuple[str, int], Optional[Tuple[str, str]]] = {}
+
+    def member_id(self, name: str) -> int:
+        name = normalize_name(name)
+        if name not in self.member_ids:
+            self.member_ids[name] = len(self.members)
+            self.members.append(name)
+            for i in range(1, len(name) + 1):
+                self.prefixes[name[:i]].add(self.member_ids[name])
+        return self.member_ids[name]
+
+    def add_roster(self, start: datetime.date, end: datetime.date, speaker_list: Dict[str, str]):
+        for roster in self.rosters:
+            if roster.start == start and roster.end == end:
+                break
+        else:
+            roster = Roster(start, end)
+            self.rosters.append(roster)
+            self.rosters.sort(key=lambda x: (x.start, x.end))
+            self.roster_starts = [x.start for x in self.rosters]
+        for name, party in speaker_list.items():
+            roster.parties[self.member_id(name)] = party
+        self.cache.clear()
+
+    @staticmethod
+    def from_stance_files(paths: Iterable[str]) -> 'SpeakerResolver':
+        resolver = SpeakerResolver()
+        for path in paths:
+            with open(path) as f:
+                for x in json.load(f):
+                    start = parse_date(x.get('MeetingStartDate'))
+                    end = parse_date(x.get('MeetingEndDate'))
+                    if start is None or end is None or x.get('SpeakerList') is None:
+                        continue
+                    resolver.add_roster(start, end, x['SpeakerList'])
+        return resolver
+
+    def active_rosters(self, d: datetime.date) -> List[Roster]:
+        """日付を含む会期の名簿を返します．該当がなければ日付が最も近い会期の名簿を返します．"""
+        i = bisect_right(self.roster_starts, d)
+        ret = [r for r in self.rosters[:i] if r.end >= d]
+        if len(ret) > 0 or len(self.rosters) == 0:
+            return ret
+        nearest = min(r.distance(d) for r in self.rosters)
+        return [r for r in self.rosters if r.distance(d) == nearest]
+
+    def party_of(self, member: int, rosters: List[Roster]) -> Optional[str]:
+        for r in rosters:
+            if member in r.parties:
+                return r.parties[member]
+        return None
+
+    def candidates(self, prefix: str, rosters: List[Roster]) -> Set[int]:
+        return {m for m in self.prefixes.get(prefix, ()) if self.party_of(m, rosters) is not None}
+
+    def resolve(self, speaker: str, d: Optional[datetime.date]) -> Optional[Tuple[str, str]]:
+        """発言者文字列と日付から(議員名, 会派)を返します．特定できない場合はNoneを返します．"""
+        if d is None:
+            return None
+        key = (speaker, d.toordinal())
+        if key in self.cache:
+            return self.cache[key]
+        ret = None
+        parsed = parse_speaker(speaker)
+        if parsed is not None:
+            rosters = self.active_rosters(d)
+            member = self.match(parsed, rosters)
+            if member is not None:
+                ret = (self.members[member], self.party_of(member, rosters))
+        self.cache[key] = ret
+        return ret
+
+    def match(self, parsed: ParsedSpeaker, rosters: List[Roster]) -> Optional[int]:
+        if parsed.name != '':
+            # 知事・局長等の議員でない役職は対応付けません
+            if not is_member_role(parsed.role):
+                return None
+            # 氏名の完全一致
+            m = self.member_ids.get(parsed.name)
+            if m is not None and self.party_of(m, rosters) is not None:
+                return m
+            # 表記揺れ（名の漢字・かな表記の違いなど）は，議席番号か委員の表記で姓が分かる場合のみ姓で引き当てます
+            if parsed.role != '委員' and seat_number_regex.match(parsed.role) is None:
+                return None
+            surname = surname_of(parsed.name)
+            if surname is None:
+                return None
+            cands = self.candidates(surname, rosters)
+            return next(iter(cands)) if len(cands) == 1 else None
+        cands = self.candidates(parsed.surname, rosters)
+        if len(cands) > 1 and parsed.hint != '':
+            cands = {m for m in cands if self.members[m][len(parsed.surname):].startswith(parsed.hint)}
+        if len(cands) == 1:
+            return next(iter(cands))
+        return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 会議録の発言者と議員・会派の対応付けスクリプトです．')
+
+    parser.add_argument('-f', '--input-file',
+                        required=True, nargs='+',
+                        help='SpeakerListを含むStance ClassificationのJSONを指定します'
+                        )
+
+    parser.add_argument('-m', '--minutes',
+                        nargs='*', default=None,
+                        help='会議録JSONまたはディレクトリを指定します（省略時は配布データ全体）'
+                        )
+
+    parser.add_argument('-o', '--output',
+                        required=True,
+                        help='対応付け結果のTSVの出力先を指定します'
+                        )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    resolver = SpeakerResolver.from_stance_files(args.input_file)
+
+    num_utterances = 0
+    num_resolved = 0
+    speakers = set()
+    with open(args.output, 'w') as f:
+        f.write('会議録ファイル名\t会議番号\t行番号\t日付\t発言者\t議員\t会派\n')
+        for ut in iter_utterances(list_minutes_files(args.minutes)):
+            num_utterances += 1
+            speakers.add(ut.speaker)
+            resolved = resolver.resolve(ut.speaker, ut.date)
+            member, party = resolved if resolved is not None else ('', '')
+            if resolved is not None:
+                num_resolved += 1
+            date = f'{ut.date.year}/{ut.date.month}/{ut.date.day}' if ut.date is not None else ''
+            f.write(f'{os.path.basename(ut.path)}\t{ut.meeting_idx}\t{ut.line}\t{date}\t{ut.speaker}\t{member}\t{party}\n')
+
+    # 出力
+    return json.dumps({
+        'success': True,
+        'num_utterances': num_utterances,
+        'num_resolved': num_resolved,
+        'num_speakers': len(speakers),
+        'num_members': len(resolver.members)
+    }, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Stance Classificationの(議案, 会派)ごとのTF-IDF特徴量の作成スクリプト．
+動作要件として，以下のモジュールが必要です．
+・numpy
+
+build：議案ごとの会期（MeetingStartDate～MeetingEndDate）の会議録から，SpeakerListで会派に属する議員の発言を
+会派ごとにまとめ，文字n-gram（既定はbigram）のTF-IDFを(議案, 会派)×語彙の疎行列（CSR）として保存します．
+発言者と議員の対応付けはpoliinfo2_speaker_index.pyのSpeakerResolverで行い，会派はSpeakerListに従います．
+同じ会期でSpeakerListが同じ議案は同じ文書になるため，文書（会期, 会派, 議員）は1回だけ数えて行列の1行とし，
+(議案, 会派)の行はその番号で参照します．
+--bill-mentionsを指定すると，議案名（Bill）か議案番号（BillNumber）を含む発言のみを議案ごとにまとめます．
+会議録は会議単位で読み込み，-jで会議を複数プロセスに分けて数えます．語彙は文字列順に並べるため，結果はプロセス数によりません．
+TF-IDFは (1 + log tf) * (log((1 + N) / (1 + df)) + 1) を文書ごとにL2正規化した値です（Nは文書数）．
+特徴量ファイルはpoliinfo2_gs_store.pyの配置（見出しのJSONと64バイト境界に揃えた配列）で，
+np.memmapで読み込むため，行列全体を読み込まずに行を参照できます．
+predict：特徴量と賛成・反対の手がかり語から，評価スクリプト（poliinfo2_eval_classification.py）の入力と同じ書式の
+推定結果を出力します．手がかり語の文字n-gramのTF-IDFの和が，反対の方が賛成より大きい会派を反対とします．
+
+【使い方】
+python poliinfo2_stance_features.py build -f PoliInfo2-StanceClassification-JA-Formal-Test.json -o stance_features.bin -j 4
+python poliinfo2_stance_features.py build -f PoliInfo2-StanceClassification-JA-Formal-Test.json -o stance_features.bin --bill-mentions
+python poliinfo2_stance_features.py predict -i stance_features.bin -f PoliInfo2-StanceClassification-JA-Formal-Test.json -o submission.json
+python poliinfo2_stance_features.py predict -i stance_features.bin -f PoliInfo2-StanceClassification-JA-Formal-Test.json -o submission.json -g PoliInfo2-StanceClassification-JA-Formal-CorrectAnswer.json
+
+【入力】Stance ClassificationのAnswerSheet（ID，MeetingStartDate，MeetingEndDate，Bill，BillNumber，
+SpeakerList，ProsConsPartyListBinaryを用います）と会議録JSON（省略時は配布データ全体）です．
+
+【出力】特徴量ファイルの配列は以下のとおりです．
+    "data": float32, "indices": int32, "indptr": int64  // 文書×語彙のTF-IDF（CSR）
+    "idf": float32                                      // 語ごとのIDF
+    "vocab/blob", "vocab/offsets"                       // 語彙（文字n-gram）の文字列表
+    "bills/blob", "bills/offsets"                       // 議案のIDの文字列表
+    "parties/blob", "parties/offsets"                   // 会派名の文字列表
+    "rows/bill", "rows/party", "rows/doc": int32        // (議案, 会派)ごとの議案・会派・文書の番号
+見出しのmetaには作成条件（files，ngram，bill_mentions）と件数を記録します．
+predictは推定結果をAnswerSheetと同じ書式（ProsConsPartyListBinaryを埋めたもの）で出力します．
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "num_bills": int,       // 議案数
+    "num_rows": int,        // (議案, 会派)の数
+    "num_docs": int,        // 文書数（build）
+    "num_terms": int,       // 語彙数（build）
+    "num_utterances": int,  // 文書に加えた発言数（build）
+    "num_against": int,     // 反対と推定した数（predict）
+    "evaluation": {...}     // -gを指定した場合の評価結果（predict，"ins"を除きます）
+}
+
+更新：2026.10.19
+"""
+
+import os
+import sys
+import argparse
+import json
+import multiprocessing
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from poliinfo2_evalscripts import import_eval_script
+from poliinfo2_gs_store import GSStore, StoredStrings, pack_strings
+from poliinfo2_minutes import iter_meetings, list_minutes_files, normalize_text, parse_date
+from poliinfo2_minutes_index import char_ngrams
+from poliinfo2_speaker_index import SpeakerResolver, normalize_name
+
+# 特徴量ファイルの書式バージョン
+FEATURES_VERSION = 1
+
+# 先読みする会議数（プロセスあたり）
+PREFETCH_PER_WORKER = 4
+
+# 手がかり語の既定値
+FOR_CUES = ['賛成']
+AGAINST_CUES = ['反対']
+
+# ワーカープロセスごとの状態
+_worker: Dict[str, object] = {}
+
+
+class Document(object):
+    """(議案, 会派)の行がまとめて参照する発言の集まりです．"""
+
+    def __init__(self, start: int, end: int, bill: Optional[Tuple[str, str]]):
+        self.start: int = start  # 会期の開始日（日付の序数）
+        self.end: int = end      # 会期の終了日
+        # --bill-mentionsの場合の議案名と議案番号（正規化済み）
+        self.bill: Optional[Tuple[str, str]] = bill
+
+    def accepts(self, date: int, text: str) -> bool:
+        if not self.start <= date <= self.end:
+            return False
+        if self.bill is None:
+            return True
+        return any(x != '' and x in text for x in self.bill)
+
+
+class Plan(object):
+    """AnswerSheetから(議案, 会派)の行と文書を作り，議員ごとに発言を加える文書を引けるようにします．"""
+
+    def __init__(self, bills: List[dict], bill_mentions: bool = False):
+        self.bill_ids: List[str] = []
+        self.parties: List[str] = []
+        party_ids: Dict[str, int] = {}
+        self.rows: List[Tuple[int, int, int]] = []
+        self.docs: List[Document] = []
+        doc_ids: Dict[tuple, int] = {}
+        # 議員名→発言を加える文書の番号
+        self.member_docs: Dict[str, List[int]] = {}
+
+        for bill in bills:
+            start = parse_date(bill.get('MeetingStartDate'))
+            end = parse_date(bill.get('MeetingEndDate'))
+            if start is None or end is None:
+                raise Exception(f'会期が不正です．(id={bill["ID"]})')
+            speaker_list = {normalize_name(k): v for k, v in (bill.get('SpeakerList') or {}).items()}
+            key_bill = None
+            if bill_mentions:
+                key_bill = (normalize_text(bill.get('Bill', '')), normalize_text(bill.get('BillNumber', '')))
+            bill_idx = len(self.bill_ids)
+            self.bill_ids.append(bill['ID'])
+            for party in (bill.get('ProsConsPartyListBinary') or {}).keys():
+                members = tuple(sorted(k for k, v in speaker_list.items() if v == party))
+                key = (start.toordinal(), end.toordinal(), key_bill, members)
+                doc = doc_ids.get(key)
+                if doc is None:
+                    doc = doc_ids[key] = len(self.docs)
+                    self.docs.append(Document(start.toordinal(), end.toordinal(), key_bill))
+                    for member in members:
+                        self.member_docs.setdefault(member, []).append(doc)
+                self.rows.append((bill_idx, party_ids.setdefault(party, len(party_ids)), doc))
+                if len(party_ids) > len(self.parties):
+                    self.parties.append(party)
+        self.dates: List[Tuple[int, int]] = sorted({(d.start, d.end) for d in self.docs})
+
+    def in_session(self, date: int) -> bool:
+        return any(start <= date <= end for start, end in self.dates)
+
+
+def count_meeting(plan: Plan, resolver: SpeakerResolver, meeting: dict, ngram: int) -> Tuple[Dict[int, Counter], int]:
+    """1会議分の発言の文字n-gramを文書ごとに数え，(文書→出現数, 文書に加えた発言数)を返します．"""
+    counts: Dict[int, Counter] = {}
+    num_utterances = 0
+    d = parse_date(meeting.get('Date'))
+    if d is None or not plan.in_session(d.toordinal()):
+        return counts, 0
+    date = d.toordinal()
+    for ut in meeting.get('Proceeding', []):
+        resolved = resolver.resolve(ut.get('Speaker', 'null'), d)
+        if resolved is None:
+            continue
+        docs = plan.member_docs.get(resolved[0])
+        if docs is None:
+            continue
+        text = ut.get('Utterance', '')
+        normalized = None
+        grams = None
+        for doc in docs:
+            document = plan.docs[doc]
+            if document.bill is not None:
+                if normalized is None:
+                    normalized = normalize_text(text)
+                if not document.accepts(date, normalized):
+                    continue
+            elif not document.accepts(date, text):
+                continue
+            if grams is None:
+                grams = Counter(char_ngrams(text, ngram))
+                num_utterances += 1
+            c = counts.get(doc)
+            if c is None:
+                counts[doc] = Counter(grams)
+            else:
+                c.update(grams)
+    return counts, num_utterances
+
+
+def _init_worker(plan: Plan, resolver: SpeakerResolver, ngram: int):
+    _worker['plan'] = plan
+    _worker['resolver'] = resolver
+    _worker['ngram'] = ngram
+
+
+def _count_task(meeting: dict) -> Tuple[Dict[int, Counter], int]:
+    return count_meeting(_worker['plan'], _worker['resolver'], meeting, _worker['ngram'])
+
+
+def iter_counts(plan: Plan, resolver: SpeakerResolver, paths: List[str], ngram: int,
+                workers: int = 1) -> Iterator[Tuple[Dict[int, Counter], int]]:
+    """会議ごとの数えた結果を返します．会期外の会議はワーカーに渡しません．"""
+    def meetings():
+        for path in paths:
+            for meeting in iter_meetings(path):
+                d = parse_date(meeting.get('Date'))
+                if d is not None and plan.in_session(d.toordinal()):
+                    yield meeting
+
+    if workers <= 1:
+        for meeting in meetings():
+            yield count_meeting(plan, resolver, meeting, ngram)
+        return
+    with multiprocessing.Pool(workers, _init_worker, (plan, resolver, ngram)) as pool:
+        queue = deque()
+        for meeting in meetings():
+            queue.append(pool.apply_async(_count_task, (meeting,)))
+            if len(queue) >= workers * PREFETCH_PER_WORKER:
+                yield queue.popleft().get()
+        while len(queue) > 0:
+            yield queue.popleft().get()
+
+
+def tfidf_matrix(doc_counts: List[Counter]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """文書ごとの出現数から(語彙, IDF, data, indices, indptr)を返します．"""
+    vocab = sorted(set().union(*doc_counts)) if len(doc_counts) > 0 else []
+    term_ids = {t: i for i, t in enumerate(vocab)}
+    indptr = np.zeros(len(doc_counts) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in doc_counts], out=indptr[1:])
+    indices = np.empty(int(indptr[-1]), dtype=np.int32)
+    tf = np.empty(int(indptr[-1]), dtype=np.float64)
+    for i, c in enumerate(doc_counts):
+        terms = sorted(term_ids[t] for t in c)
+        indices[indptr[i]:indptr[i + 1]] = terms
+        tf[indptr[i]:indptr[i + 1]] = [c[vocab[t]] for t in terms]
+
+    # IDFは語ごとの文書頻度から求め，TF-IDFを文書ごとにL2正規化します
+    df = np.bincount(indices, minlength=len(vocab))
+    idf = np.log((1 + len(doc_counts)) / (1 + df)) + 1
+    data = (1 + np.log(tf)) * idf[indices]
+    lengths = np.diff(indptr)
+    nonempty = lengths > 0
+    norms = np.ones(len(doc_counts))
+    if len(data) > 0:
+        # 空でない文書の開始位置ごとに区切れば，各区間はその文書の範囲になります
+        norms[nonempty] = np.sqrt(np.add.reduceat(data ** 2, indptr[:-1][nonempty]))
+    data = data / np.repeat(norms, lengths)
+    return vocab, idf.astype(np.float32), data.astype(np.float32), indices, indptr
+
+
+def build(args) -> dict:
+    bills = []
+    for path in args.input_files:
+        with open(path) as f:
+            bills.extend(json.load(f))
+    plan = Plan(bills, args.bill_mentions)
+    resolver = SpeakerResolver.from_stance_files(args.input_files)
+
+    # 文書ごとの出現数
+    doc_counts = [Counter() for _ in plan.docs]
+    num_utterances = 0
+    for counts, n in iter_counts(plan, resolver, list_minutes_files(args.minutes), args.ngram, args.jobs):
+        num_utterances += n
+        for doc, c in counts.items():
+            doc_counts[doc].update(c)
+
+    # TF-IDFの疎行列
+    vocab, idf, data, indices, indptr = tfidf_matrix(doc_counts)
+    arrays = {
+        'data': data,
+        'indices': indices,
+        'indptr': indptr,
+        'idf': idf,
+        'rows/bill': np.array([r[0] for r in plan.rows], dtype=np.int32),
+        'rows/party': np.array([r[1] for r in plan.rows], dtype=np.int32),
+        'rows/doc': np.array([r[2] for r in plan.rows], dtype=np.int32)
+    }
+    arrays.update(pack_strings('vocab', vocab))
+    arrays.update(pack_strings('bills', plan.bill_ids))
+    arrays.update(pack_strings('parties', plan.parties))
+    meta = {
+        'version': FEATURES_VERSION,
+        'files': [os.path.basename(x) for x in args.input_files],
+        'ngram': args.ngram,
+        'bill_mentions': args.bill_mentions,
+        'num_docs': len(plan.docs),
+        'num_utterances': num_utterances
+    }
+    GSStore(meta, arrays).save(args.output)
+    return {
+        'success': True,
+        'num_bills': len(plan.bill_ids),
+        'num_rows': len(plan.rows),
+        'num_docs': len(plan.docs),
+        'num_terms': len(vocab),
+        'num_utterances': num_utterances
+    }
+
+
+class StanceFeatures(object):
+    """buildで保存した特徴量ファイルをメモリマップして参照します．"""
+
+    def __init__(self, path: str):
+        self.store: GSStore = GSStore.open(path)
+        if self.store.meta.get('version') != FEATURES_VERSION:
+            raise Exception(f'特徴量ファイルの書式バージョンが異なります．再作成してください．({path})')
+        self.ngram: int = self.store.meta['ngram']
+        self.data: np.ndarray = self.store['data']
+        self.indices: np.ndarray = self.store['indices']
+        self.indptr: np.ndarray = self.store['indptr']
+        self.vocab = StoredStrings(self.store, 'vocab')
+        self.bills = StoredStrings(self.store, 'bills')
+        self.parties = StoredStrings(self.store, 'parties')
+        self.row_bill: np.ndarray = self.store['rows/bill']
+        self.row_party: np.ndarray = self.store['rows/party']
+        self.row_doc: np.ndarray = self.store['rows/doc']
+
+    def term_id(self, term: str) -> int:
+        """語彙の文字列順を二分探索して語の番号を返します．語彙にない場合は-1を返します．"""
+        lo, hi = 0, len(self.vocab)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.vocab[mid] < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.vocab) and self.vocab[lo] == term else -1
+
+    def rows(self) -> Dict[Tuple[str, str], int]:
+        """(議案のID, 会派)→文書の番号を返します．"""
+        return {(self.bills[int(b)], self.parties[int(p)]): int(d)
+                for b, p, d in zip(self.row_bill, self.row_party, self.row_doc)}
+
+    def cue_scores(self, cues: List[str]) -> np.ndarray:
+        """文書ごとに，手がかり語の文字n-gramのTF-IDFの和を返します．"""
+        ids = sorted({i for i in (self.term_id(g) for cue in cues for g in char_ngrams(cue, self.ngram)) if i >= 0})
+        num_docs = len(self.indptr) - 1
+        if len(ids) == 0 or len(self.indices) == 0:
+            return np.zeros(num_docs)
+        hit = np.isin(self.indices, np.array(ids, dtype=np.int32))
+        doc_of = np.repeat(np.arange(num_docs), np.diff(self.indptr))
+        return np.bincount(doc_of[hit], weights=self.data[hit], minlength=num_docs)
+
+
+def predict(args) -> dict:
+    features = StanceFeatures(args.index)
+    with open(args.input_file) as f:
+        bills = json.load(f)
+    rows = features.rows()
+    margin = features.cue_scores(args.against_cues) - features.cue_scores(args.for_cues)
+
+    # 文書がない(議案, 会派)は賛成とします
+    num_rows = 0
+    num_against = 0
+    for bill in bills:
+        labels = {}
+        for party in (bill.get('ProsConsPartyListBinary') or {}).keys():
+            doc = rows.get((bill['ID'], party))
+            against = doc is not None and margin[doc] > args.threshold
+            labels[party] = '反対' if against else '賛成'
+            num_rows += 1
+            num_against += int(against)
+        bill['ProsConsPartyListBinary'] = labels
+    with open(args.output, 'w') as f:
+        json.dump(bills, f, ensure_ascii=False, indent=1)
+    ret = {
+        'success': True,
+        'num_bills': len(bills),
+        'num_rows': num_rows,
+        'num_against': num_against
+    }
+
+    # 評価
+    if args.gs_data is not None:
+        m = import_eval_script('stance')
+        with open(args.gs_data) as f:
+            gss = m.load_json(f.read())
+        with open(args.output) as f:
+            targets = m.load_json(f.read())
+        m.check_targets(targets)
+        result = m.evaluate(gss, targets)
+        result.pop('ins', None)
+        ret['evaluation'] = result
+    return ret
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 Stance Classificationの(議案, 会派)ごとのTF-IDF特徴量の作成スクリプトです．')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('build', help='会議録から(議案, 会派)ごとのTF-IDF特徴量を作成します')
+    p.add_argument('-f', '--input-files', nargs='+', required=True,
+                   help='SpeakerListを含むStance ClassificationのJSONを指定します')
+    p.add_argument('-m', '--minutes', nargs='*', default=None,
+                   help='会議録JSONまたはディレクトリを指定します（省略時は配布データ全体）')
+    p.add_argument('-o', '--output', required=True,
+                   help='特徴量ファイルの出力先を指定します')
+    p.add_argument('-n', '--ngram', type=int, default=2,
+                   help='語とする文字n-gramの長さを指定します')
+    p.add_argument('--bill-mentions', action='store_true',
+                   help='議案名か議案番号を含む発言のみを議案ごとにまとめます')
+    p.add_argument('-j', '--jobs', type=int, default=1,
+                   help='並列に処理するプロセス数を指定します')
+    p.set_defaults(func=build)
+
+    p = sub.add_parser('predict', help='手がかり語で賛否を推定し，評価スクリプトの入力と同じ書式で出力します')
+    p.add_argument('-i', '--index', required=True,
+                   help='buildで作成した特徴量ファイルを指定します')
+    p.add_argument('-f', '--input-file', required=True,
+                   help='Stance ClassificationのAnswerSheetを指定します')
+    p.add_argument('-o', '--output', required=True,
+                   help='推定結果（JSON）の出力先を指定します')
+    p.add_argument('-g', '--gs-data', default=None,
+                   help='GSデータを指定すると，推定結果を評価して標準出力に含めます')
+    p.add_argument('--for-cues', nargs='+', default=FOR_CUES,
+                   help='賛成の手がかり語を指定します')
+    p.add_argument('--against-cues', nargs='+', default=AGAINST_CUES,
+                   help='反対の手がかり語を指定します')
+    p.add_argument('--threshold', type=float, default=0.0,
+                   help='反対と賛成の手がかり語のTF-IDFの和の差がこれを超える会派を反対とします')
+    p.set_defaults(func=predict)
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    # 出力
+    return json.dumps(args.func(args), ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
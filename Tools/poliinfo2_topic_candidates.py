@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Topic Detectionの候補抽出スクリプト．
+
+会議録JSONを会議単位で逐次読み込み，議員の質問から論点（議題）の候補を抽出します．
+「次に、〇〇について質問します。」のように段落の冒頭で論点を示す表現から〇〇を取り出し，
+(議員, 発言の範囲, 論点)の組として出力します．
+会議単位で処理するため，メモリ上に保持するのは処理中の会議のみです．
+-jを指定すると会議単位で複数プロセスに分割して処理します（出力順は入力順のままです）．
+
+発言の範囲の行番号は，Dialog Summarizationの会議録（Pref13_tokyo.json）のLineと同様に
+会議内の発言の通し番号（1始まり）で，QuestionStartingLine等と同じ扱いで利用できます．
+StartingLineは論点が示された発言，EndingLineは同じ議員の次の論点または次の質問者の直前の発言
+（議長等の議事進行の発言を除く）です．
+
+【使い方】
+python poliinfo2_topic_candidates.py -o candidates.jsonl
+python poliinfo2_topic_candidates.py -m ../TopicDetection/utterances_tokyo_proceeding2020_withURL.json -o candidates.jsonl -j 4
+
+【出力】候補1件ごとに以下のJSONを1行として，抽出した順に出力します（JSON Lines）．
+{
+    "File": string,         // 会議録ファイル名
+    "Meeting": int,         // ファイル内の会議の番号（0始まり）
+    "Date": string,         // 会議の日付
+    "Speaker": string,      // 発言者
+    "Member": string,       // 議員名（委員会速記録では姓）
+    "StartingLine": int,    // 範囲の開始行
+    "EndingLine": int,      // 範囲の終了行
+    "Offset": int,          // 開始行の発言内での論点の段落の開始位置（文字数）
+    "Topic": string         // 論点の候補
+}
+
+標準出力には以下のJSON書式で集計結果を出力します．
+{
+    "success": true,
+    "num_meetings": int,    // 処理した会議数
+    "num_candidates": int,  // 抽出した候補数
+    "num_members": int      // 候補を抽出した議員数
+}
+
+更新：2026.10.19
+"""
+
+import os
+import re
+import sys
+import argparse
+import json
+import multiprocessing
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from poliinfo2_minutes import TOPIC_MINUTES_DIR, iter_meetings, list_minutes_files, parse_date
+from poliinfo2_speaker_index import parse_speaker
+
+# 本会議の質問者の表記（議席番号）
+seat_regex = re.compile(r'^[〇一二三四五六七八九十百千]+番$')
+# 委員会速記録で質問者となる役職
+questioner_roles = ['委員']
+# 議事進行を担う役職
+chair_roles = ['臨時副委員長', '臨時委員長', '副委員長', '委員長', '副座長', '座長', '臨時議長', '副議長', '議長']
+
+# 段落の冒頭の接続表現
+topic_prefix_regex = re.compile(r'^(?:(?:それでは|では|それから)、?|'
+                                r'(?:まずは|まず|初めに|はじめに|最初に|次に|次いで|続いて|続きまして|引き続き|最後に|そこで|また|さらに)、)')
+# 論点を示す段落
+topic_regex = re.compile(
+    r'^(?P<topic>[^。]{2,60}?)について(?:、|の)?'
+    r'(?:質問します|質問いたします|伺います|お伺いします|お伺いいたします|伺いたいと思います|'
+    r'お尋ねします|お聞きします|です|であります)?。?$')
+
+# 並列処理時に先読みする会議数（プロセス数あたり）
+PREFETCH_PER_WORKER = 4
+
+
+class Candidate(object):
+    def __init__(self, file: str, meeting_idx: int, date: str, speaker: str, member: str,
+                 line: int, offset: int, topic: str):
+        self.file: str = file
+        self.meeting_idx: int = meeting_idx
+        self.date: str = date
+        self.speaker: str = speaker
+        self.member: str = member
+        self.starting_line: int = line
+        self.ending_line: int = line
+        self.offset: int = offset
+        self.topic: str = topic
+
+    def to_dict(self) -> dict:
+        return {
+            'File': self.file,
+            'Meeting': self.meeting_idx,
+            'Date': self.date,
+            'Speaker': self.speaker,
+            'Member': self.member,
+            'StartingLine': self.starting_line,
+            'EndingLine': self.ending_line,
+            'Offset': self.offset,
+            'Topic': self.topic
+        }
+
+
+def questioner_name(speaker: str) -> Optional[str]:
+    """質問者（議員）の発言であれば議員名を，そうでなければNoneを返します．"""
+    parsed = parse_speaker(speaker)
+    if parsed is None:
+        return None
+    if parsed.name != '' and seat_regex.match(parsed.role):
+        return parsed.name
+    if parsed.surname != '' and parsed.role in questioner_roles:
+        return parsed.surname
+    return None
+
+
+def is_chair(speaker: str) -> bool:
+    parsed = parse_speaker(speaker)
+    return parsed is not None and parsed.role in chair_roles
+
+
+def extract_topics(utterance: str) -> List[Tuple[int, str]]:
+    """発言から(段落の開始位置, 論点)のリストを返します．"""
+    ret = []
+    offset = 0
+    for para in utterance.split('\n'):
+        text = para.strip(' 　')
+        while True:
+            m = topic_prefix_regex.match(text)
+            if m is None:
+                break
+            text = text[m.end():]
+        m = topic_regex.match(text)
+        if m is not None:
+            ret.append((offset + len(para) - len(para.lstrip(' 　')), m.group('topic')))
+        offset += len(para) + 1
+    return ret
+
+
+def extract_meeting(file: str, meeting_idx: int, meeting: dict) -> List[Candidate]:
+    """1会議分の候補を抽出します．"""
+    d = parse_date(meeting.get('Date'))
+    date = f'{d.year}/{d.month}/{d.day}' if d is not None else ''
+    ret: List[Candidate] = []
+    pending: List[Candidate] = []  # 終了行が確定していない候補
+    member = None  # 現在の質問者
+    last_line = 0  # 議事進行以外の直近の発言の行番号
+
+    def close():
+        for c in pending:
+            c.ending_line = max(c.starting_line, last_line)
+        ret.extend(pending)
+        pending.clear()
+
+    for i, ut in enumerate(meeting.get('Proceeding', [])):
+        line = i + 1
+        speaker = ut.get('Speaker', 'null')
+        if speaker is None or speaker == 'null' or is_chair(speaker):
+            continue
+        name = questioner_name(speaker)
+        if name is not None:
+            topics = extract_topics(ut.get('Utterance', ''))
+            # 質問者が替わるか，同じ質問者が次の論点に移った時点で範囲を確定します
+            if name != member or len(topics) > 0:
+                close()
+            member = name
+            for offset, topic in topics:
+                pending.append(Candidate(file, meeting_idx, date, speaker, name, line, offset, topic))
+        last_line = line
+    close()
+    return ret
+
+
+def _extract_task(task: Tuple[str, int, dict]) -> List[Candidate]:
+    return extract_meeting(*task)
+
+
+def iter_tasks(paths: List[str]) -> Iterator[Tuple[str, int, dict]]:
+    for path in paths:
+        for meeting_idx, meeting in enumerate(iter_meetings(path)):
+            yield os.path.basename(path), meeting_idx, meeting
+
+
+def iter_candidates(paths: List[str], workers: int = 1) -> Iterator[List[Candidate]]:
+    """会議ごとに候補のリストを入力順に返します．
+
+    workersが2以上の場合は会議単位で複数プロセスに分割します．
+    先読みする会議数を制限するため，メモリ使用量はプロセス数に比例する範囲に収まります．
+    """
+    if workers <= 1:
+        for task in iter_tasks(paths):
+            yield _extract_task(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        queue = deque()
+        for task in iter_tasks(paths):
+            queue.append(pool.apply_async(_extract_task, (task,)))
+            if len(queue) >= workers * PREFETCH_PER_WORKER:
+                yield queue.popleft().get()
+        while len(queue) > 0:
+            yield queue.popleft().get()
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='NTCIR-15 QA Lab PoliInfo2 Topic Detectionの候補抽出スクリプトです．')
+
+    parser.add_argument('-m', '--minutes',
+                        nargs='*', default=None,
+                        help='会議録JSONまたはディレクトリを指定します（省略時はTopicDetection）'
+                        )
+
+    parser.add_argument('-o', '--output',
+                        required=True,
+                        help='候補の出力先（JSON Lines）を指定します'
+                        )
+
+    parser.add_argument('-j', '--jobs',
+                        type=int, default=1,
+                        help='並列に処理するプロセス数を指定します'
+                        )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    paths = list_minutes_files(args.minutes if args.minutes is not None else [TOPIC_MINUTES_DIR])
+
+    num_meetings = 0
+    num_candidates = 0
+    members = set()
+    with open(args.output, 'w') as f:
+        for candidates in iter_candidates(paths, args.jobs):
+            num_meetings += 1
+            for c in candidates:
+                num_candidates += 1
+                members.add(c.member)
+                f.write(json.dumps(c.to_dict(), ensure_ascii=False) + '\n')
+
+    # 出力
+    return json.dumps({
+        'success': True,
+        'num_meetings': num_meetings,
+        'num_candidates': num_candidates,
+        'num_members': len(members)
+    }, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 評価対象データの検証ツール．
+
+Dialog Summarization / Stance Classification / Entity Linkingの評価対象データを，評価の前に検証します．
+評価対象データを先頭から1回だけ読み進め，GSデータのID・政党（Entity Linkingは形態素）の索引と照合して，
+見つかった問題を全て位置とともに報告します．MeCabの読み込みやROUGEの計算は行わないため，
+時間のかかる評価を始める前に，評価の途中で失敗する提出や黙って切り詰められる提出を受け付けないようにできます．
+
+【検証内容】
+・Dialog Summarization / Stance Classification（JSON）
+  JSONの配列であること，各要素がオブジェクトであること，"ID"が文字列でGSデータにあり重複しないこと，
+  "ID"が古いバージョンの接頭辞で始まらないこと（評価スクリプトは先頭の要素のみ調べますが，全ての要素で調べます）
+・Dialog Summarization
+  評価スクリプトが読み込む項目があること，要約が文字列で文字数が整数であること，
+  答弁の要約（AnswerSummary）と文字数（AnswerLength）の数がGSデータの答弁の数と同じであること
+・Stance Classification
+  "ProsConsPartyListBinary"がオブジェクトで，GSデータのその議案の全ての政党があり，値が賛成か反対であること
+・Entity Linking（TSV）
+  語数（見出し行を除いた行数）がGSデータと同じであること，各行の形態素がGSデータの同じ行と同じであること，
+  IOB2タグが空，O，B，Iのいずれかであること，IタグがBタグかIタグの後に続くこと
+
+【使い方】
+python poliinfo2_validate.py summarization -f submission.json
+python poliinfo2_validate.py stance -f submission.json
+python poliinfo2_validate.py entity -f submission.tsv -g PoliInfo2-EntityLinking-JA-Formal-Test-GSD.tsv
+python poliinfo2_validate.py summarization -f submission.json --max-errors 0
+
+【出力】検証結果は標準出力で以下のJSON書式です．
+{
+    "success": true,    // 検証を実行できたかどうか
+    "valid": bool,      // 問題がなかったかどうか
+    "task": string,     // タスク名
+    "version": string,  // データバージョン
+    "num_records": int, // 評価対象データの件数（Entity Linkingは語数）
+    "num_missing": int, // GSデータのIDのうち評価対象データにないものの数（Entity Linkingは0）
+    "num_errors": int,  // 問題の数
+    "errors": [         // 問題（先頭から--max-errors件まで）
+        {
+            "line": int,    // 行番号（1始まり．Entity Linkingの見出し行は1行目）
+            "record": int,  // 要素の番号（0始まり．Entity Linkingは語の位置）
+            "ID": string,   // 要素のID（Entity Linking等，IDがない場合はnull）
+            "error": string // 問題の内容
+        },
+        ...
+    ]
+}
+GSデータにないIDの要素はDialog Summarizationでは評価に失敗し，Stance Classificationでは評価されません．
+GSデータのIDのうち評価対象データにないものは問題とはせず，num_missingで数のみ示します．
+
+更新：2026.10.19
+"""
+
+import sys
+import re
+import argparse
+import itertools
+import json
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from poliinfo2_evalscripts import default_gs_paths, import_eval_script
+
+# 検証できるタスク
+tasks = ['summarization', 'stance', 'entity']
+
+# Dialog Summarizationの評価スクリプトが読み込む項目と，型を調べるもの（None：型を調べません）
+summarization_fields = {
+    'ID': str,
+    'Date': None,
+    'Prefecture': None,
+    'Meeting': None,
+    'MainTopic': None,
+    'QuestionSpeaker': None,
+    'SubTopic': None,
+    'QuestionSummary': str,
+    'QuestionLength': int,
+    'QuestionStartingLine': None,
+    'QuestionEndingLine': None,
+    'AnswerSpeaker': None,
+    'AnswerSummary': List[str],
+    'AnswerLength': List[int],
+    'AnswerStartingLine': None,
+    'AnswerEndingLine': None
+}
+
+# Stance Classificationの賛否
+stance_labels = ('賛成', '反対')
+
+# Entity LinkingのIOB2タグ（空とOはどちらもOとして評価します）
+iob2_tags = ('', 'O', 'B', 'I')
+
+# JSONの空白類
+json_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class Problems(object):
+    """検証で見つかった問題を記録します．max_errors件を超えた問題は数のみ数えます．"""
+
+    def __init__(self, max_errors: Optional[int] = None):
+        self.max_errors: Optional[int] = max_errors
+        self.count: int = 0
+        self.errors: List[dict] = []
+
+    def add(self, line: int, record: Optional[int], ins_id: Optional[str], error: str):
+        self.count += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'record': record, 'ID': ins_id, 'error': error})
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="""NTCIR-15 QA Lab PoliInfo2 評価対象データの検証ツール．
+
+評価対象データを1回だけ読み進め，GSデータのID・政党・形態素と照合して，問題を全て位置とともに出力します．
+
+【出力】検証結果は標準出力で以下のJSON書式です．
+{
+    "success": true, "valid": bool, "task": string, "version": string,
+    "num_records": int, "num_missing": int, "num_errors": int,
+    "errors": [{"line": int, "record": int, "ID": string, "error": string}, ...]
+}""")
+    subparsers = parser.add_subparsers(dest='task', required=True)
+    for task in tasks:
+        p = subparsers.add_parser(task, help=f'{task}の評価対象データを検証します')
+        p.add_argument('-g', '--gs-data',
+                       default=default_gs_paths[task],
+                       help='GSデータを指定します'
+                       )
+        p.add_argument('-f', '--input-file',
+                       required=True,
+                       help='評価対象データを指定します'
+                       )
+        p.add_argument('--max-errors',
+                       type=int, default=100,
+                       help='出力する問題の数の上限を指定します（負の値で制限しません．数える問題の数は制限しません）'
+                       )
+    return parser.parse_args()
+
+
+def iter_json_array(text: str) -> Iterator[Tuple[int, int, object]]:
+    """JSONの配列の要素を先頭から1つずつ，(要素の番号, 要素の始まる行番号, 値)として返します．
+    書式が不正な場合は，その位置でjson.JSONDecodeErrorを送出します．"""
+    decoder = json.JSONDecoder()
+    pos = json_whitespace.match(text).end()
+    if text[pos:pos + 1] != '[':
+        raise json.JSONDecodeError('JSONの配列ではありません', text, pos)
+    pos = json_whitespace.match(text, pos + 1).end()
+    line = 1
+    last = 0
+    i = 0
+    if text[pos:pos + 1] != ']':
+        while True:
+            line += text.count('\n', last, pos)
+            last = pos
+            obj, pos = decoder.raw_decode(text, pos)
+            yield i, line, obj
+            i += 1
+            pos = json_whitespace.match(text, pos).end()
+            c = text[pos:pos + 1]
+            if c == ']':
+                break
+            if c != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+            pos = json_whitespace.match(text, pos + 1).end()
+    pos = json_whitespace.match(text, pos + 1).end()
+    if pos != len(text):
+        raise json.JSONDecodeError('Extra data', text, pos)
+
+
+class JSONRecords(object):
+    """JSONの配列の要素のうち，IDがGSデータにあり重複しないオブジェクトを(要素の番号, 行番号, ID, 値)として返します．
+    それ以外の要素とJSONの書式の問題はproblemsに記録します．
+    num_recordsは読んだ要素の数，foundは返した要素のIDの集合です．"""
+
+    def __init__(self, text: str, ids: Iterable[str], old_id_prefix: List[str], problems: Problems):
+        self.text: str = text
+        self.ids: Iterable[str] = ids
+        self.old_id_prefix: Tuple[str, ...] = tuple(old_id_prefix)
+        self.problems: Problems = problems
+        self.num_records: int = 0
+        self.found: set = set()
+
+    def __iter__(self) -> Iterator[Tuple[int, int, str, dict]]:
+        problems = self.problems
+        try:
+            for i, line, obj in iter_json_array(self.text):
+                self.num_records = i + 1
+                ret = self.check(i, line, obj)
+                if ret is not None:
+                    yield ret
+        except json.JSONDecodeError as e:
+            problems.add(e.lineno, None, None, f'JSONの書式が不正です．({e.msg}: {e.lineno}行{e.colno}列)')
+
+    def check(self, i: int, line: int, obj) -> Optional[Tuple[int, int, str, dict]]:
+        problems = self.problems
+        if not isinstance(obj, dict):
+            problems.add(line, i, None, '要素がオブジェクトではありません．')
+            return None
+        ins_id = obj.get('ID')
+        if not isinstance(ins_id, str):
+            problems.add(line, i, None, '"ID"がないか，文字列ではありません．')
+            return None
+        if ins_id.startswith(self.old_id_prefix):
+            problems.add(line, i, ins_id, '入力データのIDが古いバージョンになっています．')
+            return None
+        if ins_id not in self.ids:
+            problems.add(line, i, ins_id, '入力データのIDがGSデータ上で見つかりません．')
+            return None
+        if ins_id in self.found:
+            problems.add(line, i, ins_id, 'IDが重複しています．')
+            return None
+        self.found.add(ins_id)
+        return i, line, ins_id, obj
+
+
+def check_type(value, t) -> bool:
+    """値がsummarization_fieldsの型（str，int，List[str]，List[int]）かどうかを返します．"""
+    if t is None:
+        return True
+    if t is str:
+        return isinstance(value, str)
+    if t is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, list) and all(check_type(x, t.__args__[0]) for x in value)
+
+
+def load_summarization_index(gs_path: str) -> Dict[str, int]:
+    """Dialog SummarizationのGSデータのID→答弁の数を返します．"""
+    with open(gs_path) as f:
+        return {x['ID']: len(x['AnswerSummary']) for x in json.load(f)}
+
+
+def load_stance_index(gs_path: str) -> Dict[str, FrozenSet[str]]:
+    """Stance ClassificationのGSデータのID→政党の集合を返します．"""
+    with open(gs_path) as f:
+        return {x['ID']: frozenset(x['ProsConsPartyListBinary']) for x in json.load(f)}
+
+
+def iter_morphs(gs_path: str) -> Iterator[str]:
+    """Entity LinkingのGSデータの見出し行を除いた各行の形態素を返します．"""
+    with open(gs_path) as f:
+        for line in itertools.islice(f, 1, None):
+            yield line.rstrip().split('\t', 1)[0]
+
+
+def load_index(task: str, gs_path: str):
+    """タスクのGSデータの索引を返します．Entity Linkingは各行の形態素のリストです．"""
+    if task == 'summarization':
+        return load_summarization_index(gs_path)
+    if task == 'stance':
+        return load_stance_index(gs_path)
+    if task == 'entity':
+        return list(iter_morphs(gs_path))
+    raise Exception(f'タスク名が不正です．({task})')
+
+
+def validate_summarization(index: Dict[str, int], text: str, problems: Problems) -> Tuple[int, int]:
+    """Dialog Summarizationの評価対象データを検証し，(件数, GSデータのIDのうちないものの数)を返します．"""
+    records = JSONRecords(text, index, import_eval_script('summarization').old_id_prefix, problems)
+    for i, line, ins_id, obj in records:
+        for key, t in summarization_fields.items():
+            if key not in obj:
+                problems.add(line, i, ins_id, f'"{key}"がありません．')
+            elif not check_type(obj[key], t):
+                problems.add(line, i, ins_id, f'"{key}"の型が不正です．')
+        for key in ['AnswerSummary', 'AnswerLength']:
+            if isinstance(obj.get(key), list) and len(obj[key]) != index[ins_id]:
+                problems.add(line, i, ins_id,
+                             f'"{key}"の数がGSデータの答弁の数と異なります．({len(obj[key])} != {index[ins_id]})')
+    return records.num_records, len(index) - len(records.found)
+
+
+def validate_stance(index: Dict[str, FrozenSet[str]], text: str, problems: Problems) -> Tuple[int, int]:
+    """Stance Classificationの評価対象データを検証し，(件数, GSデータのIDのうちないものの数)を返します．"""
+    records = JSONRecords(text, index, import_eval_script('stance').old_id_prefix, problems)
+    for i, line, ins_id, obj in records:
+        parties = obj.get('ProsConsPartyListBinary')
+        if not isinstance(parties, dict):
+            problems.add(line, i, ins_id, '"ProsConsPartyListBinary"がないか，オブジェクトではありません．')
+            continue
+        for party in sorted(index[ins_id] - parties.keys()):
+            problems.add(line, i, ins_id, f'GSデータの政党がありません．({party})')
+        for party in sorted(index[ins_id] & parties.keys()):
+            if parties[party] not in stance_labels:
+                problems.add(line, i, ins_id, f'賛否が不正です．({party}: {parties[party]})')
+    return records.num_records, len(index) - len(records.found)
+
+
+def validate_entity(gs_morphs: Iterable[str], lines: Iterable[str], problems: Problems) -> Tuple[int, int]:
+    """Entity Linkingの評価対象データ（見出し行を含む行）をGSデータの各行の形態素と行ごとに照合して検証し，
+    (語数, 0)を返します．"""
+    prev = ''
+    num_gs = 0
+    num_records = 0
+    pairs = itertools.zip_longest(gs_morphs, itertools.islice(lines, 1, None))
+    for i, (morph, line) in enumerate(pairs):
+        # 見出し行が1行目です
+        lineno = i + 2
+        if morph is not None:
+            num_gs = i + 1
+        if line is None:
+            continue
+        num_records = i + 1
+        cols = line.rstrip().split('\t', 2)
+        if morph is not None and cols[0] != morph:
+            problems.add(lineno, i, None, f'形態素がGSデータと異なります．({cols[0]} != {morph})')
+        tag = cols[1] if len(cols) > 1 else ''
+        if tag not in iob2_tags:
+            problems.add(lineno, i, None, f'IOB2タグが不正です．({tag})')
+        elif tag == 'I' and prev not in ('B', 'I'):
+            problems.add(lineno, i, None, 'IタグがBタグかIタグの後に続いていません．')
+        prev = tag
+    if num_records != num_gs:
+        problems.add(min(num_records, num_gs) + 2, min(num_records, num_gs), None,
+                     f'語数がGSデータと異なります．(入力データ {num_records}, GSデータ {num_gs})')
+    return num_records, 0
+
+
+def validate(task: str, index, submission, max_errors: Optional[int] = None) -> dict:
+    """評価対象データを検証し，出力のJSONに相当する辞書を返します．
+    indexはload_indexの結果（Entity Linkingは各行の形態素を返すイテレータも指定できます），
+    submissionはJSONの文字列（Entity Linkingは行のイテラブル）です．"""
+    problems = Problems(max_errors)
+    if task == 'summarization':
+        num_records, num_missing = validate_summarization(index, submission, problems)
+    elif task == 'stance':
+        num_records, num_missing = validate_stance(index, submission, problems)
+    elif task == 'entity':
+        num_records, num_missing = validate_entity(index, submission, problems)
+    else:
+        raise Exception(f'タスク名が不正です．({task})')
+    return {
+        'success': True,
+        'valid': problems.count == 0,
+        'task': task,
+        'version': import_eval_script(task).DATA_VERSION,
+        'num_records': num_records,
+        'num_missing': num_missing,
+        'num_errors': problems.count,
+        'errors': problems.errors
+    }
+
+
+def main():
+    args = get_args()
+    if args.gs_data is None:
+        raise Exception('GSデータ（-g）を指定してください．')
+    max_errors = args.max_errors if args.max_errors >= 0 else None
+
+    # Entity LinkingはGSデータと評価対象データを1行ずつ並べて読み進めます
+    if args.task == 'entity':
+        with open(args.input_file) as f:
+            result = validate('entity', iter_morphs(args.gs_data), f, max_errors)
+    else:
+        index = load_index(args.task, args.gs_data)
+        with open(args.input_file) as f:
+            result = validate(args.task, index, f.read(), max_errors)
+
+    # 出力
+    return json.dumps(result, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
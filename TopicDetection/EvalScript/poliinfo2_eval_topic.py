@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""NTCIR-15 QA Lab PoliInfo2 Topic Detectionタスクの自動評価スクリプト．
+
+【入力】評価対象データ・GSデータはファイル入力で以下のJSON書式を想定しています．
+議員ごと（会議の日付と議員名の組ごと）の論点（議題）のリストです．
+[
+    {"Date": "2020/2/19", "Member": "...", "Topics": ["...", ...]},
+    ...
+]
+1件に1つの論点を"Topic"で示すJSON Lines（poliinfo2_topic_candidates.pyの出力など）も読み込めます．
+同じ日付と議員名のものは1つのリストにまとめます．日付は年月日の数値で，議員名は空白類を除いて比べます．
+
+【照合】論点はNFKC正規化して空白類と記号を除いた文字列が一致するもの（exact）を対応付け，
+残りを文字n-gram（既定はbigram）の集合のDice係数が閾値（既定は0.5）以上で大きいものから対応付けます（fuzzy）．
+どちらも正解と入力の論点を1対1に対応付けます．fuzzyの値はexactで対応付けたものを含みます．
+Dice係数は議員ごとの正解の論点の文字n-gramの転置索引で，文字n-gramを共有する組のみ求めます（編集距離は求めません）．
+文字n-gramを共有しない組は比べませんが，よく現れる文字n-gramを含む論点どうしは組として比べます．
+
+【出力】評価結果は標準出力で以下のJSON書式です．
+{
+    "success": true,    // スコア計算が成功したかどうか
+    "rep_score": float, // 代表スコア（fuzzyのマイクロ平均のF値）
+    "version": string,  // データバージョン
+    "num_members": int,         // GSデータの議員数
+    "num_estimate_members": int,// 入力データのうちGSデータにある議員数
+    "num_unknown_members": int, // 入力データのうちGSデータにない議員数
+    "num_total": int,           // GSデータの論点の総数
+    "num_estimate": int,        // 入力データの論点の総数（GSデータにない議員のものを含みます）
+    "exact": {
+        "correct": int,     // 対応付けた論点の数
+        "precision": float, // マイクロ平均のPrecision
+        "recall": float,    // マイクロ平均のRecall
+        "f1": float,        // マイクロ平均のF値
+        "macro_recall": float   // GSデータの議員ごとのRecallの平均
+    },
+    "fuzzy": {...},     // exactと同じ書式
+    "ins": [
+        {
+            "ID": string,   // 日付と議員名（"2020/2/19/議員名"）
+            "T": int,       // GSデータの論点の数
+            "E": int,       // 入力データの論点の数
+            "Cexact": int,  // exactで対応付けた数
+            "Cfuzzy": int,  // fuzzyで対応付けた数
+            "Pexact": float, "Rexact": float, "Pfuzzy": float, "Rfuzzy": float
+        },
+        ...
+    ]
+}
+
+更新：2026.10.19
+"""
+
+import sys
+import argparse
+import json
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# データバージョン
+DATA_VERSION = 'v20200708'
+
+# 論点の比較で除く文字の種類（Unicodeの一般カテゴリの先頭）
+IGNORED_CATEGORIES = ('P', 'S', 'Z', 'C')
+
+
+class TopicList(object):
+    """1人の議員（日付と議員名の組）の論点のリストです．"""
+
+    def __init__(self, key: str):
+        self.key: str = key
+        self.topics: List[str] = []
+        self.normalized: List[str] = []
+
+    def add(self, topic: str):
+        self.topics.append(topic)
+        self.normalized.append(normalize_topic(topic))
+
+
+class TopicEval(object):
+    """exactとfuzzyの対応付けの数を数えます．"""
+
+    def __init__(self):
+        self.cnt = Counter()
+        self.recalls: Dict[str, List[float]] = {'exact': [], 'fuzzy': []}
+
+    def add(self, key: str, num_total: int, num_estimate: int, num_exact: int, num_fuzzy: int) -> dict:
+        self.cnt['total'] += num_total
+        self.cnt['estimate'] += num_estimate
+        self.cnt['exact'] += num_exact
+        self.cnt['fuzzy'] += num_fuzzy
+        ret = {'ID': key, 'T': num_total, 'E': num_estimate, 'Cexact': num_exact, 'Cfuzzy': num_fuzzy}
+        for name, c in [('exact', num_exact), ('fuzzy', num_fuzzy)]:
+            ret[f'P{name}'] = c / num_estimate if num_estimate > 0 else None
+            ret[f'R{name}'] = c / num_total if num_total > 0 else None
+            if num_total > 0:
+                self.recalls[name].append(c / num_total)
+        return ret
+
+    def precision(self, name: str) -> Optional[float]:
+        return self.cnt[name] / self.cnt['estimate'] if self.cnt['estimate'] > 0 else None
+
+    def recall(self, name: str) -> Optional[float]:
+        return self.cnt[name] / self.cnt['total'] if self.cnt['total'] > 0 else None
+
+    def f1(self, name: str) -> Optional[float]:
+        p = self.precision(name)
+        r = self.recall(name)
+        if p is None or r is None:
+            return None
+        return (2 * p * r) / (p + r) if p + r > 0 else 0.0
+
+    def to_dict(self, name: str) -> dict:
+        recalls = self.recalls[name]
+        return {
+            'correct': self.cnt[name],
+            'precision': self.precision(name),
+            'recall': self.recall(name),
+            'f1': self.f1(name),
+            'macro_recall': sum(recalls) / len(recalls) if len(recalls) > 0 else None
+        }
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="""NTCIR-15 QA Lab PoliInfo2 Topic Detectionタスクの自動評価スクリプト．
+
+【入力】評価対象データ・GSデータはファイル入力で以下のJSON書式（またはJSON Lines）を想定しています．
+[
+    {"Date": "2020/2/19", "Member": "...", "Topics": ["...", ...]},
+    ...
+]
+
+【出力】評価結果は標準出力で以下のJSON書式です．
+{
+    "success": true,    // スコア計算が成功したかどうか
+    "rep_score": float, // 代表スコア（fuzzyのマイクロ平均のF値）
+    "version": string,  // データバージョン
+    "num_members": int, "num_estimate_members": int, "num_unknown_members": int,
+    "num_total": int, "num_estimate": int,
+    "exact": {"correct": int, "precision": float, "recall": float, "f1": float, "macro_recall": float},
+    "fuzzy": {...},
+    "ins": [{"ID": string, "T": int, "E": int, "Cexact": int, "Cfuzzy": int, ...}, ...]
+}""")
+
+    parser.add_argument('-g', '--gs-data',
+                        required=True,
+                        help='GSデータを指定します'
+                        )
+
+    parser.add_argument('-f', '--input-file',
+                        required=True,
+                        help='入力データを指定します'
+                        )
+
+    parser.add_argument('-n', '--ngram',
+                        type=int, default=2,
+                        help='fuzzyで比べる文字n-gramの長さを指定します'
+                        )
+
+    parser.add_argument('-t', '--threshold',
+                        type=float, default=0.5,
+                        help='fuzzyで対応付けるDice係数の閾値を指定します'
+                        )
+    return parser.parse_args()
+
+
+def normalize_topic(s: str) -> str:
+    """NFKC正規化して空白類・記号を除きます．"""
+    s = unicodedata.normalize('NFKC', s)
+    return ''.join(c for c in s if not unicodedata.category(c).startswith(IGNORED_CATEGORIES))
+
+
+def member_key(date: str, member: str) -> str:
+    """日付（'2020/2/19'や'2020-02-19'）と議員名から，議員のリストのキーを返します．"""
+    try:
+        y, m, d = [int(x) for x in date.replace('-', '/').split('/')]
+    except (AttributeError, ValueError):
+        raise Exception(f'日付が不正です．({date})')
+    name = ''.join(unicodedata.normalize('NFKC', member or '').split())
+    return f'{y}/{m}/{d}/{name}'
+
+
+def iter_records(filepath: str) -> Iterator[dict]:
+    """JSONの配列かJSON Linesのファイルから1件ずつ返します．"""
+    with open(filepath) as f:
+        head = f.read(1)
+        while head != '' and head.isspace():
+            head = f.read(1)
+        if head == '[':
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip() != '':
+                yield json.loads(line)
+
+
+def load_topics(filepath: str) -> Dict[str, TopicList]:
+    """議員のキー→論点のリストを返します．"""
+    ret: Dict[str, TopicList] = {}
+    for x in iter_records(filepath):
+        key = member_key(x.get('Date'), x.get('Member'))
+        topics = x['Topics'] if 'Topics' in x else [x['Topic']]
+        lst = ret.get(key)
+        if lst is None:
+            lst = ret[key] = TopicList(key)
+        for topic in topics:
+            lst.add(topic)
+    return ret
+
+
+def char_ngrams(s: str, n: int) -> set:
+    """文字n-gramの集合を返します．n文字未満の文字列はそのまま1語とします．"""
+    if len(s) < n:
+        return {s} if s != '' else set()
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+def match_topics(gs: List[str], tg: List[str], n: int, threshold: float) -> Tuple[int, int]:
+    """正規化した論点のリストを1対1に対応付け，(exactの数, fuzzyの数)を返します．"""
+    # 完全一致
+    positions: Dict[str, List[int]] = {}
+    for j, x in enumerate(gs):
+        positions.setdefault(x, []).append(j)
+    gs_used = [False] * len(gs)
+    tg_rest = []
+    num_exact = 0
+    for i, x in enumerate(tg):
+        js = positions.get(x)
+        if js:
+            gs_used[js.pop(0)] = True
+            num_exact += 1
+        else:
+            tg_rest.append(i)
+
+    # 残りの正解の文字n-gramの転置索引
+    index: Dict[str, List[int]] = {}
+    gs_sizes: Dict[int, int] = {}
+    for j, x in enumerate(gs):
+        if gs_used[j]:
+            continue
+        grams = char_ngrams(x, n)
+        gs_sizes[j] = len(grams)
+        for g in grams:
+            index.setdefault(g, []).append(j)
+    if len(index) == 0:
+        return num_exact, num_exact
+
+    # 文字n-gramを共有する組のみDice係数を求め，大きいものから対応付けます
+    pairs = []
+    for i in tg_rest:
+        grams = char_ngrams(tg[i], n)
+        shared = Counter()
+        for g in grams:
+            shared.update(index.get(g, ()))
+        for j, c in shared.items():
+            dice = 2 * c / (len(grams) + gs_sizes[j])
+            if dice >= threshold:
+                pairs.append((-dice, i, j))
+    pairs.sort()
+    tg_used = set()
+    num_fuzzy = num_exact
+    for _, i, j in pairs:
+        if i in tg_used or gs_used[j]:
+            continue
+        tg_used.add(i)
+        gs_used[j] = True
+        num_fuzzy += 1
+    return num_exact, num_fuzzy
+
+
+def evaluate(gss: Dict[str, TopicList], targets: Dict[str, TopicList], n: int = 2, threshold: float = 0.5) -> dict:
+    """読み込み済みのGSデータと評価対象データを評価し，出力のJSONに相当する辞書を返します．"""
+    t_eval = TopicEval()
+    ins = []
+    for key, gs in gss.items():
+        tg = targets.get(key)
+        tg_topics = tg.normalized if tg is not None else []
+        num_exact, num_fuzzy = match_topics(gs.normalized, tg_topics, n, threshold)
+        ins.append(t_eval.add(key, len(gs.topics), len(tg_topics), num_exact, num_fuzzy))
+
+    # GSデータにない議員の論点は誤りとして数えます
+    unknown = [x for key, x in targets.items() if key not in gss]
+    t_eval.cnt['estimate'] += sum(len(x.topics) for x in unknown)
+    return {
+        'success': True,
+        'rep_score': t_eval.f1('fuzzy'),
+        'version': DATA_VERSION,
+        'num_members': len(gss),
+        'num_estimate_members': len(targets) - len(unknown),
+        'num_unknown_members': len(unknown),
+        'num_total': t_eval.cnt['total'],
+        'num_estimate': t_eval.cnt['estimate'],
+        'exact': t_eval.to_dict('exact'),
+        'fuzzy': t_eval.to_dict('fuzzy'),
+        'ins': ins
+    }
+
+
+def main():
+    args = get_args()
+
+    # GS読み込み
+    gss = load_topics(args.gs_data)
+
+    # 評価対象読み込み
+    targets = load_topics(args.input_file)
+
+    # 出力
+    return json.dumps(evaluate(gss, targets, args.ngram, args.threshold), ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    try:
+        print(main())
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))